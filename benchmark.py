@@ -0,0 +1,338 @@
+"""
+Benchmarks for the script server.
+
+    python benchmark.py run                      # in-process, default workload
+    python benchmark.py run --mode socket        # through a local HTTP server
+    python benchmark.py run --url http://host:5000 --password ...
+    python benchmark.py compare before.json after.json
+
+A synthetic script tree and analytics history are generated in a
+temporary directory (the real data is never touched; STORAGE_BACKEND
+selects where the scripts are stored), then each scenario
+is run at every concurrency level for a fixed duration. Results are
+printed and written as JSON so runs can be compared.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+SCENARIOS = ['fetch', 'list', 'save', 'analytics']
+DEFAULT_SIZES = '200,4096,65536,524288'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the script server')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmark suite')
+    run.add_argument('--mode', choices=['inprocess', 'socket'], default='inprocess',
+                     help='call the Flask app directly or over a local socket')
+    run.add_argument('--url', help='benchmark an already running server instead (its own data is used)')
+    run.add_argument('--username', default='admin')
+    run.add_argument('--password', default='changeme123')
+    run.add_argument('--folders', type=int, default=20)
+    run.add_argument('--scripts', type=int, default=50, help='scripts per folder')
+    run.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated script sizes in bytes')
+    run.add_argument('--history', type=int, default=20000, help='synthetic analytics loads')
+    run.add_argument('--concurrency', default='1,8,32')
+    run.add_argument('--duration', type=float, default=5.0, help='seconds per scenario and concurrency')
+    run.add_argument('--scenarios', default=','.join(SCENARIOS))
+    run.add_argument('--output', default='benchmark_results.json')
+    run.add_argument('--seed', type=int, default=1)
+
+    compare = commands.add_parser('compare', help='compare two result files')
+    compare.add_argument('before')
+    compare.add_argument('after')
+    return parser.parse_args()
+
+# Synthetic data
+def lua_body(size, rng):
+    lines = ['-- generated by benchmark.py']
+    while sum(len(line) + 1 for line in lines) < size:
+        n = rng.randint(0, 9999)
+        lines.append(f'local value_{n} = game:GetService("Players"):FindFirstChild("p{n}") -- {n * 7}')
+    return '\n'.join(lines)[:size] + '\n'
+
+def generate_tree(storage, folders, scripts, sizes, rng):
+    names = []
+    for f in range(folders):
+        folder = f'folder{f:03d}'
+        storage.create_folder(folder)
+        for s in range(scripts):
+            name = f'script{s:04d}.lua'
+            storage.put(folder, name, lua_body(rng.choice(sizes), rng))
+            names.append((folder, name))
+    return names
+
+def generate_analytics(ss, names, loads, rng):
+    analytics = ss.empty_analytics()
+    start = datetime.now() - timedelta(days=30)
+    # Skewed popularity, like real traffic: a few scripts get most loads
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    for i, (folder, name) in enumerate(rng.choices(names, weights=weights, k=loads)):
+        ip = f'10.{rng.randint(0, 3)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}'
+        timestamp = (start + timedelta(seconds=i * 30 * 86400 // max(loads, 1))).isoformat()
+        ss.apply_script_load(analytics, folder, name, ip, timestamp)
+    ss.write_analytics_file(analytics)
+
+# Clients
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        response.get_data()
+        return response.status_code
+
+class SocketClient:
+    """Keep-alive HTTP client with its own cookie"""
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.cookie = None
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response.status
+
+def login(client, username, password):
+    body = f'username={username}&password={password}'
+    status = client.request('POST', '/login', body,
+                            {'Content-Type': 'application/x-www-form-urlencoded'})
+    if status != 302:
+        sys.exit(f'Login failed with status {status}')
+
+# Scenarios: each returns a function performing one request with a client
+def make_scenario(scenario, names, rng):
+    folders = sorted({folder for folder, _ in names})
+    if scenario == 'fetch':
+        weights = [1 / (rank + 1) for rank in range(len(names))]
+        picks = rng.choices(names, weights=weights, k=4096)
+        def step(client, i):
+            folder, name = picks[i % len(picks)]
+            return client.request('GET', f'/scripts/{folder}/{name}')
+    elif scenario == 'list':
+        def step(client, i):
+            return client.request('GET', f'/api/scripts/{folders[i % len(folders)]}')
+    elif scenario == 'save':
+        body = json.dumps({'content': lua_body(2048, rng)})
+        def step(client, i):
+            folder, name = names[i % len(names)]
+            return client.request('POST', f'/api/save/{folder}/{name}', body,
+                                  {'Content-Type': 'application/json'})
+    elif scenario == 'analytics':
+        def step(client, i):
+            if i % 2:
+                folder, name = names[i % len(names)]
+                return client.request('GET', f'/api/analytics/script/{folder}/{name}')
+            return client.request('GET', '/api/analytics/overview')
+    return step
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_level(step, clients, duration):
+    latencies = [[] for _ in clients]
+    errors = [0] * len(clients)
+    deadline = time.perf_counter() + duration
+
+    def worker(n):
+        client, i = clients[n], n
+        record = latencies[n].append
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = step(client, i)
+            except Exception:
+                status = 0
+            record(time.perf_counter() - started)
+            if not 200 <= status < 400:
+                errors[n] += 1
+            i += len(clients)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(len(clients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(latency for per_client in latencies for latency in per_client)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(samples),
+        'errors': sum(errors),
+        'throughput': round(len(samples) / elapsed, 1),
+        'mean_ms': ms(sum(samples) / len(samples)) if samples else None,
+        'p50_ms': ms(percentile(samples, 0.50)),
+        'p95_ms': ms(percentile(samples, 0.95)),
+        'p99_ms': ms(percentile(samples, 0.99)),
+        'max_ms': ms(samples[-1]) if samples else None,
+    }
+
+def discover_names(client_factory, args):
+    """Script names of a remote server, via its API"""
+    import urllib.request
+    opener = client_factory()
+    login(opener, args.username, args.password)
+    names = []
+    base = args.url.rstrip('/')
+    request = urllib.request.Request(base + '/api/folders', headers={'Cookie': opener.cookie})
+    for folder in json.load(urllib.request.urlopen(request)):
+        request = urllib.request.Request(f'{base}/api/scripts/{folder}', headers={'Cookie': opener.cookie})
+        names.extend((folder, script['name']) for script in json.load(urllib.request.urlopen(request)))
+    return names
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args):
+    rng = random.Random(args.seed)
+    levels = [int(level) for level in args.concurrency.split(',')]
+    scenarios = [scenario for scenario in args.scenarios.split(',') if scenario]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            sys.exit(f'Unknown scenario {scenario!r}, choose from {", ".join(SCENARIOS)}')
+
+    workdir = server = None
+    if args.url:
+        client_factory = lambda: SocketClient(args.url)
+        names = discover_names(client_factory, args)
+        if not names:
+            sys.exit('The server has no scripts to fetch')
+    else:
+        # Import the app inside a scratch directory so it only sees synthetic data
+        workdir = tempfile.mkdtemp(prefix='script-server-bench-')
+        os.chdir(workdir)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        print(f'Generating {args.folders}x{args.scripts} scripts and {args.history} analytics loads in {workdir}')
+        import script_server as ss
+        ss.app.root_path = workdir
+        sizes = [int(size) for size in args.sizes.split(',')]
+        names = generate_tree(ss.STORAGE, args.folders, args.scripts, sizes, rng)
+        generate_analytics(ss, names, args.history, rng)
+
+        if args.mode == 'socket':
+            from werkzeug.serving import make_server, WSGIRequestHandler
+
+            class QuietHandler(WSGIRequestHandler):
+                def log_request(self, *args, **kwargs):
+                    pass
+
+            server = make_server('127.0.0.1', 0, ss.app, threaded=True, request_handler=QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+            client_factory = lambda: SocketClient(base_url)
+        else:
+            client_factory = lambda: InProcessClient(ss.app)
+
+    results = []
+    try:
+        for scenario in scenarios:
+            step = make_scenario(scenario, names, rng)
+            for level in levels:
+                clients = [client_factory() for _ in range(level)]
+                for client in clients:
+                    login(client, args.username, args.password)
+                result = {'scenario': scenario, 'concurrency': level}
+                result.update(run_level(step, clients, args.duration))
+                results.append(result)
+                print(f"{scenario:>10} c={level:<4} {result['throughput']:>9.1f} req/s  "
+                      f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+                      f"errors {result['errors']}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        if workdir is not None:
+            os.chdir(os.path.dirname(os.path.abspath(__file__)))
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': 'remote' if args.url else args.mode,
+            'folders': args.folders,
+            'scripts': args.scripts,
+            'sizes': args.sizes,
+            'history': args.history,
+            'duration': args.duration,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'Results written to {args.output}')
+
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    previous = {(r['scenario'], r['concurrency']): r for r in before['results']}
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+
+    def change(old, new, lower_is_better):
+        if not old or new is None:
+            return '     n/a'
+        delta = (new - old) / old * 100
+        better = delta < 0 if lower_is_better else delta > 0
+        return f"{delta:+7.1f}%{' ' if abs(delta) < 5 else ('+' if better else '-')}"
+
+    print(f"{'scenario':>10} {'conc':>5} {'req/s':>10} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for result in after['results']:
+        old = previous.get((result['scenario'], result['concurrency']))
+        if old is None:
+            continue
+        print(f"{result['scenario']:>10} {result['concurrency']:>5} "
+              f"{change(old['throughput'], result['throughput'], False):>10} "
+              f"{change(old['p50_ms'], result['p50_ms'], True):>10} "
+              f"{change(old['p95_ms'], result['p95_ms'], True):>10} "
+              f"{change(old['p99_ms'], result['p99_ms'], True):>10}")
+
+if __name__ == '__main__':
+    args = parse_args()
+    run(args) if args.command == 'run' else compare(args)
@@ -1,26 +1,54 @@
-from flask import Flask, send_file, abort, render_template_string, request, jsonify, session, redirect, url_for
+# Startup is timed from here so the report includes importing Flask
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, send_file, abort, request, g, jsonify, session, redirect, url_for, Response, has_request_context
 import os
 from pathlib import Path
 import json
+import bisect
+import gzip
+import zlib
+import hashlib
+import mmap
 from functools import wraps
 import secrets
+import socket
 import re
+import queue
+import threading
 from datetime import datetime
-from collections import defaultdict
-from flask_session import Session
-import redis
+from collections import defaultdict, OrderedDict, deque
+import atexit
+import io
+import sys
+import random
+import math
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from urllib.request import Request as UrlRequest, urlopen
+from flask.sessions import SessionInterface, SecureCookieSession
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
 
-app = Flask(__name__)
-app.secret_key = secrets.token_hex(32)
+# Cold start matters on hosts that scale to zero, so the time spent in each
+# startup phase is recorded, printed and exported as a metric. asyncio (ASGI
+# mode) and the profiler modules are imported where they are first needed.
+STARTUP_PHASES = []
+_phase_started = STARTUP_STARTED
 
-# Configure Redis session storage
-app.config['SESSION_TYPE'] = 'redis'
-app.config['SESSION_PERMANENT'] = False
-app.config['SESSION_USE_SIGNER'] = True
-app.config['SESSION_REDIS'] = redis.from_url('redis://localhost:6379')
+def mark_startup_phase(name):
+    global _phase_started
+    now = time.perf_counter()
+    STARTUP_PHASES.append((name, now - _phase_started))
+    _phase_started = now
 
-# Initialize session
-Session(app)
+mark_startup_phase('imports')
+
+app = Flask(__name__)
 
 BASE_DIR = "lua_scripts"
 CONFIG_FILE = "server_config.json"
@@ -33,20 +61,423 @@ def natural_sort_key(text):
     """
     return [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', text)]
 
-# Load or create analytics data
-def load_analytics():
+# Change events (script saved/created/deleted, folder created) fan out to listeners.
+# The editor's server-sent events stream is one listener; others can be appended.
+# Under gunicorn's gthread workers an open stream occupies one of the worker's
+# WEB_THREADS for as long as the editor stays open, so each worker accepts at
+# most SSE_MAX_STREAMS of them (default: half its threads) and answers 503
+# beyond that; the editor retries later. Script requests keep the other threads.
+CHANGE_LISTENERS = []
+SSE_HEARTBEAT_SECONDS = 15
+SSE_QUEUE_SIZE = 500
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', max(1, int(os.environ.get('WEB_THREADS', 8)) // 2)))
+SSE_RETRY_SECONDS = 30
+LOAD_TICK_INTERVAL = 1.0
+
+_sse_subscribers = set()
+_sse_lock = threading.Lock()
+_pending_load_ticks = {}
+_load_tick_thread = None
+
+def emit_change(event_type, folder, script=None, **data):
+    """Publish a change event to every registered listener"""
+    event = {
+        "type": event_type,
+        "folder": folder,
+        "script": script,
+        "origin": request.headers.get('X-Editor-Client') if has_request_context() else None,
+        "timestamp": datetime.now().isoformat()
+    }
+    event.update(data)
+    for listener in list(CHANGE_LISTENERS):
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"⚠️  Change listener failed: {e}")
+    return event
+
+def broadcast_event(event):
+    """Push an event to every connected editor stream"""
+    with _sse_lock:
+        subscribers = list(_sse_subscribers)
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(event)
+        except queue.Full:
+            # Slow client: drop its backlog and ask it to refetch the folder
+            with subscriber.mutex:
+                subscriber.queue.clear()
+            subscriber.put_nowait({"type": "resync", "folder": None, "script": None})
+
+CHANGE_LISTENERS.append(broadcast_event)
+
+def subscribe_events(limit=None):
+    """A queue receiving every event, or None if limit subscribers are already connected"""
+    subscriber = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+    with _sse_lock:
+        if limit is not None and len(_sse_subscribers) >= limit:
+            return None
+        _sse_subscribers.add(subscriber)
+    start_load_ticker()
+    return subscriber
+
+def unsubscribe_events(subscriber):
+    with _sse_lock:
+        _sse_subscribers.discard(subscriber)
+
+# Load counts are coalesced and sent at most once per interval per script
+def queue_load_tick(folder, filename, stats):
+    if not _sse_subscribers:
+        return
+    with _sse_lock:
+        _pending_load_ticks[(folder, filename)] = stats
+
+def _load_tick_loop():
+    while True:
+        time.sleep(LOAD_TICK_INTERVAL)
+        with _sse_lock:
+            ticks = list(_pending_load_ticks.items())
+            _pending_load_ticks.clear()
+        for (folder, filename), stats in ticks:
+            event = {"type": "load", "folder": folder, "script": filename}
+            event.update(stats)
+            broadcast_event(event)
+
+def start_load_ticker():
+    global _load_tick_thread
+    with _sse_lock:
+        if _load_tick_thread is None:
+            _load_tick_thread = threading.Thread(target=_load_tick_loop, daemon=True)
+            _load_tick_thread.start()
+
+# Metrics registry, exposed in Prometheus text format on /metrics. Updates are
+# a lock and a dict increment. Each worker process periodically writes a
+# snapshot to METRICS_DIR and a scrape merges the snapshots of all live
+# workers, so the numbers cover the whole server whichever worker answers.
+METRICS_DIR = os.environ.get('METRICS_DIR', '.metrics')
+METRICS_SNAPSHOT_SECONDS = 5
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS = []
+METRIC_COLLECTORS = []  # callables run just before a snapshot is taken
+
+class Metric:
+    def __init__(self, name, help, kind, labelnames=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.values = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value if not isinstance(value, list) else list(value)]
+                    for labels, value in self.values.items()]
+
+class Counter(Metric):
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, 'counter', labelnames)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value, *labels):
+        """For collectors that mirror a counter kept elsewhere"""
+        with self._lock:
+            self.values[labels] = value
+
+class Gauge(Metric):
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, 'gauge', labelnames)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self.values[labels] = value
+
+class Histogram(Metric):
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, 'histogram', labelnames)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        # Per-bucket (non-cumulative) counts plus the sum; cumulated when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self.values.get(labels)
+            if row is None:
+                row = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[index] += 1
+            row[-1] += value
+
+HTTP_REQUESTS = Counter('script_server_http_requests_total', 'HTTP requests', ('route', 'method', 'status'))
+HTTP_LATENCY = Histogram('script_server_http_request_duration_seconds', 'HTTP request latency', ('route', 'method', 'status'))
+HTTP_IN_FLIGHT = Gauge('script_server_http_requests_in_flight', 'HTTP requests being handled')
+CACHE_HITS = Counter('script_server_cache_hits_total', 'Cache hits', ('cache',))
+CACHE_MISSES = Counter('script_server_cache_misses_total', 'Cache misses', ('cache',))
+CACHE_ENTRIES = Gauge('script_server_cache_entries', 'Entries held in cache', ('cache',))
+ANALYTICS_FLUSH_SECONDS = Histogram('script_server_analytics_flush_seconds', 'Time spent merging buffered loads into the analytics file')
+ANALYTICS_FLUSHED_LOADS = Counter('script_server_analytics_flushed_loads_total', 'Script loads written to the analytics file')
+PROCESS_RSS = Gauge('process_resident_memory_bytes', 'Resident memory size', ('pid',))
+PROCESS_CPU = Counter('process_cpu_seconds_total', 'User and system CPU time', ('pid',))
+CHANGE_EVENTS_RELAYED = Counter('script_server_change_events_relayed_total', 'Change events exchanged with other instances over Redis', ('direction',))
+SCRIPT_LOADS_COALESCED = Counter('script_server_script_loads_coalesced_total', 'Script cache misses that waited for a load already in progress')
+RATE_LIMITED = Counter('script_server_rate_limited_total', 'Public script requests rejected by the rate limit', ('folder',))
+JOURNAL_COMMIT_SECONDS = Histogram('script_server_journal_commit_seconds', 'Time to append, fsync and apply one group of editor writes')
+JOURNAL_WRITES = Counter('script_server_journal_writes_total', 'Editor writes committed through the journal')
+CDN_PURGES = Counter('script_server_cdn_purges_total', 'Purge requests sent to CDN_PURGE_URL', ('result',))
+EDGE_HITS = Counter('script_server_edge_hits_total', 'Script loads reported by the CDN edge')
+STARTUP_SECONDS = Gauge('script_server_startup_phase_seconds', 'Time spent in each startup phase', ('phase',))
+
+def record_request(route, method, status, seconds):
+    status = str(status)
+    HTTP_REQUESTS.inc(route, method, status)
+    HTTP_LATENCY.observe(seconds, route, method, status)
+
+def collect_process_metrics():
+    pid = str(os.getpid())
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    PROCESS_RSS.set(rss, pid)
+    times = os.times()
+    PROCESS_CPU.set(times.user + times.system, pid)
+
+def collect_cache_metrics():
+    for cache in CACHES:
+        CACHE_HITS.set(cache.hits, cache.name)
+        CACHE_MISSES.set(cache.misses, cache.name)
+        CACHE_ENTRIES.set(len(cache), cache.name)
+
+def collect_startup_metrics():
+    for phase, seconds in STARTUP_PHASES:
+        STARTUP_SECONDS.set(seconds, phase)
+
+METRIC_COLLECTORS.extend([collect_process_metrics, collect_cache_metrics, collect_startup_metrics])
+
+def write_metrics_snapshot():
+    for collector in METRIC_COLLECTORS:
+        collector()
+    snapshot = {m.name: m.snapshot() for m in METRICS}
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+
+def _metrics_snapshot_loop():
+    while True:
+        time.sleep(METRICS_SNAPSHOT_SECONDS)
+        try:
+            write_metrics_snapshot()
+        except Exception as e:
+            print(f"⚠️  Metrics snapshot failed: {e}")
+
+_metrics_thread = None
+_metrics_thread_lock = threading.Lock()
+
+def start_metrics_snapshots():
+    global _metrics_thread
+    if _metrics_thread is not None:
+        return
+    with _metrics_thread_lock:
+        if _metrics_thread is None:
+            _metrics_thread = threading.Thread(target=_metrics_snapshot_loop, daemon=True)
+            _metrics_thread.start()
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def render_metrics():
+    """Merge the snapshots of all live workers into the text exposition format"""
+    write_metrics_snapshot()
+    merged = {m.name: {} for m in METRICS}
+    for entry in os.listdir(METRICS_DIR):
+        if not entry.endswith('.json'):
+            continue
+        path = os.path.join(METRICS_DIR, entry)
+        if not _pid_alive(int(entry[:-5])):
+            os.remove(path)
+            continue
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, samples in snapshot.items():
+            target = merged.setdefault(name, {})
+            for labels, value in samples:
+                key = tuple(labels)
+                if isinstance(value, list):
+                    current = target.setdefault(key, [0] * len(value))
+                    for i, v in enumerate(value):
+                        current[i] += v
+                else:
+                    target[key] = target.get(key, 0) + value
+    
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in sorted(merged[metric.name].items()):
+            pairs = [f'{n}="{v}"' for n, v in zip(metric.labelnames, labels)]
+            if metric.kind != 'histogram':
+                lines.append(f"{metric.name}{_label_text(pairs)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric.buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                le = pairs + ['le="%s"' % bound]
+                lines.append(f"{metric.name}_bucket{_label_text(le)} {cumulative}")
+            lines.append(f"{metric.name}_sum{_label_text(pairs)} {value[-1]}")
+            lines.append(f"{metric.name}_count{_label_text(pairs)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+def _label_text(pairs):
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+# Analytics: loads are applied to an in-memory copy immediately and appended
+# to a pending list that a background thread merges into ANALYTICS_FILE every
+# ANALYTICS_FLUSH_INTERVAL seconds. The merge re-reads the file under an
+# exclusive lock, so several worker processes can share one analytics file.
+# The same thread re-reads the file when another worker has written it (and so
+# does every read through load_analytics()); requests never touch the file.
+# _analytics_lock only guards the in-memory state: file I/O happens outside
+# it, serialized by _analytics_io_lock.
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 2))
+
+_analytics = None
+_analytics_version = None  # file_version() of ANALYTICS_FILE that _analytics reflects
+_analytics_pending = deque()
+_analytics_lock = threading.RLock()
+_analytics_io_lock = threading.RLock()
+_analytics_flush_thread = None
+
+def empty_analytics():
+    return {"total_loads": 0, "scripts": {}, "history": []}
+
+def read_analytics_file():
     if os.path.exists(ANALYTICS_FILE):
         with open(ANALYTICS_FILE, 'r') as f:
             return json.load(f)
-    return {"total_loads": 0, "scripts": {}, "history": []}
+    return empty_analytics()
 
-def save_analytics(data):
-    with open(ANALYTICS_FILE, 'w') as f:
+def write_analytics_file(data):
+    tmp_path = f"{ANALYTICS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp_path, ANALYTICS_FILE)
 
-def track_script_load(folder, filename, ip_address=None):
-    analytics = load_analytics()
-    
+class file_lock:
+    """Exclusive cross-process lock (flock on a side file) around a read-modify-write"""
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+# Load or create analytics data
+def load_analytics():
+    """Current analytics (this process's pending loads included) as a private copy"""
+    flush_analytics()
+    with _analytics_lock:
+        return json.loads(json.dumps(_analytics_state()))
+
+def save_analytics(data):
+    with _analytics_io_lock:
+        with file_lock(ANALYTICS_FILE + '.lock'):
+            write_analytics_file(data)
+            version = file_version(ANALYTICS_FILE)
+        with _analytics_lock:
+            _analytics_pending.clear()
+            _adopt_analytics(data, version)
+
+def _adopt_analytics(analytics, version):
+    """Make a copy read from the file current, re-applying the loads still pending (_analytics_lock held)"""
+    global _analytics, _analytics_version
+    for load in _analytics_pending:
+        apply_script_load(analytics, *load)
+    _analytics, _analytics_version = analytics, version
+
+def _analytics_state():
+    """In-memory analytics: the shared file plus this process's pending loads (_analytics_lock held)"""
+    if _analytics is None:
+        # Only if used before the startup reload_analytics()
+        _adopt_analytics(read_analytics_file(), file_version(ANALYTICS_FILE))
+    return _analytics
+
+def reload_analytics():
+    """Re-read the analytics file if another worker has written it since"""
+    with _analytics_io_lock:
+        version = file_version(ANALYTICS_FILE)
+        if _analytics is not None and version == _analytics_version:
+            return
+        analytics = read_analytics_file()
+        with _analytics_lock:
+            _adopt_analytics(analytics, version)
+
+def flush_analytics():
+    """Merge pending loads into the shared analytics file"""
+    if ANALYTICS_BACKEND == 'redis':
+        return flush_analytics_redis()
+    with _analytics_io_lock:
+        # Loads recorded from here on stay pending and are re-applied below
+        with _analytics_lock:
+            batch = list(_analytics_pending)
+            _analytics_pending.clear()
+        if not batch:
+            return reload_analytics()
+        started = time.perf_counter()
+        try:
+            with file_lock(ANALYTICS_FILE + '.lock'):
+                analytics = read_analytics_file()
+                for load in batch:
+                    apply_script_load(analytics, *load)
+                write_analytics_file(analytics)
+                version = file_version(ANALYTICS_FILE)
+        except Exception:
+            with _analytics_lock:
+                _analytics_pending.extendleft(reversed(batch))
+            raise
+        ANALYTICS_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        ANALYTICS_FLUSHED_LOADS.inc(amount=len(batch))
+        with _analytics_lock:
+            _adopt_analytics(analytics, version)
+
+def _analytics_flush_loop():
+    while True:
+        time.sleep(ANALYTICS_FLUSH_INTERVAL)
+        try:
+            flush_analytics()
+        except Exception as e:
+            print(f"⚠️  Analytics flush failed: {e}")
+
+def apply_script_load(analytics, folder, filename, ip_address, timestamp):
     # Update total loads
     analytics["total_loads"] += 1
     
@@ -57,14 +488,14 @@ def track_script_load(folder, filename, ip_address=None):
     if script_key not in analytics["scripts"]:
         analytics["scripts"][script_key] = {
             "total_loads": 0,
-            "first_load": datetime.now().isoformat(),
-            "last_load": datetime.now().isoformat(),
+            "first_load": timestamp,
+            "last_load": timestamp,
             "unique_ips": []
         }
     
     # Update script stats
     analytics["scripts"][script_key]["total_loads"] += 1
-    analytics["scripts"][script_key]["last_load"] = datetime.now().isoformat()
+    analytics["scripts"][script_key]["last_load"] = timestamp
     
     # Track unique IPs (store only last 100 to avoid bloat)
     if ip_address and ip_address not in analytics["scripts"][script_key]["unique_ips"]:
@@ -74,15 +505,1669 @@ def track_script_load(folder, filename, ip_address=None):
     
     # Add to history (keep last 1000 events)
     analytics["history"].append({
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": timestamp,
         "script": script_key,
         "ip": ip_address
     })
     if len(analytics["history"]) > 1000:
-        analytics["history"] = analytics["history"][-1000:]
+        del analytics["history"][:-1000]
+    return analytics["scripts"][script_key]
+
+def track_script_load(folder, filename, ip_address=None):
+    global _analytics_flush_thread
+    load = (folder, filename, ip_address, datetime.now().isoformat())
+    with _analytics_lock:
+        if _analytics_flush_thread is None:
+            _analytics_flush_thread = threading.Thread(target=_analytics_flush_loop, daemon=True)
+            _analytics_flush_thread.start()
+        if ANALYTICS_BACKEND == 'redis':
+            # Live counters are sent once the batch has reached Redis
+            _analytics_pending.append(load)
+            return
+        # Memory only: the file is merged and re-read by the flush thread
+        state = _analytics_state()
+        _analytics_pending.append(load)
+        stats = apply_script_load(state, *load)
+        tick = {
+            "total_loads": stats["total_loads"],
+            "unique_ips": len(stats["unique_ips"]),
+            "last_ip": ip_address
+        }
+    queue_load_tick(folder, filename, tick)
+
+# Shared analytics (ANALYTICS_BACKEND=redis): instead of analytics.json every
+# node sends its loads to Redis, so the analytics endpoints show the whole
+# cluster. The flush thread sends each batch as one pipeline: a counter per
+# script (sorted set, which also ranks the top scripts), a HyperLogLog of IPs
+# per script, first/last load times and capped recent-load lists. If Redis is
+# unreachable the batch goes back into the local buffer (up to
+# ANALYTICS_BUFFER_MAX loads) and is retried on the next flush.
+ANALYTICS_BACKEND = os.environ.get('ANALYTICS_BACKEND', 'file')
+ANALYTICS_REDIS_PREFIX = 'script_server:analytics:'
+ANALYTICS_BUFFER_MAX = 100000
+if ANALYTICS_BACKEND == 'redis':
+    # The oldest loads are dropped once this many are waiting for Redis
+    _analytics_pending = deque(maxlen=ANALYTICS_BUFFER_MAX)
+ANALYTICS_HISTORY = 1000
+ANALYTICS_RECENT_PER_SCRIPT = 20
+
+def analytics_key(*parts):
+    return ANALYTICS_REDIS_PREFIX + ':'.join(parts)
+
+def flush_analytics_redis():
+    with _analytics_lock:
+        if not _analytics_pending:
+            return
+        batch = list(_analytics_pending)
+        _analytics_pending.clear()
+    
+    started = time.perf_counter()
+    per_script = {}
+    events = []
+    for folder, filename, ip_address, timestamp in batch:
+        event = json.dumps({"timestamp": timestamp, "script": f"{folder}/{filename}", "ip": ip_address})
+        events.append(event)
+        entry = per_script.setdefault((folder, filename), {'count': 0, 'ips': set(), 'events': [], 'first': timestamp})
+        entry['count'] += 1
+        entry['last'] = timestamp
+        entry['last_ip'] = ip_address
+        entry['events'].append(event)
+        if ip_address:
+            entry['ips'].add(ip_address)
+    
+    try:
+        # MULTI/EXEC: a batch is applied entirely or not at all, so retrying it can't double-count
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.incrby(analytics_key('total'), len(batch))
+        positions = {}
+        for (folder, filename), entry in per_script.items():
+            script_key = f"{folder}/{filename}"
+            positions[(folder, filename)] = len(pipe.command_stack)
+            pipe.zincrby(analytics_key('loads'), entry['count'], script_key)
+            if entry['ips']:
+                pipe.pfadd(analytics_key('ips', script_key), *entry['ips'])
+            pipe.pfcount(analytics_key('ips', script_key))
+            pipe.hsetnx(analytics_key('first'), script_key, entry['first'])
+            pipe.hset(analytics_key('last'), script_key, entry['last'])
+            pipe.lpush(analytics_key('recent', script_key), *entry['events'])
+            pipe.ltrim(analytics_key('recent', script_key), 0, ANALYTICS_RECENT_PER_SCRIPT - 1)
+        pipe.lpush(analytics_key('history'), *events)
+        pipe.ltrim(analytics_key('history'), 0, ANALYTICS_HISTORY - 1)
+        results = pipe.execute()
+    except Exception:
+        with _analytics_lock:
+            newer = list(_analytics_pending)
+            _analytics_pending.clear()
+            _analytics_pending.extend(batch + newer)
+        raise
+    ANALYTICS_FLUSH_SECONDS.observe(time.perf_counter() - started)
+    ANALYTICS_FLUSHED_LOADS.inc(amount=len(batch))
+    
+    # Cluster-wide counters for the editors' live load badges
+    for (folder, filename), entry in per_script.items():
+        at = positions[(folder, filename)]
+        queue_load_tick(folder, filename, {
+            "total_loads": int(results[at]),
+            "unique_ips": results[at + (2 if entry['ips'] else 1)],
+            "last_ip": entry['last_ip']
+        })
+
+def _decode_events(raw):
+    return [json.loads(item) for item in raw]
+
+def flush_before_read():
+    # Loads stay buffered if Redis is briefly away; the read shows the rest
+    try:
+        flush_analytics()
+    except Exception as e:
+        print(f"⚠️  Analytics flush failed: {e}")
+
+def redis_analytics_overview():
+    flush_before_read()
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.get(analytics_key('total'))
+    pipe.zcard(analytics_key('loads'))
+    pipe.zrevrange(analytics_key('loads'), 0, 9, withscores=True)
+    pipe.lrange(analytics_key('history'), 0, 49)
+    total, total_scripts, top, history = pipe.execute()
+    
+    top = [(name.decode('utf-8'), int(score)) for name, score in top]
+    pipe = get_redis().pipeline(transaction=False)
+    for script_key, _ in top:
+        pipe.pfcount(analytics_key('ips', script_key))
+    unique = pipe.execute() if top else []
+    return {
+        "total_scripts": total_scripts,
+        "total_loads": int(total or 0),
+        "top_scripts": [{"script": k, "loads": loads, "unique_ips": u} for (k, loads), u in zip(top, unique)],
+        "recent_activity": _decode_events(history)
+    }
+
+def redis_analytics_script(script_key):
+    flush_before_read()
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zscore(analytics_key('loads'), script_key)
+    pipe.pfcount(analytics_key('ips', script_key))
+    pipe.hget(analytics_key('first'), script_key)
+    pipe.hget(analytics_key('last'), script_key)
+    pipe.lrange(analytics_key('recent', script_key), 0, ANALYTICS_RECENT_PER_SCRIPT - 1)
+    loads, unique, first, last, recent = pipe.execute()
+    recent = _decode_events(recent)
+    return {
+        "script": script_key,
+        "total_loads": int(loads or 0),
+        "unique_ips": unique,
+        "first_load": first.decode('utf-8') if first else None,
+        "last_load": last.decode('utf-8') if last else None,
+        "last_ip": recent[0]["ip"] if recent else None,
+        "recent_loads": recent
+    }
+
+def reset_redis_analytics():
+    with _analytics_lock:
+        _analytics_pending.clear()
+    client = get_redis()
+    keys = [analytics_key(name) for name in ('total', 'loads', 'first', 'last', 'history')]
+    keys += client.scan_iter(match=analytics_key('ips', '*'), count=1000)
+    keys += client.scan_iter(match=analytics_key('recent', '*'), count=1000)
+    for start in range(0, len(keys), 500):
+        client.delete(*keys[start:start + 500])
+
+def hottest_scripts(limit):
+    """(folder, filename) of the most loaded scripts"""
+    if ANALYTICS_BACKEND == 'redis':
+        ranked = [name.decode('utf-8') for name in get_redis().zrevrange(analytics_key('loads'), 0, limit - 1)]
+    else:
+        with _analytics_lock:
+            scripts = _analytics_state()["scripts"]
+            ranked = sorted(scripts, key=lambda key: scripts[key]["total_loads"], reverse=True)[:limit]
+    return [tuple(key.split('/', 1)) for key in ranked if '/' in key]
+
+
+# Thread-safe LRU cache used for rendered/prepared script bodies
+CACHES = []
+
+class LRUCache:
+    def __init__(self, maxsize, name):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES.append(self)
+
+    def get(self, key, default=None, valid=None):
+        """Return a cached value; entries failing the optional valid() check count as misses"""
+        with self._lock:
+            if key in self._data:
+                value = self._data[key]
+                if valid is None or valid(value):
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Return a cached value without touching its recency, the stats or stale entries"""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def touch(self, key, value):
+        """Count a hit if key still holds value (validated by the caller outside the lock), else a miss"""
+        with self._lock:
+            if value is not None and self._data.get(key) is value:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def discard(self, key, value):
+        """Drop key if it still holds value"""
+        with self._lock:
+            if self._data.get(key) is value:
+                del self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k, v in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+# Template scripts: a file such as "VPS{n}.lua" answers every URL matching the
+# pattern (VPS1.lua, VPS2.lua, ...). "${n}" in its content is replaced with the
+# value taken from the requested name. An optional parameter table next to the
+# template ("VPS{n}.lua.json") adds per-variant values:
+#   {"*": {"key": "default"}, "VPS7.lua": {"key": "special"}}
+RENDER_CACHE = LRUCache(int(os.environ.get('RENDER_CACHE_SIZE', 2048)), 'template')
+TEMPLATE_PARAM_RE = re.compile(r'\{(\w+)\}')
+TEMPLATE_VALUE_RE = re.compile(r'\$\{(\w+)\}')
+_template_index = {}
+
+def is_template_name(filename):
+    return TEMPLATE_PARAM_RE.search(filename) is not None
+
+def template_name_error(filename):
+    """Why a template name can't be compiled into a pattern, or None if it can"""
+    params = TEMPLATE_PARAM_RE.findall(filename)
+    for param in params:
+        if not param.isidentifier():
+            return f'Template parameter {{{param}}} must be a name (not starting with a digit)'
+    if len(set(params)) != len(params):
+        return 'Template parameters must have different names'
+    return None
+
+def template_pattern(template_name):
+    """Compile "VPS{n}.lua" into a regex with one named group per parameter"""
+    pattern = ''
+    pos = 0
+    for match in TEMPLATE_PARAM_RE.finditer(template_name):
+        pattern += re.escape(template_name[pos:match.start()])
+        pattern += f'(?P<{match.group(1)}>[A-Za-z0-9_\\-]+?)'
+        pos = match.end()
+    pattern += re.escape(template_name[pos:])
+    return re.compile(pattern + '$')
+
+def file_version(path):
+    """Cheap change marker for cache validation (None if the file is gone)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def fsync_paths(paths):
+    """fsync files and directories; a new or removed name is only durable once its directory is"""
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue  # gone, or a directory this platform can't open
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def write_file_atomic(path, content):
+    """Write text or bytes via a temp file and rename, so readers (and mmaps) never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if isinstance(content, bytes):
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    os.replace(tmp_path, path)
+
+# Script storage. Everything under a folder (scripts, parameter tables,
+# minified variants) is a named blob; versions are cheap change markers
+# compared by the caches. STORAGE_BACKEND picks the implementation:
+#   filesystem (default) - files under BASE_DIR, as before
+#   sqlite               - one database file (STORAGE_PATH), shared by workers
+#   memory               - a dict in this process; for tests and benchmarks
+#   pack                 - one mmapped pack file plus an overlay (see PackStorage)
+# A folder can use a sharded layout, for folders with tens of thousands of
+# scripts: each name lives in <folder>/<2 hex digits of its md5>/<name>, so no
+# directory grows large. The ".sharded" marker file in the folder switches it
+# over. shard_folder() migrates a flat folder while the server keeps running:
+# the marker is created first, then files are renamed into their shards one by
+# one. Lookups try the shard and then the flat path, so nothing goes missing
+# midway. URLs and names are unaffected.
+SHARD_MARKER = '.sharded'
+SHARD_NEW_FOLDERS = os.environ.get('SHARD_NEW_FOLDERS', '') in ('1', 'true')
+
+class FilesystemStorage:
+    def __init__(self, root):
+        self.root = root
+        self._sharded = set()  # folders seen sharded; a folder never goes back
+        # Create base directory if it doesn't exist
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, folder, name=None):
+        return os.path.join(self.root, folder) if name is None else os.path.join(self.root, folder, name)
+
+    def _shard_path(self, folder, name):
+        shard = hashlib.md5(name.encode('utf-8')).hexdigest()[:2]
+        return os.path.join(self.root, folder, shard, name)
+
+    def is_sharded(self, folder):
+        if folder in self._sharded:
+            return True
+        if os.path.exists(self._path(folder, SHARD_MARKER)):
+            self._sharded.add(folder)
+            return True
+        return False
+
+    def _paths(self, folder, name):
+        """Where a name may be stored, most likely first"""
+        flat = self._path(folder, name)
+        if folder not in self._sharded:
+            yield flat
+            # Only a miss pays for noticing that another process sharded the folder
+            if self.is_sharded(folder):
+                yield self._shard_path(folder, name)
+            return
+        shard = self._shard_path(folder, name)
+        yield shard
+        yield flat  # not migrated yet
+        yield shard  # migrated between the two checks above
+
+    def _touch_marker(self, folder):
+        # Adding or removing a name in a shard doesn't change the folder's own mtime
+        os.utime(self._path(folder, SHARD_MARKER))
+
+    def _ensure_folder(self, folder):
+        folder_path = self._path(folder)
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path, exist_ok=True)
+            if SHARD_NEW_FOLDERS:
+                open(os.path.join(folder_path, SHARD_MARKER), 'a').close()
+
+    def get(self, folder, name):
+        for path in self._paths(folder, name):
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except OSError:
+                continue
+        return None
+
+    def put(self, folder, name, data):
+        self._ensure_folder(folder)
+        if not self.is_sharded(folder):
+            write_file_atomic(self._path(folder, name), data)
+            return
+        path = self._shard_path(folder, name)
+        created = not os.path.exists(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file_atomic(path, data)
+        if created:
+            try:
+                os.remove(self._path(folder, name))  # a flat copy left over from migration
+            except FileNotFoundError:
+                pass
+            self._touch_marker(folder)
+
+    def delete(self, folder, name):
+        deleted = False
+        for path in set(self._paths(folder, name)):
+            try:
+                os.remove(path)
+                deleted = True
+            except FileNotFoundError:
+                pass
+        if deleted and folder in self._sharded:
+            self._touch_marker(folder)
+        return deleted
+
+    def create_folder(self, folder):
+        self._ensure_folder(folder)
+
+    def sync(self, folder, names):
+        """Make writes to these names (files and directory entries) durable"""
+        paths = set()
+        for name in names:
+            for path in self._paths(folder, name):
+                paths.add(path)
+                paths.add(os.path.dirname(path))
+        paths.update((self._path(folder), self.root))
+        fsync_paths(paths)
+
+    def folder_exists(self, folder):
+        return os.path.isdir(self._path(folder))
+
+    def list_folders(self):
+        return [f for f in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, f))]
+
+    def list_scripts(self, folder):
+        """Every name stored in a folder (scripts and their sidecar files)"""
+        try:
+            if not self.is_sharded(folder):
+                return [f for f in os.listdir(self._path(folder)) if not f.endswith('.tmp')]
+            names = set()
+            with os.scandir(self._path(folder)) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        names.update(f for f in os.listdir(entry.path) if not f.endswith('.tmp'))
+                    elif entry.name != SHARD_MARKER and not entry.name.endswith('.tmp'):
+                        names.add(entry.name)
+            return list(names)
+        except OSError:
+            return []
+
+    def stat(self, folder, name=None):
+        """Version of a blob, or of the folder listing when name is None"""
+        if name is None:
+            version = file_version(self._path(folder))
+            if version is not None and self.is_sharded(folder):
+                return (version, file_version(self._path(folder, SHARD_MARKER)))
+            return version
+        for path in self._paths(folder, name):
+            version = file_version(path)
+            if version is not None:
+                return version
+        return None
+
+    def local_path(self, folder, name):
+        """A real file path for sendfile/mmap, if this backend has one"""
+        for path in self._paths(folder, name):
+            if os.path.exists(path):
+                return os.path.abspath(path)
+        return os.path.abspath(self._path(folder, name))
+
+    def shard_folder(self, folder):
+        """Move a flat folder into the sharded layout; safe to rerun, returns files moved"""
+        folder_path = self._path(folder)
+        if not os.path.isdir(folder_path):
+            return 0
+        open(os.path.join(folder_path, SHARD_MARKER), 'a').close()
+        self._sharded.add(folder)
+        moved = 0
+        while True:
+            # Repeat until no flat file is left (writers that hadn't seen the marker yet)
+            with os.scandir(folder_path) as entries:
+                pending = [e.name for e in entries
+                           if e.is_file() and e.name != SHARD_MARKER and not e.name.endswith('.tmp')]
+            if not pending:
+                break
+            for name in pending:
+                target = self._shard_path(folder, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.exists(target):
+                    os.remove(os.path.join(folder_path, name))  # the shard copy is newer
+                else:
+                    os.replace(os.path.join(folder_path, name), target)
+                moved += 1
+        self._touch_marker(folder)
+        return moved
+
+class SQLiteStorage:
+    def __init__(self, path):
+        import sqlite3
+        self.path = path
+        self._sqlite3 = sqlite3
+        self._local = threading.local()
+        with self._db() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS folders (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            db.execute('CREATE TABLE IF NOT EXISTS files (folder TEXT NOT NULL, name TEXT NOT NULL, '
+                       'data BLOB NOT NULL, mtime INTEGER NOT NULL, PRIMARY KEY (folder, name))')
+
+    def _db(self):
+        """This thread's connection; connections never cross a fork into a worker"""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = self._local.db = self._sqlite3.connect(self.path, timeout=30)
+            self._local.pid = os.getpid()
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _touch_folder(self, db, folder):
+        db.execute('INSERT INTO folders VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET version = excluded.version',
+                   (folder, time.time_ns()))
+
+    def get(self, folder, name):
+        row = self._db().execute('SELECT data FROM files WHERE folder = ? AND name = ?', (folder, name)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, folder, name, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._db() as db:
+            db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)', (folder, name, data, time.time_ns()))
+            self._touch_folder(db, folder)
+
+    def delete(self, folder, name):
+        with self._db() as db:
+            deleted = db.execute('DELETE FROM files WHERE folder = ? AND name = ?', (folder, name)).rowcount
+            if deleted:
+                self._touch_folder(db, folder)
+        return bool(deleted)
+
+    def create_folder(self, folder):
+        with self._db() as db:
+            db.execute('INSERT OR IGNORE INTO folders VALUES (?, ?)', (folder, time.time_ns()))
+
+    def sync(self, folder, names):
+        # synchronous=NORMAL only syncs the WAL when it is checkpointed
+        self._db().execute('PRAGMA wal_checkpoint(FULL)')
+
+    def folder_exists(self, folder):
+        return self._db().execute('SELECT 1 FROM folders WHERE name = ?', (folder,)).fetchone() is not None
+
+    def list_folders(self):
+        return [row[0] for row in self._db().execute('SELECT name FROM folders')]
+
+    def list_scripts(self, folder):
+        return [row[0] for row in self._db().execute('SELECT name FROM files WHERE folder = ?', (folder,))]
+
+    def stat(self, folder, name=None):
+        if name is None:
+            row = self._db().execute('SELECT version FROM folders WHERE name = ?', (folder,)).fetchone()
+            return (row[0],) if row else None
+        row = self._db().execute('SELECT mtime, length(data) FROM files WHERE folder = ? AND name = ?',
+                                 (folder, name)).fetchone()
+        return tuple(row) if row else None
+
+    def local_path(self, folder, name):
+        return None
+
+class MemoryStorage:
+    def __init__(self):
+        self._folders = {}  # folder -> {name: (data, version)}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, folder, name):
+        entry = self._folders.get(folder, {}).get(name)
+        return entry[0] if entry else None
+
+    def put(self, folder, name, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._lock:
+            self._folders.setdefault(folder, {})[name] = (data, (time.time_ns(), len(data)))
+            self._versions[folder] = (time.time_ns(),)
+
+    def delete(self, folder, name):
+        with self._lock:
+            if self._folders.get(folder, {}).pop(name, None) is None:
+                return False
+            self._versions[folder] = (time.time_ns(),)
+            return True
+
+    def create_folder(self, folder):
+        with self._lock:
+            if folder not in self._folders:
+                self._folders[folder] = {}
+                self._versions[folder] = (time.time_ns(),)
+
+    def sync(self, folder, names):
+        pass
+
+    def folder_exists(self, folder):
+        return folder in self._folders
+
+    def list_folders(self):
+        return list(self._folders)
+
+    def list_scripts(self, folder):
+        return list(self._folders.get(folder, {}))
+
+    def stat(self, folder, name=None):
+        if name is None:
+            return self._versions.get(folder)
+        entry = self._folders.get(folder, {}).get(name)
+        return entry[1] if entry else None
+
+    def local_path(self, folder, name):
+        return None
+
+# Pack storage (STORAGE_BACKEND=pack): the whole script tree compiled into one
+# file, PACK_PATH = magic, header length, a JSON index of
+# [folder, name, offset, length, sha1, mtime_ns] entries, then the contents.
+# The file is mmapped and read with no per-file syscalls. Edits go to a small
+# overlay directory (files plus ".deleted" tombstones for packed names), and
+# a background thread folds the overlay back into a fresh pack. Every writer
+# touches the overlay's version file, which is the only thing readers stat to
+# notice changes made by other processes. Build a pack from lua_scripts/ with
+# "python script_server.py pack".
+PACK_PATH = os.environ.get('PACK_PATH', 'scripts.pack')
+PACK_OVERLAY = os.environ.get('PACK_OVERLAY', 'pack_overlay')
+PACK_REPACK_INTERVAL = int(os.environ.get('PACK_REPACK_INTERVAL', 300))
+PACK_REPACK_THRESHOLD = 500  # overlay entries that trigger an early repack
+PACK_MAGIC = b'SSPACK01'
+PACK_TOMBSTONE = '.deleted'
+PACK_VERSION_FILE = '.version'
+
+def write_pack(path, folders, entries):
+    """Write a pack atomically from folder names and (folder, name, data, mtime_ns) entries"""
+    index = []
+    offset = 0
+    for folder, name, data, mtime_ns in entries:
+        index.append([folder, name, offset, len(data), hashlib.sha1(data).hexdigest(), mtime_ns])
+        offset += len(data)
+    header = json.dumps({'folders': sorted(folders), 'entries': index}, separators=(',', ':')).encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PACK_MAGIC + len(header).to_bytes(8, 'little') + header)
+        for _, _, data, _ in entries:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return len(index)
+
+def read_pack(path):
+    """Map a pack; returns (mmap, {(folder, name): (offset, length, mtime_ns)}, {folder: names})"""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(PACK_MAGIC)] != PACK_MAGIC:
+        mapped.close()
+        raise ValueError(f"{path} is not a script pack")
+    header_len = int.from_bytes(mapped[8:16], 'little')
+    header = json.loads(mapped[16:16 + header_len])
+    base = 16 + header_len
+    entries = {}
+    folders = {folder: set() for folder in header['folders']}
+    for folder, name, offset, length, _, mtime_ns in header['entries']:
+        entries[(folder, name)] = (base + offset, length, mtime_ns)
+        folders.setdefault(folder, set()).add(name)
+    return mapped, entries, folders
+
+class PackStorage:
+    def __init__(self, path, overlay):
+        self.path = path
+        self.overlay = overlay
+        self._lock = threading.Lock()
+        self._pack_version = None
+        self._overlay_version = ()
+        # (mmap, {(folder, name): (offset, length, mtime_ns)}, {folder: names}),
+        # swapped as one tuple so readers never mix two packs
+        self._pack = (None, {}, {})
+        self._changes = {}  # (folder, name) -> overlay version, or None for a tombstone
+        self._overlay_folders = set()
+        # The periodic repacker is started by the first write in each process,
+        # never here: the app is imported (preloaded) before workers fork
+        self._repack_lock = threading.Lock()
+        self._repacker_pid = None
+        self._repacking = False
+        os.makedirs(overlay, exist_ok=True)
+        self._refresh()
+
+    # Reading state
+    def _refresh(self):
+        """Reload the overlay index (and the pack) if another writer changed them"""
+        version = file_version(os.path.join(self.overlay, PACK_VERSION_FILE))
+        if version == self._overlay_version:
+            return
+        with self._lock:
+            self._overlay_version = version
+            pack_version = file_version(self.path)
+            if pack_version != self._pack_version:
+                self._pack_version = pack_version
+                self._pack = read_pack(self.path) if pack_version else (None, {}, {})
+            self._load_overlay()
+
+    def _load_overlay(self):
+        changes, folders = {}, set()
+        for folder in os.listdir(self.overlay):
+            folder_path = os.path.join(self.overlay, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            folders.add(folder)
+            for name in os.listdir(folder_path):
+                if name.endswith('.tmp'):
+                    continue
+                if name.endswith(PACK_TOMBSTONE):
+                    changes.setdefault((folder, name[:-len(PACK_TOMBSTONE)]), None)
+                else:
+                    changes[(folder, name)] = file_version(os.path.join(folder_path, name))
+        self._changes, self._overlay_folders = changes, folders
+
+    def _touch_version(self):
+        version_path = os.path.join(self.overlay, PACK_VERSION_FILE)
+        with open(version_path, 'a'):
+            pass
+        os.utime(version_path)
+
+    # Storage interface
+    def get(self, folder, name):
+        self._refresh()
+        key = (folder, name)
+        if key in self._changes:
+            if self._changes[key] is None:
+                return None
+            try:
+                with open(os.path.join(self.overlay, folder, name), 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                self._overlay_version = ()  # folded into the pack meanwhile
+                return self.get(folder, name)
+        mapped, entries, _ = self._pack
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return mapped[offset:offset + length]
+
+    def put(self, folder, name, data):
+        with file_lock(self.overlay + '.lock'):
+            os.makedirs(os.path.join(self.overlay, folder), exist_ok=True)
+            write_file_atomic(os.path.join(self.overlay, folder, name), data)
+            try:
+                os.remove(os.path.join(self.overlay, folder, name + PACK_TOMBSTONE))
+            except FileNotFoundError:
+                pass
+            self._touch_version()
+        self.start_repacker()
+        if len(self._changes) >= PACK_REPACK_THRESHOLD:
+            with self._repack_lock:
+                if self._repacking:
+                    return
+                self._repacking = True
+            threading.Thread(target=self._early_repack, daemon=True).start()
+
+    def delete(self, folder, name):
+        self._refresh()
+        key = (folder, name)
+        packed = key in self._pack[1]
+        exists = (self._changes[key] is not None) if key in self._changes else packed
+        if not exists:
+            return False
+        self.start_repacker()
+        with file_lock(self.overlay + '.lock'):
+            try:
+                os.remove(os.path.join(self.overlay, folder, name))
+            except FileNotFoundError:
+                pass
+            if packed:
+                os.makedirs(os.path.join(self.overlay, folder), exist_ok=True)
+                open(os.path.join(self.overlay, folder, name + PACK_TOMBSTONE), 'w').close()
+            self._touch_version()
+        return True
+
+    def create_folder(self, folder):
+        if not self.folder_exists(folder):
+            with file_lock(self.overlay + '.lock'):
+                os.makedirs(os.path.join(self.overlay, folder), exist_ok=True)
+                self._touch_version()
+
+    def sync(self, folder, names):
+        folder_path = os.path.join(self.overlay, folder)
+        fsync_paths([os.path.join(folder_path, name + suffix) for name in names for suffix in ('', PACK_TOMBSTONE)]
+                    + [folder_path, self.overlay])
+
+    def folder_exists(self, folder):
+        self._refresh()
+        return folder in self._pack[2] or folder in self._overlay_folders
+
+    def list_folders(self):
+        self._refresh()
+        return list(set(self._pack[2]) | self._overlay_folders)
+
+    def list_scripts(self, folder):
+        self._refresh()
+        names = set(self._pack[2].get(folder, ()))
+        for (change_folder, name), version in self._changes.items():
+            if change_folder == folder:
+                if version is None:
+                    names.discard(name)
+                else:
+                    names.add(name)
+        return list(names)
+
+    def stat(self, folder, name=None):
+        self._refresh()
+        if name is None:
+            if not self.folder_exists(folder):
+                return None
+            return (self._pack_version, self._overlay_version)
+        key = (folder, name)
+        if key in self._changes:
+            return self._changes[key]
+        entry = self._pack[1].get(key)
+        # Packed entries keep the version they had as files, so repacking doesn't invalidate caches
+        return (entry[2], entry[1]) if entry else None
+
+    def local_path(self, folder, name):
+        return None
+
+    # Repacking
+    def repack(self):
+        """Fold the overlay into a new pack; returns the number of changes folded"""
+        with file_lock(self.overlay + '.lock'):
+            self._overlay_version = ()
+            self._refresh()
+            if not self._changes and self._pack_version is not None:
+                return 0
+            folded = dict(self._changes)
+            mapped, packed, packed_folders = self._pack
+            entries = []
+            for (folder, name), (offset, length, mtime_ns) in packed.items():
+                if (folder, name) not in folded:
+                    entries.append((folder, name, mapped[offset:offset + length], mtime_ns))
+            for (folder, name), version in sorted(folded.items()):
+                if version is not None:
+                    with open(os.path.join(self.overlay, folder, name), 'rb') as f:
+                        entries.append((folder, name, f.read(), version[0]))
+            entries.sort(key=lambda e: (e[0], e[1]))
+            write_pack(self.path, set(packed_folders) | self._overlay_folders, entries)
+
+            # Readers still using the overlay files see the same content in the new pack
+            for (folder, name), version in folded.items():
+                suffix = PACK_TOMBSTONE if version is None else ''
+                os.remove(os.path.join(self.overlay, folder, name + suffix))
+            for folder in self._overlay_folders:
+                try:
+                    os.rmdir(os.path.join(self.overlay, folder))
+                except OSError:
+                    pass
+            self._touch_version()
+        return len(folded)
+
+    def _repack_loop(self):
+        while True:
+            time.sleep(PACK_REPACK_INTERVAL)
+            try:
+                if self.repack():
+                    print(f"📦 Repacked {self.path}")
+            except Exception as e:
+                print(f"⚠️  Repack failed: {e}")
+
+    def _early_repack(self):
+        try:
+            self.repack()
+        except Exception as e:
+            print(f"⚠️  Repack failed: {e}")
+        finally:
+            self._repacking = False
+
+    def start_repacker(self):
+        """Start this process's periodic repack thread (once per forked worker)"""
+        pid = os.getpid()
+        if self._repacker_pid == pid:
+            return
+        with self._repack_lock:
+            if self._repacker_pid != pid:
+                self._repacker_pid = pid
+                self._repacking = False
+                threading.Thread(target=self._repack_loop, daemon=True).start()
+
+def build_pack_from_files(root, path):
+    """Compile a lua_scripts/ tree (flat or sharded folders) into a pack"""
+    source = FilesystemStorage(root)
+    folders = source.list_folders()
+    entries = []
+    for folder in folders:
+        for name in source.list_scripts(folder):
+            data = source.get(folder, name)
+            if data is not None:
+                entries.append((folder, name, data, source.stat(folder, name)[0]))
+    entries.sort(key=lambda e: (e[0], e[1]))
+    return write_pack(path, folders, entries)
+
+STORAGE_BACKENDS = {
+    'filesystem': lambda: FilesystemStorage(BASE_DIR),
+    'sqlite': lambda: SQLiteStorage(os.environ.get('STORAGE_PATH', 'scripts.db')),
+    'memory': MemoryStorage,
+    'pack': lambda: PackStorage(PACK_PATH, PACK_OVERLAY),
+}
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'filesystem')
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    raise SystemExit(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (choose from {', '.join(STORAGE_BACKENDS)})")
+STORAGE = STORAGE_BACKENDS[STORAGE_BACKEND]()
+
+# Write-ahead journal for editor writes. Each write ('put', folder, name, data)
+# or ('delete', folder, name) is appended to JOURNAL_PATH and fsync'd before it
+# is applied to STORAGE, so a crash never leaves a half-written script behind:
+# the journal is replayed on startup. Writes waiting at the same time share one
+# append and one fsync (group commit); a mass create is a single group. Once
+# the journal reaches JOURNAL_CHECKPOINT_BYTES, or writes have been waiting
+# JOURNAL_CHECKPOINT_INTERVAL seconds (and at shutdown), the files it names are
+# synced and it is emptied (a checkpoint), so it only holds recent writes.
+# Appending, applying and checkpointing happen under one cross-process lock.
+# Empty disables it; the memory backend has nothing to recover after a restart
+JOURNAL_PATH = os.environ.get('JOURNAL_PATH', '' if STORAGE_BACKEND == 'memory' else 'scripts.journal')
+JOURNAL_CHECKPOINT_BYTES = int(os.environ.get('JOURNAL_CHECKPOINT_BYTES', 4 * 1024 * 1024))
+JOURNAL_CHECKPOINT_INTERVAL = float(os.environ.get('JOURNAL_CHECKPOINT_INTERVAL', 5))
+
+_journal_pending = []  # JournalBatch objects waiting for the committer
+_journal_cond = threading.Condition()
+_journal_thread = None
+_journal_dirty_since = None  # when this process last appended to an empty journal
+
+class JournalBatch:
+    __slots__ = ('ops', 'done', 'results', 'error')
+
+    def __init__(self, ops):
+        self.ops = ops
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+def encode_journal_record(op):
+    kind, folder, name = op[:3]
+    data = op[3] if kind == 'put' else b''
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    payload = json.dumps([kind, folder, name]).encode('utf-8') + b'\n' + data
+    return len(payload).to_bytes(4, 'little') + zlib.crc32(payload).to_bytes(4, 'little') + payload
+
+def read_journal(path):
+    """Yield the complete records of a journal; a torn record at the end is ignored"""
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return
+    position = 0
+    while position + 8 <= len(content):
+        length = int.from_bytes(content[position:position + 4], 'little')
+        checksum = int.from_bytes(content[position + 4:position + 8], 'little')
+        payload = content[position + 8:position + 8 + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        header, _, data = payload.partition(b'\n')
+        kind, folder, name = json.loads(header)
+        yield (kind, folder, name, data) if kind == 'put' else (kind, folder, name)
+        position += 8 + length
+
+def apply_write(op):
+    # Held so the filesystem watcher doesn't mistake the write for an external one
+    with _own_writes_lock:
+        if op[0] == 'put':
+            STORAGE.put(op[1], op[2], op[3])
+            result = True
+        else:
+            result = STORAGE.delete(op[1], op[2])
+        if result:
+            note_own_write(op[1], op[2])
+    return result
+
+def checkpoint_journal():
+    """Make the writes in the journal durable and empty it (journal lock held)"""
+    global _journal_dirty_since
+    # Read back rather than remembered: other processes' writes are in it too
+    written = {}
+    for op in read_journal(JOURNAL_PATH):
+        written.setdefault(op[1], set()).add(op[2])
+    for folder, names in written.items():
+        STORAGE.sync(folder, names)
+    with open(JOURNAL_PATH, 'wb') as f:
+        os.fsync(f.fileno())
+    _journal_dirty_since = None
+
+def flush_journal():
+    """Checkpoint whatever the journal holds"""
+    if not JOURNAL_PATH or not os.path.exists(JOURNAL_PATH):
+        return
+    with file_lock(JOURNAL_PATH + '.lock'):
+        if os.path.getsize(JOURNAL_PATH):
+            checkpoint_journal()
+
+def commit_journal_group(batches):
+    global _journal_dirty_since
+    started = time.perf_counter()
+    records = b''.join(encode_journal_record(op) for batch in batches for op in batch.ops)
+    with file_lock(JOURNAL_PATH + '.lock'):
+        with open(JOURNAL_PATH, 'ab') as f:
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        if _journal_dirty_since is None:
+            _journal_dirty_since = time.monotonic()
+        for batch in batches:
+            try:
+                batch.results = [apply_write(op) for op in batch.ops]
+            except Exception as e:
+                batch.error = e  # reported to the caller, not retried on the next start
+        if (size >= JOURNAL_CHECKPOINT_BYTES
+                or time.monotonic() - _journal_dirty_since >= JOURNAL_CHECKPOINT_INTERVAL):
+            checkpoint_journal()
+    JOURNAL_COMMIT_SECONDS.observe(time.perf_counter() - started)
+    JOURNAL_WRITES.inc(amount=sum(len(batch.ops) for batch in batches))
+
+def journal_commit_loop():
+    while True:
+        with _journal_cond:
+            if not _journal_pending:
+                # Wake up to checkpoint once writes go quiet
+                _journal_cond.wait(JOURNAL_CHECKPOINT_INTERVAL if _journal_dirty_since is not None else None)
+            batches = list(_journal_pending)
+            _journal_pending.clear()
+        if not batches:
+            try:
+                flush_journal()
+            except Exception as e:
+                print(f"⚠️  Journal checkpoint failed: {e}")
+            continue
+        try:
+            commit_journal_group(batches)
+        except Exception as e:
+            for batch in batches:
+                batch.error = batch.error or e
+        for batch in batches:
+            batch.done.set()
+
+def commit_writes(ops):
+    """Durably apply a group of editor writes; returns one result per op (delete: existed)"""
+    global _journal_thread
+    if not ops:
+        return []
+    if not JOURNAL_PATH:
+        return [apply_write(op) for op in ops]
+    batch = JournalBatch(ops)
+    with _journal_cond:
+        if _journal_thread is None:
+            _journal_thread = threading.Thread(target=journal_commit_loop, daemon=True)
+            _journal_thread.start()
+        _journal_pending.append(batch)
+        _journal_cond.notify()
+    batch.done.wait()
+    if batch.error is not None:
+        raise batch.error
+    return batch.results
+
+def replay_journal():
+    """Re-apply writes left in the journal by a crash; returns how many there were"""
+    if not JOURNAL_PATH or not os.path.exists(JOURNAL_PATH):
+        return 0
+    with file_lock(JOURNAL_PATH + '.lock'):
+        replayed = 0
+        for op in read_journal(JOURNAL_PATH):
+            apply_write(op)
+            replayed += 1
+        if replayed or os.path.getsize(JOURNAL_PATH):
+            checkpoint_journal()
+    return replayed
+
+# Published snapshots: a folder can be served from an immutable snapshot
+# instead of its live scripts. Edits keep going to the live folder, which acts
+# as staging; publishing packs it into SNAPSHOT_DIR/<folder>/<id>.pack and
+# points the folder's "published" setting at it with a single config write, so
+# a public request reads either the old snapshot or the new one, never a mix.
+# Rolling back points the setting at an older snapshot. Public serving reads
+# through SERVED, the editor and API keep using STORAGE.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '.snapshots')
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 10))
+
+class Snapshot:
+    """Read-only storage view of one published snapshot of a folder"""
+    def __init__(self, snapshot_id, path):
+        self.id = snapshot_id
+        self._map, self._entries, _ = read_pack(path)
+
+    def get(self, folder, name):
+        entry = self._entries.get((folder, name))
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return self._map[offset:offset + length]
+
+    def stat(self, folder, name=None):
+        if name is None:
+            return ('snapshot', self.id)
+        entry = self._entries.get((folder, name))
+        return (entry[2], entry[1]) if entry else None
+
+    def list_scripts(self, folder):
+        return [name for _, name in self._entries]
+
+    def local_path(self, folder, name):
+        return None
+
+# Snapshots never change once written, so readers share them without locking
+_open_snapshots = {}  # (folder, snapshot_id) -> Snapshot
+
+def snapshot_path(folder, snapshot_id):
+    return os.path.join(SNAPSHOT_DIR, folder, snapshot_id + '.pack')
+
+def list_snapshots(folder):
+    try:
+        names = os.listdir(os.path.join(SNAPSHOT_DIR, folder))
+    except FileNotFoundError:
+        return []
+    return sorted(n[:-5] for n in names if n.endswith('.pack'))
+
+def published_snapshot(folder):
+    """The Snapshot a folder is served from, or None to serve its live scripts"""
+    snapshot_id = folder_settings(folder).get('published')
+    if not snapshot_id:
+        return None
+    snapshot = _open_snapshots.get((folder, snapshot_id))
+    if snapshot is None:
+        try:
+            snapshot = Snapshot(snapshot_id, snapshot_path(folder, snapshot_id))
+        except FileNotFoundError:
+            return None
+        _open_snapshots[(folder, snapshot_id)] = snapshot
+    return snapshot
+
+class PublishedView:
+    """Storage reads for public URLs: the published snapshot if a folder has one, else STORAGE"""
+    def get(self, folder, name):
+        return (published_snapshot(folder) or STORAGE).get(folder, name)
+
+    def stat(self, folder, name=None):
+        return (published_snapshot(folder) or STORAGE).stat(folder, name)
+
+    def list_scripts(self, folder):
+        return (published_snapshot(folder) or STORAGE).list_scripts(folder)
+
+    def local_path(self, folder, name):
+        return (published_snapshot(folder) or STORAGE).local_path(folder, name)
+
+SERVED = PublishedView()
+
+def set_published(folder, snapshot_id):
+    def change(config):
+        settings = config.setdefault('folders', {}).setdefault(folder, {})
+        if snapshot_id:
+            settings['published'] = snapshot_id
+        else:
+            settings.pop('published', None)
+    update_config(change)
+    emit_change('settings', folder)
+
+def publish_folder(folder):
+    """Snapshot the folder's current scripts and serve it; returns the snapshot id"""
+    now = time.time_ns()
+    snapshot_id = time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10**9)) + f'-{now % 10**9:09d}'
+    entries = []
+    for name in STORAGE.list_scripts(folder):
+        # Re-read anything saved while it was being copied
+        while True:
+            version = STORAGE.stat(folder, name)
+            data = STORAGE.get(folder, name)
+            if STORAGE.stat(folder, name) == version:
+                break
+        if data is not None:
+            entries.append((folder, name, data, version[0]))
+    entries.sort(key=lambda e: e[1])
+    os.makedirs(os.path.join(SNAPSHOT_DIR, folder), exist_ok=True)
+    write_pack(snapshot_path(folder, snapshot_id), [folder], entries)
+    set_published(folder, snapshot_id)
+    prune_snapshots(folder)
+    return snapshot_id
+
+def rollback_folder(folder, snapshot_id=None):
+    """Serve an older snapshot (by default the one before the current); returns its id or None"""
+    snapshots = list_snapshots(folder)
+    if snapshot_id is None:
+        current = folder_settings(folder).get('published')
+        older = [s for s in snapshots if current and s < current]
+        if not older:
+            return None
+        snapshot_id = older[-1]
+    elif snapshot_id not in snapshots:
+        return None
+    set_published(folder, snapshot_id)
+    return snapshot_id
+
+def prune_snapshots(folder):
+    current = folder_settings(folder).get('published')
+    snapshots = list_snapshots(folder)
+    for snapshot_id in snapshots[:-SNAPSHOT_KEEP] if SNAPSHOT_KEEP > 0 else []:
+        if snapshot_id != current:
+            os.remove(snapshot_path(folder, snapshot_id))
+            _open_snapshots.pop((folder, snapshot_id), None)
+
+def folder_templates(folder):
+    """Templates in a folder, most specific first; re-scanned only when the folder changes"""
+    version = SERVED.stat(folder)
+    cached = _template_index.get(folder)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    templates = []
+    if version is not None:
+        names = [f for f in SERVED.list_scripts(folder) if f.endswith('.lua') and is_template_name(f)]
+        names.sort(key=lambda n: len(TEMPLATE_PARAM_RE.sub('', n)), reverse=True)
+        for name in names:
+            try:
+                templates.append((template_pattern(name), name))
+            except re.error as e:
+                # Saved before names were checked, or copied in by hand
+                print(f"⚠️  Ignoring template {folder}/{name}: {e}")
+    _template_index[folder] = (version, templates)
+    return templates
+
+def find_template(folder, filename):
+    """Return (template_name, params) for a virtual script name, or None"""
+    for pattern, template_name in folder_templates(folder):
+        match = pattern.match(filename)
+        if match:
+            return template_name, match.groupdict()
+    return None
+
+def template_version(folder, template_name):
+    return (template_name, SERVED.stat(folder, template_name), SERVED.stat(folder, template_name + '.json'),
+            folder_settings(folder)['minify'])
+
+def render_template_script(folder, filename):
+    """Render a virtual script from its template, using the LRU cache when still valid"""
+    found = find_template(folder, filename)
+    if not found:
+        return None
+    template_name, params = found
+    version = template_version(folder, template_name)
+    
+    key = (folder, filename)
+    cached = RENDER_CACHE.get(key, valid=lambda entry: entry[0] == version)
+    if cached:
+        return cached[1]
+    
+    source = SERVED.get(folder, template_name)
+    if source is None:
+        return None
+    source = source.decode('utf-8')
+    values = {'folder': folder, 'script': filename}
+    table = SERVED.get(folder, template_name + '.json') if version[2] is not None else None
+    if table is not None:
+        table = json.loads(table)
+        values.update(table.get('*', {}))
+        values.update(table.get(filename, {}))
+    values.update(params)
+    
+    rendered = TEMPLATE_VALUE_RE.sub(lambda m: str(values.get(m.group(1), m.group(0))), source)
+    if version[3]:
+        try:
+            rendered = minify_lua(rendered)
+        except ValueError:
+            pass
+    body = rendered.encode('utf-8')
+    RENDER_CACHE.put(key, (version, body))
+    return body
+
+# Stored name served for a real script (its minified variant when enabled)
+def served_name(folder, filename):
+    if folder_settings(folder)['minify'] and SERVED.stat(folder, filename + MINIFIED_SUFFIX):
+        return filename + MINIFIED_SUFFIX
+    return filename
+
+# Any served script body: a stored script, or else a template rendering
+def read_script(folder, filename):
+    body = SERVED.get(folder, served_name(folder, filename))
+    if body is None:
+        return render_template_script(folder, filename)
+    return body
+
+def script_version(folder, filename):
+    """Change marker of whatever read_script() would return (None if it doesn't exist)"""
+    version = SERVED.stat(folder, served_name(folder, filename))
+    if version is not None:
+        return version
+    found = find_template(folder, filename)
+    if found:
+        return template_version(folder, found[0])
+    return None
+
+# Loader bundling: loadstring(game:HttpGet(".../scripts/<folder>/<name>.lua"))
+# calls that point back at this server are replaced by the referenced script,
+# recursively, so a client needs a single request. Every included script is
+# defined once as a function in a local table at the top of the bundle, which
+# also makes cycles harmless. Extra hosts that count as "this server" can be
+# listed in BUNDLE_HOSTS.
+BUNDLE_MAX_DEPTH = 16
+BUNDLE_TABLE = '__script_server_bundle'
+BUNDLE_HOSTS = {h.strip().lower() for h in os.environ.get('BUNDLE_HOSTS', '').split(',') if h.strip()}
+LOADER_RE = re.compile(
+    r'loadstring\s*\(\s*game\s*:\s*HttpGet(?:Async)?\s*\(\s*'
+    r'(["\'])https?://([^/"\']+)/scripts/([^/"\']+)/([^/"\'?#]+\.lua)(?:\?[^"\']*)?\1'
+    r'\s*(?:,\s*true\s*)?\)\s*\)'
+)
+
+def bundle_script(folder, filename, host):
+    """Return (body, [(folder, name, version)] of included scripts) or None"""
+    root = read_script(folder, filename)
+    if root is None:
+        return None
+    
+    hosts = BUNDLE_HOSTS | {host.lower()}
+    deps = [(folder, filename, script_version(folder, filename))]
+    chunks = [None]
+    index = {(folder, filename): 1}
+    
+    def inline(source, depth):
+        def replace(match):
+            ref_host, ref = match.group(2).lower(), (match.group(3), match.group(4))
+            if ref_host not in hosts:
+                return match.group(0)
+            if ref in index:
+                return f'{BUNDLE_TABLE}[{index[ref]}]'
+            # Missing scripts and runaway nesting keep the runtime HttpGet
+            if depth >= BUNDLE_MAX_DEPTH:
+                return match.group(0)
+            version = script_version(*ref)
+            body = read_script(*ref)
+            if body is None:
+                return match.group(0)
+            deps.append((ref[0], ref[1], version))
+            chunks.append(None)
+            index[ref] = len(chunks)
+            chunks[index[ref] - 1] = inline(body.decode('utf-8', errors='replace'), depth + 1)
+            return f'{BUNDLE_TABLE}[{index[ref]}]'
+        
+        return LOADER_RE.sub(replace, source)
+    
+    chunks[0] = inline(root.decode('utf-8', errors='replace'), 1)
+    if len(chunks) == 1:
+        body = root
+    else:
+        parts = [f'local {BUNDLE_TABLE} = {{}}']
+        for number, chunk in enumerate(chunks, 1):
+            parts.append(f'{BUNDLE_TABLE}[{number}] = function(...)\n{chunk}\nend')
+        parts.append(f'return {BUNDLE_TABLE}[1](...)\n')
+        body = '\n'.join(parts).encode('utf-8')
+    return body, deps
+
+# Served script cache: the exact bytes sent for a public URL (plain, template
+# variant or bundle) with the versions of every script they came from. Entries
+# are re-checked against the files at most once per SCRIPT_REVALIDATE_SECONDS,
+# so hot scripts are served without touching the disk; local edits evict them
+# immediately through the change events.
+SCRIPT_CACHE = LRUCache(int(os.environ.get('SCRIPT_CACHE_SIZE', 1024)), 'script')
+SCRIPT_REVALIDATE_SECONDS = float(os.environ.get('SCRIPT_REVALIDATE_SECONDS', 1))
+_script_revalidate_seconds = SCRIPT_REVALIDATE_SECONDS  # raised while a filesystem watcher runs
+
+class ServedScript:
+    """Bytes to send for a script URL; large files carry a path instead of a body"""
+    __slots__ = ('body', 'deps', 'checked', 'path', 'size')
+
+    def __init__(self, body, deps, path=None, size=None):
+        self.body = body
+        self.deps = deps
+        self.path = path
+        self.size = len(body) if size is None else size
+        self.checked = time.monotonic()
+
+    @property
+    def included(self):
+        return [(f, n) for f, n, _ in self.deps]
+
+    def fresh(self):
+        """True if the entry can be used without touching the disk"""
+        return time.monotonic() - self.checked < _script_revalidate_seconds
+
+    def revalidate(self):
+        if self.path and not os.path.exists(self.path):
+            return False  # moved, e.g. by shard_folder()
+        if all(script_version(f, n) == v for f, n, v in self.deps):
+            self.checked = time.monotonic()
+            return True
+        return False
+
+# Scripts at or above LARGE_SCRIPT_BYTES are not copied into the cache: the
+# Flask path hands the file to the server's sendfile support (wsgi.file_wrapper)
+# and the ASGI path slices a shared read-only mmap. Both honour Range requests.
+LARGE_SCRIPT_BYTES = int(os.environ.get('LARGE_SCRIPT_BYTES', 256 * 1024))
+MAPPED_FILES = LRUCache(int(os.environ.get('MAPPED_FILES', 64)), 'mmap')
+LARGE_SEND_CHUNK = 256 * 1024
+
+def mapped_file(path):
+    """Shared read-only mmap of a file, re-mapped when the file is replaced"""
+    version = file_version(path)
+    entry = MAPPED_FILES.get(path, valid=lambda e: e[0] == version)
+    if entry:
+        return entry[1]
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # Evicted maps are closed by the garbage collector once no request uses them
+    MAPPED_FILES.put(path, (version, mapped))
+    return mapped
+
+def parse_range(header, size):
+    """(start, end) for a single "bytes=" range, None for no/ignored range, False if unsatisfiable"""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return False
+    return start, end
+
+def served_script_key(folder, filename, bundle=False, host=''):
+    return (folder, filename, host.lower() if bundle else None)
+
+def cached_served_script(folder, filename, bundle=False, host=''):
+    """Cache lookup that never does I/O; None means load_served_script() is needed
+
+    Stale entries are left in place so load_served_script() can revalidate them
+    with a stat instead of reading and preparing the script again.
+    """
+    key = served_script_key(folder, filename, bundle, host)
+    entry = SCRIPT_CACHE.peek(key)
+    if entry is None or not entry.fresh():
+        return None
+    return SCRIPT_CACHE.get(key)
+
+# Single-flight loading: when many requests miss on the same URL at once (a
+# restart, or a popular script just edited) only the first one reads and
+# prepares it; the others wait for that result instead of repeating the work.
+_script_loads = {}  # served_script_key -> ScriptLoad in progress
+_script_loads_lock = threading.Lock()
+
+class ScriptLoad:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def load_served_script(folder, filename, bundle=False, host=''):
+    """The ServedScript for a public script URL, or None if it doesn't exist"""
+    key = served_script_key(folder, filename, bundle, host)
+    # Revalidated outside the cache lock: it stats files and may list the folder
+    entry = SCRIPT_CACHE.peek(key)
+    if entry is not None and not (entry.fresh() or entry.revalidate()):
+        SCRIPT_CACHE.discard(key, entry)
+        entry = None
+    if SCRIPT_CACHE.touch(key, entry):
+        return entry
+
+    with _script_loads_lock:
+        load = _script_loads.get(key)
+        leader = load is None
+        if leader:
+            load = _script_loads[key] = ScriptLoad()
+    if not leader:
+        SCRIPT_LOADS_COALESCED.inc()
+        load.done.wait()
+        if load.error is not None:
+            raise load.error
+        return load.result
+
+    try:
+        load.result = _load_served_script(key, folder, filename, bundle, host)
+    except Exception as e:
+        load.error = e
+        raise
+    finally:
+        with _script_loads_lock:
+            del _script_loads[key]
+        load.done.set()
+    return load.result
+
+def _load_served_script(key, folder, filename, bundle, host):
+    if bundle:
+        bundled = bundle_script(folder, filename, host)
+        if bundled is None:
+            return None
+        entry = ServedScript(*bundled)
+    else:
+        # Version first: a write racing with the read leaves a mismatch, not a stale entry
+        version = script_version(folder, filename)
+        name = served_name(folder, filename)
+        path = SERVED.local_path(folder, name)
+        path_version = SERVED.stat(folder, name)
+        if path and path_version is not None and path_version == version and path_version[1] >= LARGE_SCRIPT_BYTES:
+            # Large files stay on disk and are sent with sendfile/mmap
+            entry = ServedScript(None, [(folder, filename, version)], path=path, size=version[1])
+        else:
+            body = read_script(folder, filename)
+            if body is None:
+                return None
+            entry = ServedScript(body, [(folder, filename, version)])
+    SCRIPT_CACHE.put(key, entry)
+    return entry
+
+def evict_served_scripts(event):
+    if event['type'] in ('settings', 'deleted', 'saved', 'created'):
+        changed = set(event.get('names') or [event['script']])
+        # Settings and template edits can change any script served from the folder
+        whole_folder = event['type'] == 'settings' or any(n and is_template_name(n) for n in changed)
+        SCRIPT_CACHE.discard_where(lambda key, entry: any(
+            f == event['folder'] and (whole_folder or n in changed)
+            for f, n, _ in entry.deps
+        ))
+
+CHANGE_LISTENERS.append(evict_served_scripts)
+
+# Lua minification: comments are dropped and whitespace collapsed using a real
+# tokenizer, so strings (including [[long strings]]) are never touched. The
+# result is stored next to the original as "<name>.lua.min" and served instead
+# of it when the folder has minify enabled; the editor keeps the readable file.
+MINIFIED_SUFFIX = '.min'
+LUA_NUMBER_RE = re.compile(
+    r'0[xX][0-9a-fA-F_]*(?:\.[0-9a-fA-F_]*)?(?:[pP][+-]?[0-9]+)?'
+    r'|0[bB][01_]+'
+    r'|(?:[0-9][0-9_]*(?:\.[0-9_]*)?|\.[0-9][0-9_]*)(?:[eE][+-]?[0-9]+)?'
+)
+LUA_NAME_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+LUA_LONG_BRACKET_RE = re.compile(r'\[(=*)\[')
+LUA_OPERATORS = sorted([
+    '...', '..=', '//=', '..', '==', '~=', '<=', '>=', '//', '::', '<<', '>>', '->',
+    '+=', '-=', '*=', '/=', '%=', '^=',
+    '+', '-', '*', '/', '%', '^', '#', '&', '~', '|', '<', '>', '=', '(', ')',
+    '{', '}', '[', ']', ';', ':', ',', '.', '?'
+], key=len, reverse=True)
+# Character pairs that would lex differently if two tokens were glued together
+LUA_GLUE_PAIRS = {'==', '~=', '<=', '>=', '//', '::', '..', '--', '[[', '[=',
+                  '+=', '-=', '*=', '/=', '%=', '^=', '->', '<<', '>>'}
+
+def tokenize_lua(source):
+    """Yield (kind, text, newline_before) for each token; comments are skipped"""
+    pos = 0
+    length = len(source)
+    newline = False
+    if source.startswith('#'):
+        pos = source.find('\n')
+        pos = length if pos == -1 else pos
     
-    save_analytics(analytics)
-    return analytics
+    while pos < length:
+        ch = source[pos]
+        if ch in ' \t\r\n\f\v':
+            newline = newline or ch == '\n'
+            pos += 1
+            continue
+        
+        if source.startswith('--', pos):
+            long = LUA_LONG_BRACKET_RE.match(source, pos + 2)
+            if long:
+                close = source.find(']' + long.group(1) + ']', long.end())
+                if close == -1:
+                    raise ValueError('unfinished long comment')
+                newline = newline or '\n' in source[pos:close]
+                pos = close + len(long.group(1)) + 2
+            else:
+                end = source.find('\n', pos)
+                pos = length if end == -1 else end
+            continue
+        
+        start = pos
+        if ch in '"\'`':
+            pos += 1
+            while pos < length and source[pos] != ch:
+                if source[pos] == '\\':
+                    pos += 1
+                elif source[pos] == '\n' and ch != '`':
+                    raise ValueError('unfinished string')
+                pos += 1
+            if pos >= length:
+                raise ValueError('unfinished string')
+            pos += 1
+            kind = 'string'
+        elif ch == '[' and LUA_LONG_BRACKET_RE.match(source, pos):
+            long = LUA_LONG_BRACKET_RE.match(source, pos)
+            close = source.find(']' + long.group(1) + ']', long.end())
+            if close == -1:
+                raise ValueError('unfinished long string')
+            pos = close + len(long.group(1)) + 2
+            kind = 'string'
+        elif ch.isdigit() or (ch == '.' and pos + 1 < length and source[pos + 1].isdigit()):
+            pos = LUA_NUMBER_RE.match(source, pos).end()
+            kind = 'number'
+        elif ch.isalpha() or ch == '_':
+            pos = LUA_NAME_RE.match(source, pos).end()
+            kind = 'name'
+        else:
+            for op in LUA_OPERATORS:
+                if source.startswith(op, pos):
+                    pos += len(op)
+                    break
+            else:
+                raise ValueError(f'unexpected character {ch!r}')
+            kind = 'op'
+        
+        yield kind, source[start:pos], newline
+        newline = False
+
+def minify_lua(source):
+    """Strip comments and collapse whitespace; raises ValueError on unlexable input"""
+    out = []
+    prev_kind = prev_text = None
+    for kind, text, newline in tokenize_lua(source):
+        if prev_text is not None:
+            word_prev = prev_kind in ('name', 'number')
+            word_next = kind in ('name', 'number')
+            if word_prev and word_next:
+                sep = True
+            elif prev_kind == 'number' and (text[0] == '.' or text[0].isalnum() or text[0] == '_'):
+                sep = True
+            else:
+                sep = prev_text[-1] + text[0] in LUA_GLUE_PAIRS
+            
+            if newline and text == '(':
+                # Luau rejects "f\n(" as ambiguous, so keep that line break
+                out.append('\n')
+            elif sep:
+                out.append('\n' if newline else ' ')
+        out.append(text)
+        prev_kind, prev_text = kind, text
+    return ''.join(out) + '\n'
+
+def minified_writes(folder, filename, content):
+    """Writes that refresh (or remove) the stored minified variant of a script"""
+    min_name = filename + MINIFIED_SUFFIX
+    minified = None
+    if folder_settings(folder)['minify'] and not is_template_name(filename):
+        try:
+            minified = minify_lua(content)
+        except ValueError as e:
+            print(f"⚠️  Not minifying {folder}/{filename}: {e}")
+    
+    if minified is None:
+        return [('delete', folder, min_name)] if STORAGE.stat(folder, min_name) is not None else []
+    return [('put', folder, min_name, minified)]
+
+def minify_folder(folder):
+    """(Re)build or drop the minified variants of every script in a folder"""
+    writes = []
+    for filename in STORAGE.list_scripts(folder):
+        if filename.endswith('.lua'):
+            content = STORAGE.get(folder, filename)
+            if content is not None:
+                writes += minified_writes(folder, filename, content.decode('utf-8'))
+    commit_writes(writes)
 
 # Default credentials (you should change these!)
 DEFAULT_CONFIG = {
@@ -90,19 +2175,744 @@ DEFAULT_CONFIG = {
     "password": "changeme123"  # CHANGE THIS!
 }
 
-# Create base directory if it doesn't exist
-os.makedirs(BASE_DIR, exist_ok=True)
-
 # Load or create config
 if os.path.exists(CONFIG_FILE):
     with open(CONFIG_FILE, 'r') as f:
         CONFIG = json.load(f)
 else:
-    CONFIG = DEFAULT_CONFIG
+    CONFIG = dict(DEFAULT_CONFIG)
     with open(CONFIG_FILE, 'w') as f:
         json.dump(CONFIG, f, indent=2)
     print(f"⚠️  Created config file. Default password: {DEFAULT_CONFIG['password']}")
 
+def update_config(change):
+    """Apply change(config) to the config file as one locked read-modify-write
+
+    The file is re-read under the lock, so concurrent updates from other
+    workers (a minify toggle, a publish) are never overwritten with a stale copy.
+    """
+    global _config_version
+    with file_lock(CONFIG_FILE + '.lock'):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                fresh = json.load(f)
+        except (OSError, ValueError):
+            fresh = json.loads(json.dumps(CONFIG))
+        change(fresh)
+        write_file_atomic(CONFIG_FILE, json.dumps(fresh, indent=2))
+        _config_version = file_version(CONFIG_FILE)
+        _adopt_config(fresh)
+
+# Other worker processes may change the config file; re-read it when it
+# changes, checking at most once per CONFIG_RELOAD_INTERVAL seconds
+CONFIG_RELOAD_INTERVAL = 1.0
+_config_version = file_version(CONFIG_FILE)
+_config_checked = time.monotonic()
+
+def config_refresh_due():
+    """Whether the next refresh_config() will stat (and maybe read) the config file"""
+    return time.monotonic() - _config_checked >= CONFIG_RELOAD_INTERVAL
+
+def refresh_config(force=False):
+    global _config_version, _config_checked
+    now = time.monotonic()
+    if not force and now - _config_checked < CONFIG_RELOAD_INTERVAL:
+        return
+    _config_checked = now
+    version = file_version(CONFIG_FILE)
+    if version != _config_version:
+        _config_version = version
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                fresh = json.load(f)
+        except (OSError, ValueError):
+            return
+        _adopt_config(fresh)
+
+def _adopt_config(fresh):
+    # Update in place without emptying it first; other threads read it meanwhile
+    CONFIG.update(fresh)
+    for key in set(CONFIG) - set(fresh):
+        del CONFIG[key]
+
+# The session signing key must be the same in every worker process
+if not CONFIG.get('secret_key'):
+    update_config(lambda config: config.setdefault('secret_key', secrets.token_hex(32)))
+app.secret_key = os.environ.get('SECRET_KEY') or CONFIG['secret_key']
+if ANALYTICS_BACKEND == 'file':
+    # Read once here so the request path never has to
+    reload_analytics()
+mark_startup_phase('config')
+
+# Redis is optional; REDIS_URL enables the features that use it
+REDIS_URL = os.environ.get('REDIS_URL')
+_redis_client = None
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.from_url(REDIS_URL or 'redis://localhost:6379')
+    return _redis_client
+
+# With REDIS_URL set, every change event is also published on CHANGE_CHANNEL
+# and each process (every worker of every instance) relays the events of the
+# others into its own listeners: caches evict the affected entries and editors
+# connected here see the change live. If the subscriber loses its connection
+# it reconnects with backoff and then resyncs fully (caches dropped, editors
+# told to reload), since messages sent meanwhile are lost. A publisher that
+# could not reach Redis asks everyone to resync once it gets through again.
+CHANGE_CHANNEL = 'script_server:changes'
+CHANGE_RELAY_HEALTH_CHECK = 15
+_process_id = (None, None)  # (pid, id) of this process on CHANGE_CHANNEL
+
+def process_id():
+    """Sender id for CHANGE_CHANNEL, new in every forked worker (the app is preloaded)"""
+    global _process_id
+    pid = os.getpid()
+    if _process_id[0] != pid:
+        _process_id = (pid, secrets.token_hex(8))
+    return _process_id[1]
+
+_change_relay_thread = None
+_change_relay_lock = threading.Lock()
+_change_publish_failed = False
+
+def publish_change(event):
+    global _change_publish_failed
+    if event.get('remote'):
+        return
+    # inotify watchers run in every worker; a polling watcher only in one per
+    # instance, which passes what it sees on to the others
+    if event.get('watched'):
+        if not _fs_watch_polling:
+            return
+        event = dict(event, scope=FS_WATCH_SCOPE)
+    try:
+        client = get_redis()
+        if _change_publish_failed:
+            client.publish(CHANGE_CHANNEL, json.dumps({'type': 'resync', 'instance': process_id()}))
+            _change_publish_failed = False
+        client.publish(CHANGE_CHANNEL, json.dumps(dict(event, instance=process_id())))
+        CHANGE_EVENTS_RELAYED.inc('published')
+    except Exception:
+        _change_publish_failed = True
+        raise
+
+def resync_local_state():
+    """Forget everything cached from storage after change events may have been missed"""
+    SCRIPT_CACHE.clear()
+    RENDER_CACHE.clear()
+    _template_index.clear()
+    refresh_config(force=True)
+    broadcast_event({"type": "resync", "folder": None, "script": None})
+
+def apply_remote_change(event):
+    if event.get('instance') == process_id():
+        return
+    # Other instances watch their own disk
+    if event.get('watched') and event.get('scope') != FS_WATCH_SCOPE:
+        return
+    CHANGE_EVENTS_RELAYED.inc('received')
+    if event['type'] == 'resync':
+        resync_local_state()
+        return
+    if event['type'] == 'settings':
+        refresh_config(force=True)
+    event['remote'] = True
+    for listener in list(CHANGE_LISTENERS):
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"⚠️  Change listener failed: {e}")
+
+def _change_relay_loop():
+    import redis
+    backoff = 1
+    connected_before = False
+    while True:
+        try:
+            client = redis.from_url(REDIS_URL, health_check_interval=CHANGE_RELAY_HEALTH_CHECK)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANGE_CHANNEL)
+            if connected_before:
+                print("🔄 Change relay reconnected, resyncing")
+                resync_local_state()
+            connected_before = True
+            backoff = 1
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message and message['type'] == 'message':
+                    apply_remote_change(json.loads(message['data']))
+        except Exception as e:
+            print(f"⚠️  Change relay disconnected ({e}), retrying in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+def start_change_relay():
+    global _change_relay_thread
+    if not REDIS_URL or _change_relay_thread is not None:
+        return
+    with _change_relay_lock:
+        if _change_relay_thread is None:
+            _change_relay_thread = threading.Thread(target=_change_relay_loop, daemon=True)
+            _change_relay_thread.start()
+
+if REDIS_URL:
+    CHANGE_LISTENERS.append(publish_change)
+
+# Filesystem watcher: scripts copied into BASE_DIR behind the server's back
+# (rsync, git pull, an editor on the host) produce the same change events as
+# the API, marked "watched", so caches are evicted and editors refresh. Uses
+# inotify through ctypes on Linux, where every worker watches for itself (which
+# also makes it notice saves made by the other workers). Elsewhere the tree is
+# rescanned every FS_WATCH_INTERVAL seconds by a single worker per instance,
+# elected by holding a lock on FS_WATCH_PIDFILE; it passes changes on to the
+# other workers through the change relay. Workers that learn about changes
+# trust cached scripts for FS_WATCH_REVALIDATE_SECONDS instead of re-checking
+# them every SCRIPT_REVALIDATE_SECONDS. Only used with the filesystem storage
+# backend.
+FS_WATCH = os.environ.get('FS_WATCH', 'auto')  # auto, inotify, poll or off
+FS_WATCH_INTERVAL = float(os.environ.get('FS_WATCH_INTERVAL', 2))
+FS_WATCH_PIDFILE = os.environ.get('FS_WATCH_PIDFILE', '.fs_watch.pid')
+FS_WATCH_REVALIDATE_SECONDS = 60
+FS_WATCH_SCOPE = f'{socket.gethostname()}:{os.path.realpath(BASE_DIR)}'  # relayed watched events apply here
+OWN_WRITE_SECONDS = 60  # how long a write of ours waits for the watcher to report it
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_fs_watcher_thread = None
+_fs_watch_polling = False
+_fs_watch_lock = threading.Lock()
+_fs_watch_pidfile = None  # held open (and locked) by the instance's elected watcher
+_own_writes = {}  # (folder, name) -> (version, time) written by this process, oldest first
+_own_writes_lock = threading.Lock()
+
+def note_own_write(folder, name):
+    """Remember a write this process made (call with _own_writes_lock held)"""
+    if _fs_watcher_thread is None or (_fs_watch_polling and _fs_watch_pidfile is None):
+        return
+    now = time.monotonic()
+    # Writes the watcher never reported (e.g. changed back before a rescan) expire
+    while _own_writes:
+        key = next(iter(_own_writes))
+        if now - _own_writes[key][1] < OWN_WRITE_SECONDS:
+            break
+        del _own_writes[key]
+    _own_writes.pop((folder, name), None)
+    _own_writes[(folder, name)] = (STORAGE.stat(folder, name), now)
+
+def fs_watch_leader():
+    """True if this process is the instance's elected watcher, taking over a free pidfile"""
+    global _fs_watch_pidfile
+    if _fs_watch_pidfile is not None:
+        return True
+    if _fs_watcher_thread is None:
+        return False
+    with _fs_watch_lock:
+        if _fs_watch_pidfile is None:
+            pidfile = open(FS_WATCH_PIDFILE, 'a+')
+            try:
+                if fcntl:
+                    fcntl.flock(pidfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                pidfile.close()
+                return False
+            # The lock goes away with the process, so a new leader takes over
+            pidfile.truncate(0)
+            pidfile.write(f'{os.getpid()}\n')
+            pidfile.flush()
+            _fs_watch_pidfile = pidfile
+    return True
+
+def announce_external_change(folder, name, removed=False):
+    """Emit the change event for a file the watcher saw change (a hint; storage decides)"""
+    if name.startswith('.') or name.endswith('.tmp'):
+        return
+    script = name
+    for suffix in ('.json', MINIFIED_SUFFIX):
+        if name.endswith('.lua' + suffix):
+            script = name[:-len(suffix)]
+    if not script.endswith('.lua'):
+        return
+    with _own_writes_lock:
+        version = STORAGE.stat(folder, name)
+        if (folder, name) in _own_writes and _own_writes.pop((folder, name))[0] == version:
+            return
+    # Removed from one place but still there: moved between shard directories,
+    # or replaced, which has its own event
+    if removed and version is not None:
+        return
+    # A sidecar coming or going changes what its script serves
+    if version is None and script == name:
+        emit_change('deleted', folder, script, watched=True)
+    else:
+        emit_change('saved', folder, script, watched=True)
+
+def scan_versions():
+    """{(folder, name): version} of every file under BASE_DIR, flat or sharded"""
+    versions = {}
+    for folder in os.scandir(BASE_DIR):
+        if not folder.is_dir():
+            continue
+        for entry in os.scandir(folder.path):
+            entries = os.scandir(entry.path) if entry.is_dir() else [entry]
+            for file_entry in entries:
+                try:
+                    st = file_entry.stat()
+                except OSError:
+                    continue
+                versions[(folder.name, file_entry.name)] = (st.st_mtime_ns, st.st_size)
+    return versions
+
+def _poll_watch_loop():
+    global _script_revalidate_seconds
+    while not fs_watch_leader():
+        time.sleep(FS_WATCH_INTERVAL)
+    _script_revalidate_seconds = max(SCRIPT_REVALIDATE_SECONDS, FS_WATCH_REVALIDATE_SECONDS)
+    known = scan_versions()
+    folders = {folder for folder, _ in known} | set(STORAGE.list_folders())
+    while True:
+        time.sleep(FS_WATCH_INTERVAL)
+        try:
+            current = scan_versions()
+            for folder in set(STORAGE.list_folders()) - folders:
+                emit_change('folder_created', folder, watched=True)
+            folders |= set(STORAGE.list_folders())
+            for key in set(known) | set(current):
+                if known.get(key) != current.get(key):
+                    announce_external_change(*key)
+            known = current
+        except Exception as e:
+            print(f"⚠️  Filesystem watcher: {e}")
+
+def _inotify_watch_loop(libc, fd):
+    import ctypes
+    watches = {}  # watch descriptor -> folder (None for BASE_DIR itself)
+
+    def watch(path, folder, announce):
+        wd = libc.inotify_add_watch(fd, os.fsencode(path), INOTIFY_MASK)
+        if wd < 0:
+            print(f"⚠️  Can't watch {path} (errno {ctypes.get_errno()}); raise fs.inotify.max_user_watches")
+            return
+        watches[wd] = folder
+        for entry in os.scandir(path):
+            if entry.is_dir():
+                watch(entry.path, folder or entry.name, announce)
+            elif folder and announce:
+                # Written into a new directory before it was being watched
+                announce_external_change(folder, entry.name)
+
+    watch(BASE_DIR, None, False)
+    while True:
+        buffer = os.read(fd, 256 * 1024)
+        try:
+            _handle_inotify_events(buffer, watches, watch)
+        except Exception as e:
+            print(f"⚠️  Filesystem watcher: {e}")
+
+def _handle_inotify_events(buffer, watches, watch):
+    import struct
+    events = []
+    position = 0
+    while position < len(buffer):
+        wd, mask, cookie, length = struct.unpack_from('iIII', buffer, position)
+        name = buffer[position + 16:position + 16 + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+        position += 16 + length
+        events.append((wd, mask, cookie, name))
+    
+    if any(mask & IN_Q_OVERFLOW for _, mask, _, _ in events):
+        resync_local_state()
+        return
+    # A rename to the same name in another directory of the folder is a shard move
+    moves = {}
+    for wd, mask, cookie, name in events:
+        if mask & (IN_MOVED_FROM | IN_MOVED_TO) and wd in watches:
+            moves.setdefault(cookie, []).append((watches[wd], name))
+    shard_moves = {cookie for cookie, ends in moves.items() if len(ends) == 2 and ends[0] == ends[1]}
+    changed = {}  # (folder, name) -> removed, in order
+    for wd, mask, cookie, name in events:
+        folder = watches.get(wd)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                path = os.path.join(BASE_DIR, *([folder] if folder else []), name)
+                # Files already in a new folder are announced; a new shard directory
+                # only receives files moved there by sharding
+                watch(path, folder or name, folder is None)
+                if folder is None:
+                    emit_change('folder_created', name, watched=True)
+        elif folder and mask & (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE):
+            if mask & (IN_MOVED_FROM | IN_MOVED_TO) and cookie in shard_moves:
+                continue
+            # A later event for the same name wins (e.g. deleted, then written again)
+            changed.pop((folder, name), None)
+            changed[(folder, name)] = bool(mask & (IN_MOVED_FROM | IN_DELETE))
+    for (folder, name), removed in changed.items():
+        announce_external_change(folder, name, removed)
+
+def _inotify():
+    """(libc, inotify fd), or None where inotify isn't available"""
+    if not sys.platform.startswith('linux'):
+        return None
+    import ctypes
+    import ctypes.util
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    return (libc, fd) if fd >= 0 else None
+
+def start_fs_watcher():
+    global _fs_watcher_thread, _fs_watch_polling, _script_revalidate_seconds
+    if _fs_watcher_thread is not None or FS_WATCH == 'off' or STORAGE_BACKEND != 'filesystem':
+        return
+    with _fs_watch_lock:
+        if _fs_watcher_thread is not None:
+            return
+        inotify = _inotify() if FS_WATCH in ('auto', 'inotify') else None
+        if inotify:
+            target, args = _inotify_watch_loop, inotify
+        else:
+            if FS_WATCH == 'inotify':
+                print("⚠️  inotify isn't available, watching by polling instead")
+            target, args = _poll_watch_loop, ()
+            _fs_watch_polling = True
+        _fs_watcher_thread = threading.Thread(target=target, args=args, daemon=True)
+        _fs_watcher_thread.start()
+        # Without a relay, workers that don't poll only notice changes by re-checking
+        if inotify or REDIS_URL:
+            _script_revalidate_seconds = max(SCRIPT_REVALIDATE_SECONDS, FS_WATCH_REVALIDATE_SECONDS)
+
+# Writes a crash left in the journal (see commit_writes())
+_replayed = replay_journal()
+if _replayed:
+    print(f"📒 Replayed {_replayed} journaled writes")
+
+# Sessions. SESSION_BACKEND=signed (default) keeps the whole session in a
+# compact signed, expiring cookie that is verified in-process; recently seen
+# tokens skip even the HMAC check. Logging out puts the session id on a small
+# denylist shared by the workers through SESSION_DENYLIST_FILE (and by other
+# servers through Redis when REDIS_URL is set). SESSION_BACKEND=redis keeps
+# the previous server-side sessions in Redis.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'signed')
+SESSION_LIFETIME = int(os.environ.get('SESSION_LIFETIME', 12 * 3600))
+SESSION_DENYLIST_FILE = "session_denylist.json"
+SESSION_DENYLIST_SYNC_SECONDS = 5
+DENYLIST_REDIS_KEY = 'script_server:revoked_sessions'
+
+_denylist = {}
+_denylist_lock = threading.Lock()
+_denylist_version = None
+_denylist_checked = 0.0
+_denylist_synced = 0.0
+
+def _refresh_denylist():
+    """Pick up revocations from other workers/servers, at most once per second"""
+    global _denylist_version, _denylist_checked, _denylist_synced
+    now = time.monotonic()
+    if now - _denylist_checked < 1.0:
+        return
+    _denylist_checked = now
+    
+    version = file_version(SESSION_DENYLIST_FILE)
+    if version != _denylist_version:
+        _denylist_version = version
+        try:
+            with open(SESSION_DENYLIST_FILE, 'r') as f:
+                revoked = json.load(f)
+        except (OSError, ValueError):
+            revoked = {}
+        with _denylist_lock:
+            _denylist.update(revoked)
+    
+    if REDIS_URL and now - _denylist_synced >= SESSION_DENYLIST_SYNC_SECONDS:
+        _denylist_synced = now
+        try:
+            remote = get_redis().zrangebyscore(DENYLIST_REDIS_KEY, time.time(), '+inf', withscores=True)
+        except Exception as e:
+            print(f"⚠️  Session denylist sync failed: {e}")
+        else:
+            with _denylist_lock:
+                _denylist.update({sid.decode(): expires for sid, expires in remote})
+
+def is_session_revoked(sid):
+    _refresh_denylist()
+    return sid in _denylist
+
+def revoke_session(sid):
+    """Reject a session id until its tokens would have expired anyway"""
+    if not sid:
+        return
+    now = time.time()
+    expires = now + SESSION_LIFETIME
+    with _denylist_lock:
+        _denylist[sid] = expires
+        for old in [k for k, v in _denylist.items() if v < now]:
+            del _denylist[old]
+        with file_lock(SESSION_DENYLIST_FILE + '.lock'):
+            try:
+                with open(SESSION_DENYLIST_FILE, 'r') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+            stored = {k: v for k, v in stored.items() if v >= now}
+            stored[sid] = expires
+            tmp_path = f"{SESSION_DENYLIST_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, SESSION_DENYLIST_FILE)
+    if REDIS_URL:
+        try:
+            pipe = get_redis().pipeline()
+            pipe.zadd(DENYLIST_REDIS_KEY, {sid: expires})
+            pipe.zremrangebyscore(DENYLIST_REDIS_KEY, '-inf', now)
+            pipe.execute()
+        except Exception as e:
+            print(f"⚠️  Could not publish session revocation: {e}")
+
+class SignedSessionInterface(SessionInterface):
+    """Sessions stored in a signed, expiring cookie token; no server round trip"""
+    salt = 'script-server-session'
+
+    def __init__(self):
+        self._serializer = None
+        self._verified = LRUCache(4096, 'session')
+
+    def serializer(self, app):
+        if self._serializer is None:
+            self._serializer = URLSafeTimedSerializer(app.secret_key, salt=self.salt)
+        return self._serializer
+
+    def open_session(self, app, request):
+        token = request.cookies.get(self.get_cookie_name(app))
+        if not token:
+            return SecureCookieSession()
+        
+        now = time.time()
+        cached = self._verified.get(token, valid=lambda entry: entry[1] > now)
+        if cached:
+            data = cached[0]
+        else:
+            try:
+                data, issued = self.serializer(app).loads(token, max_age=SESSION_LIFETIME, return_timestamp=True)
+            except BadSignature:
+                return SecureCookieSession()
+            self._verified.put(token, (data, issued.timestamp() + SESSION_LIFETIME))
+        
+        if is_session_revoked(data.get('_sid')):
+            return SecureCookieSession()
+        return SecureCookieSession(dict(data))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+        
+        session.setdefault('_sid', secrets.token_urlsafe(12))
+        response.set_cookie(
+            name, self.serializer(app).dumps(dict(session)),
+            httponly=True, domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app) or 'Lax'
+        )
+
+if SESSION_BACKEND == 'redis':
+    from flask_session import Session
+    
+    # Configure Redis session storage
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_PERMANENT'] = False
+    app.config['SESSION_USE_SIGNER'] = True
+    app.config['SESSION_REDIS'] = get_redis()
+    
+    # Initialize session
+    Session(app)
+else:
+    app.session_interface = SignedSessionInterface()
+mark_startup_phase('sessions')
+
+# Per-folder options, stored under "folders" in the config file
+FOLDER_SETTING_DEFAULTS = {
+    "minify": False,
+    "rate_limit": 0,  # public requests per minute per client, 0 for RATE_LIMIT
+    "cache_max_age": 0,  # seconds a CDN may cache public scripts, 0 for CDN_MAX_AGE
+    "stale_while_revalidate": 0  # 0 for CDN_STALE_WHILE_REVALIDATE
+}
+
+def folder_settings(folder, refresh=True):
+    if refresh:
+        refresh_config()
+    settings = dict(FOLDER_SETTING_DEFAULTS)
+    settings.update(CONFIG.get('folders', {}).get(folder, {}))
+    return settings
+
+# Rate limiting for public script URLs: one token bucket per (client IP,
+# folder), refilled at the folder's rate_limit (or RATE_LIMIT) per minute and
+# holding up to RATE_LIMIT_BURST tokens (default: one minute's worth). Only the
+# RATE_LIMIT_CLIENTS most recently seen buckets are kept; a client pushed out
+# comes back with a full bucket. Limits apply per worker process.
+RATE_LIMIT = int(os.environ.get('RATE_LIMIT', 0))  # 0 disables it
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 0))
+RATE_LIMIT_CLIENTS = int(os.environ.get('RATE_LIMIT_CLIENTS', 100000))
+
+class TokenBuckets:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def take(self, key, per_minute, burst):
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        rate = per_minute / 60
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                if len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / rate
+
+_rate_buckets = TokenBuckets(RATE_LIMIT_CLIENTS)
+
+def rate_limit_wait(folder, ip_address, settings=None):
+    """Seconds a client must wait before fetching from the folder again (0: go ahead)"""
+    per_minute = (settings or folder_settings(folder))['rate_limit'] or RATE_LIMIT
+    if per_minute <= 0:
+        return 0
+    wait = _rate_buckets.take((ip_address, folder), per_minute, RATE_LIMIT_BURST or per_minute)
+    if wait:
+        RATE_LIMITED.inc(folder)
+    return wait
+
+# CDN support. Public scripts carry a Cache-Control policy (per folder, or the
+# CDN_* defaults) and surrogate keys naming every script they contain plus
+# their folders, so a purge by key drops exactly the affected responses,
+# bundles included. Local changes are sent to CDN_PURGE_URL as
+# {"keys": [...]} by a background thread that merges bursts into one request.
+# Loads served by the edge never reach us; the CDN reports them to
+# /api/edge/hits instead (see edge_hits()).
+CDN_MAX_AGE = int(os.environ.get('CDN_MAX_AGE', 0))
+CDN_STALE_WHILE_REVALIDATE = int(os.environ.get('CDN_STALE_WHILE_REVALIDATE', 0))
+CDN_KEY_HEADER = os.environ.get('CDN_KEY_HEADER', 'Surrogate-Key')
+CDN_PURGE_URL = os.environ.get('CDN_PURGE_URL')
+# Checked now: urlopen() would only reject it inside the purge thread
+if CDN_PURGE_URL and not (urlsplit(CDN_PURGE_URL).scheme in ('http', 'https') and urlsplit(CDN_PURGE_URL).netloc):
+    raise SystemExit(f"CDN_PURGE_URL must be an http(s) URL, not {CDN_PURGE_URL!r}")
+CDN_PURGE_TOKEN = os.environ.get('CDN_PURGE_TOKEN')
+CDN_INGEST_TOKEN = os.environ.get('CDN_INGEST_TOKEN')
+CDN_PURGE_DELAY = 0.5  # seconds to gather a burst of changes into one purge
+
+_purge_queue = queue.Queue()
+_purge_thread = None
+_purge_thread_lock = threading.Lock()
+
+def surrogate_key(folder, name=None):
+    if name is None:
+        return 'folder:' + quote(folder, safe='')
+    return 'script:' + quote(folder, safe='') + '/' + quote(name, safe='')
+
+def cdn_headers(folder, served, settings=None):
+    """Cache-Control and surrogate key headers for a public script response"""
+    settings = settings or folder_settings(folder)
+    max_age = settings['cache_max_age'] or CDN_MAX_AGE
+    if max_age > 0:
+        cache_control = f'public, max-age={max_age}'
+        stale = settings['stale_while_revalidate'] or CDN_STALE_WHILE_REVALIDATE
+        if stale > 0:
+            cache_control += f', stale-while-revalidate={stale}'
+    else:
+        cache_control = 'no-cache'
+    keys = []
+    for included_folder, included_name in served.included:
+        keys.append(surrogate_key(included_folder, included_name))
+        if surrogate_key(included_folder) not in keys:
+            keys.append(surrogate_key(included_folder))
+    return [('Cache-Control', cache_control), (CDN_KEY_HEADER, ' '.join(keys))]
+
+def purge_cdn(event):
+    if event['type'] not in ('saved', 'created', 'deleted', 'settings') or event.get('remote'):
+        return  # the instance that made the change purges it
+    # Every inotify worker sees a watched change; only the elected watcher purges it
+    if event.get('watched') and not fs_watch_leader():
+        return
+    folder = event['folder']
+    # Edits to a published folder don't change what the CDN has until the next publish
+    if event['type'] != 'settings' and folder_settings(folder).get('published'):
+        return
+    names = event.get('names') or [event['script']]
+    if event['type'] == 'settings' or any(n and is_template_name(n) for n in names):
+        keys = [surrogate_key(folder)]
+    else:
+        keys = [surrogate_key(folder, n) for n in names if n]
+    _purge_queue.put(keys)
+    start_cdn_purger()
+
+def cdn_purge_loop():
+    while True:
+        keys = set(_purge_queue.get())
+        time.sleep(CDN_PURGE_DELAY)
+        while not _purge_queue.empty():
+            keys.update(_purge_queue.get_nowait())
+        try:
+            send_cdn_purge(sorted(keys))
+        except Exception as e:
+            # Keep the thread alive; later changes still need purging
+            CDN_PURGES.inc('failed')
+            print(f"⚠️  CDN purge of {len(keys)} keys failed: {e}")
+
+def send_cdn_purge(keys, attempts=3):
+    headers = {'Content-Type': 'application/json'}
+    if CDN_PURGE_TOKEN:
+        headers['Authorization'] = f'Bearer {CDN_PURGE_TOKEN}'
+    body = json.dumps({'keys': keys}).encode('utf-8')
+    for attempt in range(attempts):
+        try:
+            with urlopen(UrlRequest(CDN_PURGE_URL, data=body, headers=headers, method='POST'), timeout=10):
+                pass
+            CDN_PURGES.inc('ok')
+            return True
+        except OSError as e:
+            if attempt == attempts - 1:
+                print(f"⚠️  CDN purge of {len(keys)} keys failed: {e}")
+            else:
+                time.sleep(2 ** attempt)
+    CDN_PURGES.inc('failed')
+    return False
+
+def start_cdn_purger():
+    global _purge_thread
+    if _purge_thread is not None:
+        return
+    with _purge_thread_lock:
+        if _purge_thread is None:
+            _purge_thread = threading.Thread(target=cdn_purge_loop, daemon=True)
+            _purge_thread.start()
+
+if CDN_PURGE_URL:
+    CHANGE_LISTENERS.append(purge_cdn)
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -188,13 +2998,8 @@ LOGIN_TEMPLATE = """
 </html>
 """
 
-# HTML template for the web editor
-EDITOR_TEMPLATE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Roblox Script Server Manager</title>
-    <style>
+# Web editor styles and code, served as fingerprinted static assets
+EDITOR_CSS = """
         body {
             font-family: Arial, sans-serif;
             margin: 20px;
@@ -479,174 +3284,48 @@ EDITOR_TEMPLATE = """
         .stat-label {
             color: #aaa;
             margin-top: 10px;
-        }
-        .analytics-table {
-            width: 100%;
-            margin: 20px 0;
-            background: #2d2d2d;
-            border-radius: 8px;
-            overflow: hidden;
-        }
-        .analytics-table th {
-            background: #3d3d3d;
-            padding: 15px;
-            text-align: left;
-            color: #4CAF50;
-        }
-        .analytics-table td {
-            padding: 12px 15px;
-            border-top: 1px solid #444;
-        }
-        .analytics-section {
-            margin: 30px 0;
-        }
-        .analytics-section h3 {
-            color: #4CAF50;
-            margin-bottom: 15px;
-        }
-        .script-stat-badge {
-            display: inline-block;
-            background: #3d3d3d;
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-size: 11px;
-            margin-left: 5px;
-            color: #4CAF50;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🚀 Roblox Script Server Manager</h1>
-            <div>
-                <button class="btn btn-new" onclick="showAnalytics()" style="margin-right: 10px;">📊 Analytics</button>
-                <a href="/logout" class="logout-btn">Logout</a>
-            </div>
-        </div>
-        
-        <div class="actions">
-            <input type="text" id="newFolderName" placeholder="New folder name...">
-            <button class="btn btn-new" onclick="createFolder()">Create Folder</button>
-            
-            <input type="text" id="newScriptName" placeholder="New script name (e.g., loader.lua)">
-            <button class="btn btn-new" onclick="createScript()">Create Script</button>
-            
-            <button class="btn btn-new" onclick="toggleMassCreate()">📦 Mass Create Scripts</button>
-        </div>
-
-        <div class="mass-create-panel" id="massCreatePanel">
-            <h3>📦 Mass Create Scripts</h3>
-            <p>Create multiple scripts at once with sequential numbering</p>
-            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 15px 0;">
-                <div>
-                    <label>Prefix:</label>
-                    <input type="text" id="massPrefix" placeholder="e.g., VPS" style="width: 100%;">
-                </div>
-                <div>
-                    <label>Extension:</label>
-                    <select id="massExtension" style="width: 100%; padding: 8px; background: #2d2d2d; border: 1px solid #444; color: #fff; border-radius: 3px;">
-                        <option>.lua</option>
-                        <option>.txt</option>
-                    </select>
-                </div>
-                <div>
-                    <label>Start Number:</label>
-                    <input type="number" id="massStart" placeholder="e.g., 1" value="1" style="width: 100%;">
-                </div>
-                <div>
-                    <label>End Number:</label>
-                    <input type="number" id="massEnd" placeholder="e.g., 10" value="10" style="width: 100%;">
-                </div>
-            </div>
-            <div style="margin: 10px 0;">
-                <label style="display: flex; align-items: center; gap: 10px; cursor: pointer;">
-                    <input type="checkbox" id="massZeroPad" checked style="width: 18px; height: 18px;">
-                    <span>Add zero-padding (VPS01, VPS02... instead of VPS1, VPS2...)</span>
-                </label>
-            </div>
-            <div style="background: #1a1a1a; padding: 10px; border-radius: 5px; margin: 10px 0;">
-                <strong>Preview:</strong> <span id="massPreview">VPS1.lua, VPS2.lua, VPS3.lua...</span>
-            </div>
-            <button class="btn btn-mass-save" onclick="executeMassCreate()">Create Scripts</button>
-            <button class="btn btn-new" onclick="toggleMassCreate()">Cancel</button>
-            <div id="massCreateStatus"></div>
-        </div>
-
-        <div class="mass-edit-bar">
-            <h3>📝 Mass Edit</h3>
-            <div class="mass-edit-controls">
-                <button class="btn btn-new" onclick="selectAll()">Select All</button>
-                <button class="btn btn-new" onclick="deselectAll()">Deselect All</button>
-                <button class="btn btn-mass-save" onclick="toggleMassEditor()">Edit Selected (<span id="selectedCount">0</span>)</button>
-                <button class="btn btn-delete" onclick="deleteSelected()">Delete Selected</button>
-            </div>
-        </div>
-
-        <div class="mass-editor" id="massEditor">
-            <h3>Mass Editing <span class="selected-count" id="editingCount">0</span> Scripts</h3>
-            <p>This content will be saved to all selected scripts:</p>
-            <textarea id="massEditContent"></textarea>
-            <button class="btn btn-mass-save" onclick="saveMassEdit()">Save to All Selected</button>
-            <button class="btn btn-new" onclick="toggleMassEditor()">Cancel</button>
-            <div id="massEditStatus"></div>
-        </div>
-
-        <h2>Folders:</h2>
-        <div class="folder-list" id="folderList"></div>
-
-        <h2>Scripts:</h2>
-        <div class="scripts-grid" id="scriptsGrid"></div>
-
-        <!-- Analytics Modal -->
-        <div class="analytics-modal" id="analyticsModal">
-            <div class="analytics-content">
-                <div class="analytics-header">
-                    <h2>📊 Script Analytics</h2>
-                    <button class="close-analytics" onclick="closeAnalytics()">Close</button>
-                </div>
-
-                <div class="analytics-stats" id="analyticsStats"></div>
-
-                <div class="analytics-section">
-                    <h3>🔥 Top 10 Most Loaded Scripts</h3>
-                    <table class="analytics-table">
-                        <thead>
-                            <tr>
-                                <th>Script</th>
-                                <th>Total Loads</th>
-                                <th>Unique IPs</th>
-                            </tr>
-                        </thead>
-                        <tbody id="topScriptsTable"></tbody>
-                    </table>
-                </div>
-
-                <div class="analytics-section">
-                    <h3>📈 Recent Activity (Last 50)</h3>
-                    <table class="analytics-table">
-                        <thead>
-                            <tr>
-                                <th>Time</th>
-                                <th>Script</th>
-                                <th>IP Address</th>
-                            </tr>
-                        </thead>
-                        <tbody id="recentActivityTable"></tbody>
-                    </table>
-                </div>
-
-                <div style="text-align: center; margin-top: 30px;">
-                    <button class="btn btn-delete" onclick="resetAnalytics()">Reset All Analytics</button>
-                </div>
-            </div>
-        </div>
-    </div>
+        }
+        .analytics-table {
+            width: 100%;
+            margin: 20px 0;
+            background: #2d2d2d;
+            border-radius: 8px;
+            overflow: hidden;
+        }
+        .analytics-table th {
+            background: #3d3d3d;
+            padding: 15px;
+            text-align: left;
+            color: #4CAF50;
+        }
+        .analytics-table td {
+            padding: 12px 15px;
+            border-top: 1px solid #444;
+        }
+        .analytics-section {
+            margin: 30px 0;
+        }
+        .analytics-section h3 {
+            color: #4CAF50;
+            margin-bottom: 15px;
+        }
+        .script-stat-badge {
+            display: inline-block;
+            background: #3d3d3d;
+            padding: 4px 8px;
+            border-radius: 4px;
+            font-size: 11px;
+            margin-left: 5px;
+            color: #4CAF50;
+        }
+"""
 
-    <script>
+EDITOR_JS = """
         let currentFolder = '';
         let serverUrl = window.location.origin;
         let selectedScripts = new Set();
+        let dirtyScripts = new Set();
+        const clientId = Math.random().toString(36).slice(2) + Date.now().toString(36);
 
         async function loadFolders() {
             const response = await fetch('/api/folders');
@@ -665,13 +3344,56 @@ EDITOR_TEMPLATE = """
         async function loadScripts(folder) {
             currentFolder = folder;
             selectedScripts.clear();
+            dirtyScripts.clear();
             updateSelectedCount();
             
             document.querySelectorAll('.folder-btn').forEach(btn => {
                 btn.classList.toggle('active', btn.textContent === folder);
             });
 
-            const response = await fetch(`/api/scripts/${folder}`);
+            loadFolderSettings(folder);
+            const cards = await fetchScriptCards(folder);
+            if (folder !== currentFolder) return;
+            document.getElementById('scriptsGrid').innerHTML = cards.map(c => c.html).join('');
+        }
+
+        async function loadFolderSettings(folder) {
+            const response = await fetch(`/api/folder-settings/${folder}`);
+            const settings = await response.json();
+            if (folder !== currentFolder) return;
+            document.getElementById('folderMinify').checked = settings.minify;
+            document.getElementById('folderRateLimit').value = settings.rate_limit;
+            document.getElementById('publishStatus').textContent = settings.published
+                ? `Public URLs serve snapshot ${settings.published}` : 'Public URLs serve live edits';
+        }
+
+        async function publishFolder(action) {
+            if (!currentFolder) return alert('Select a folder first');
+            const url = action === 'rollback' ? `/api/rollback/${currentFolder}` : `/api/publish/${currentFolder}`;
+            const response = await fetch(url, {
+                method: action === 'live' ? 'DELETE' : 'POST',
+                headers: editorHeaders()
+            });
+            const result = await response.json();
+            if (!response.ok) alert(result.error || 'Failed to update the published snapshot');
+            loadFolderSettings(currentFolder);
+        }
+
+        async function updateFolderSettings(changes) {
+            if (!currentFolder) return alert('Select a folder first');
+            const response = await fetch(`/api/folder-settings/${currentFolder}`, {
+                method: 'POST',
+                headers: editorHeaders(),
+                body: JSON.stringify(changes)
+            });
+            if (!response.ok) alert('Failed to update folder settings');
+            loadFolderSettings(currentFolder);
+        }
+
+        // Fetch scripts (optionally only the named ones) plus their analytics
+        async function fetchScriptCards(folder, names) {
+            const query = names ? `?names=${encodeURIComponent(names.join(','))}` : '';
+            const response = await fetch(`/api/scripts/${folder}${query}`);
             const scripts = await response.json();
             
             // Get analytics for all scripts
@@ -680,59 +3402,162 @@ EDITOR_TEMPLATE = """
             );
             const analyticsData = await Promise.all(analyticsPromises);
             
-            const grid = document.getElementById('scriptsGrid');
+            return scripts.map((script, index) => ({
+                name: script.name,
+                content: script.content,
+                html: renderScriptCard(folder, script, analyticsData[index])
+            }));
+        }
+
+        function renderScriptCard(folder, script, analytics) {
+            const loadCount = analytics.total_loads || 0;
+            const uniqueIPs = analytics.unique_ips || 0;
+            const lastIP = analytics.last_ip || 'No loads yet';
             
-            grid.innerHTML = scripts.map((script, index) => {
-                const analytics = analyticsData[index];
-                const loadCount = analytics.total_loads || 0;
-                const uniqueIPs = analytics.unique_ips || 0;
-                const lastIP = analytics.last_ip || 'No loads yet';
-                
-                const scriptUrl = `${serverUrl}/scripts/${folder}/${script.name}`;
-                const loadstringCode = `loadstring(game:HttpGet("${scriptUrl}"))()`;
-                
-                return `
+            const scriptUrl = `${serverUrl}/scripts/${folder}/${script.name}`;
+            const loadstringCode = `loadstring(game:HttpGet("${scriptUrl}"))()`;
+            
+            return `
                 <div class="script-card" id="card-${script.name}" onclick="toggleSelect('${script.name}', event)">
                     <h3>
                         <input type="checkbox" class="select-checkbox" id="check-${script.name}" onclick="toggleSelect('${script.name}', event)">
                         ${script.name}
-                        <span class="script-stat-badge" title="Total loads">📊 ${loadCount}</span>
-                        ${uniqueIPs > 0 ? `<span class="script-stat-badge" title="Unique IPs">👥 ${uniqueIPs}</span>` : ''}
+                        <span class="script-stat-badge" title="Total loads" id="loads-${script.name}">📊 ${loadCount}</span>
+                        <span class="script-stat-badge" title="Unique IPs" id="ips-${script.name}" style="${uniqueIPs > 0 ? '' : 'display: none;'}">👥 ${uniqueIPs}</span>
                     </h3>
-                    ${lastIP !== 'No loads yet' ? `<div style="font-size: 11px; color: #aaa; margin: 5px 0;">🌐 Last IP: ${lastIP}</div>` : ''}
+                    <div style="font-size: 11px; color: #aaa; margin: 5px 0; ${lastIP !== 'No loads yet' ? '' : 'display: none;'}" id="lastip-${script.name}">🌐 Last IP: ${lastIP}</div>
                     <div class="loadstring-box" onclick="event.stopPropagation()">
                         <div style="font-size: 11px; color: #aaa; margin-bottom: 5px;">Loadstring Code:</div>
                         <textarea readonly onclick="this.select()" style="height: 60px; font-size: 11px; cursor: text;">${loadstringCode}</textarea>
                         <button class="btn btn-copy" onclick="copyLoadstring('${loadstringCode}', event)" style="margin-top: 5px;">📋 Copy Loadstring</button>
                     </div>
                     <div class="script-url">${scriptUrl}</div>
-                    <textarea id="editor-${script.name}">${script.content}</textarea>
+                    <textarea id="editor-${script.name}" oninput="dirtyScripts.add('${script.name}')">${script.content}</textarea>
                     <button class="btn btn-save" onclick="saveScript('${script.name}', event)">Save</button>
                     <button class="btn btn-copy" onclick="copyUrl('${folder}', '${script.name}', event)">Copy URL</button>
                     <button class="btn btn-new" onclick="showScriptAnalytics('${folder}', '${script.name}', event)">📊 Stats</button>
                     <button class="btn btn-delete" onclick="deleteScript('${script.name}', event)">Delete</button>
                     <div id="status-${script.name}"></div>
                 </div>
-            `}).join('');
+            `;
+        }
+
+        // Insert or refresh only the named cards, keeping natural sort order
+        async function upsertScriptCards(folder, names) {
+            if (!names || names.length === 0) return;
+            const cards = await fetchScriptCards(folder, names);
+            if (folder !== currentFolder) return;
+            
+            const grid = document.getElementById('scriptsGrid');
+            for (const card of cards) {
+                const existing = document.getElementById(`card-${card.name}`);
+                if (existing) {
+                    // Never clobber an edit in progress
+                    if (dirtyScripts.has(card.name)) continue;
+                    const editor = document.getElementById(`editor-${card.name}`);
+                    if (editor && editor.value === card.content) continue;
+                    const wasSelected = selectedScripts.has(card.name);
+                    existing.outerHTML = card.html;
+                    if (wasSelected) markSelected(card.name, true);
+                    continue;
+                }
+                
+                const template = document.createElement('template');
+                template.innerHTML = card.html.trim();
+                const node = template.content.firstChild;
+                const next = Array.from(grid.children).find(el =>
+                    naturalCompare(el.id.replace('card-', ''), card.name) > 0
+                );
+                grid.insertBefore(node, next || null);
+            }
+        }
+
+        function removeScriptCard(name) {
+            const card = document.getElementById(`card-${name}`);
+            if (card) card.remove();
+            selectedScripts.delete(name);
+            dirtyScripts.delete(name);
+            updateSelectedCount();
+        }
+
+        function updateLoadBadges(name, stats) {
+            const loads = document.getElementById(`loads-${name}`);
+            if (!loads) return;
+            loads.textContent = `📊 ${stats.total_loads}`;
+            const ips = document.getElementById(`ips-${name}`);
+            ips.textContent = `👥 ${stats.unique_ips}`;
+            ips.style.display = stats.unique_ips > 0 ? '' : 'none';
+            if (stats.last_ip) {
+                const lastIP = document.getElementById(`lastip-${name}`);
+                lastIP.textContent = `🌐 Last IP: ${stats.last_ip}`;
+                lastIP.style.display = '';
+            }
+        }
+
+        function naturalCompare(a, b) {
+            return a.localeCompare(b, undefined, {numeric: true, sensitivity: 'base'});
+        }
+
+        // Live updates pushed by the server (our own changes are already applied locally)
+        function connectEvents() {
+            if (!window.EventSource) return;
+            const source = new EventSource('/api/events');
+            // A refused stream (503 when the worker is at SSE_MAX_STREAMS) isn't retried by the browser
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) setTimeout(connectEvents, 30000);
+            };
+            source.addEventListener('saved', e => handleChange(JSON.parse(e.data)));
+            source.addEventListener('created', e => handleChange(JSON.parse(e.data)));
+            source.addEventListener('deleted', e => handleChange(JSON.parse(e.data)));
+            source.addEventListener('folder_created', () => loadFolders());
+            source.addEventListener('settings', e => {
+                const data = JSON.parse(e.data);
+                if (data.folder === currentFolder && data.origin !== clientId) loadFolderSettings(data.folder);
+            });
+            source.addEventListener('load', e => {
+                const data = JSON.parse(e.data);
+                if (data.folder === currentFolder) updateLoadBadges(data.script, data);
+            });
+            source.addEventListener('resync', () => {
+                if (currentFolder) loadScripts(currentFolder);
+            });
+        }
+
+        function handleChange(event) {
+            if (event.origin === clientId || event.folder !== currentFolder) return;
+            if (event.type === 'deleted') {
+                removeScriptCard(event.script);
+            } else if (event.type === 'created') {
+                upsertScriptCards(event.folder, event.names);
+            } else if (event.type === 'saved') {
+                upsertScriptCards(event.folder, [event.script]);
+            }
+        }
+
+        function editorHeaders() {
+            return {'Content-Type': 'application/json', 'X-Editor-Client': clientId};
         }
 
         function toggleSelect(scriptName, event) {
             event.stopPropagation();
             
+            markSelected(scriptName, !selectedScripts.has(scriptName));
+            updateSelectedCount();
+        }
+
+        function markSelected(scriptName, selected) {
             const card = document.getElementById(`card-${scriptName}`);
             const checkbox = document.getElementById(`check-${scriptName}`);
             
-            if (selectedScripts.has(scriptName)) {
-                selectedScripts.delete(scriptName);
-                card.classList.remove('selected');
-                checkbox.checked = false;
-            } else {
+            if (selected) {
                 selectedScripts.add(scriptName);
                 card.classList.add('selected');
                 checkbox.checked = true;
+            } else {
+                selectedScripts.delete(scriptName);
+                card.classList.remove('selected');
+                checkbox.checked = false;
             }
-            
-            updateSelectedCount();
         }
 
         function selectAll() {
@@ -783,12 +3608,13 @@ EDITOR_TEMPLATE = """
             for (const scriptName of selectedScripts) {
                 const response = await fetch(`/api/save/${currentFolder}/${scriptName}`, {
                     method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
+                    headers: editorHeaders(),
                     body: JSON.stringify({content})
                 });
                 
                 if (response.ok) {
                     document.getElementById(`editor-${scriptName}`).value = content;
+                    dirtyScripts.delete(scriptName);
                     saved++;
                 }
             }
@@ -804,12 +3630,16 @@ EDITOR_TEMPLATE = """
             if (selectedScripts.size === 0) return;
             if (!confirm(`Delete ${selectedScripts.size} selected scripts?`)) return;
             
-            for (const scriptName of selectedScripts) {
-                await fetch(`/api/delete/${currentFolder}/${scriptName}`, {method: 'DELETE'});
+            for (const scriptName of Array.from(selectedScripts)) {
+                const response = await fetch(`/api/delete/${currentFolder}/${scriptName}`, {
+                    method: 'DELETE',
+                    headers: editorHeaders()
+                });
+                if (response.ok) removeScriptCard(scriptName);
             }
             
             selectedScripts.clear();
-            loadScripts(currentFolder);
+            updateSelectedCount();
         }
 
         async function saveScript(scriptName, event) {
@@ -817,12 +3647,13 @@ EDITOR_TEMPLATE = """
             const content = document.getElementById(`editor-${scriptName}`).value;
             const response = await fetch(`/api/save/${currentFolder}/${scriptName}`, {
                 method: 'POST',
-                headers: {'Content-Type': 'application/json'},
+                headers: editorHeaders(),
                 body: JSON.stringify({content})
             });
             
             const status = document.getElementById(`status-${scriptName}`);
             if (response.ok) {
+                dirtyScripts.delete(scriptName);
                 status.innerHTML = '<span class="success">✓ Saved!</span>';
                 setTimeout(() => status.innerHTML = '', 2000);
             } else {
@@ -835,11 +3666,12 @@ EDITOR_TEMPLATE = """
             if (!confirm(`Delete ${scriptName}?`)) return;
             
             const response = await fetch(`/api/delete/${currentFolder}/${scriptName}`, {
-                method: 'DELETE'
+                method: 'DELETE',
+                headers: editorHeaders()
             });
             
             if (response.ok) {
-                loadScripts(currentFolder);
+                removeScriptCard(scriptName);
             }
         }
 
@@ -862,7 +3694,7 @@ EDITOR_TEMPLATE = """
             
             const response = await fetch('/api/create-folder', {
                 method: 'POST',
-                headers: {'Content-Type': 'application/json'},
+                headers: editorHeaders(),
                 body: JSON.stringify({name})
             });
             
@@ -880,18 +3712,19 @@ EDITOR_TEMPLATE = """
             
             const response = await fetch(`/api/create-script/${currentFolder}`, {
                 method: 'POST',
-                headers: {'Content-Type': 'application/json'},
+                headers: editorHeaders(),
                 body: JSON.stringify({name})
             });
             
             if (response.ok) {
                 document.getElementById('newScriptName').value = '';
-                loadScripts(currentFolder);
+                upsertScriptCards(currentFolder, [name]);
             }
         }
 
         // Load folders on page load
         loadFolders();
+        connectEvents();
 
         // Mass create functions
         function toggleMassCreate() {
@@ -960,7 +3793,7 @@ EDITOR_TEMPLATE = """
             
             const response = await fetch(`/api/mass-create/${currentFolder}`, {
                 method: 'POST',
-                headers: {'Content-Type': 'application/json'},
+                headers: editorHeaders(),
                 body: JSON.stringify({
                     prefix: prefix,
                     start: start,
@@ -974,9 +3807,9 @@ EDITOR_TEMPLATE = """
             
             if (response.ok) {
                 status.innerHTML = `<span class="success">✓ Created ${result.created} scripts!</span>`;
+                upsertScriptCards(currentFolder, result.names);
                 setTimeout(() => {
                     toggleMassCreate();
-                    loadScripts(currentFolder);
                     status.innerHTML = '';
                 }, 1500);
             } else {
@@ -984,107 +3817,606 @@ EDITOR_TEMPLATE = """
             }
         }
 
-        // Analytics functions
-        async function showAnalytics() {
-            document.getElementById('analyticsModal').classList.add('active');
-            await loadAnalytics();
-        }
+        // Analytics functions
+        async function showAnalytics() {
+            document.getElementById('analyticsModal').classList.add('active');
+            await loadAnalytics();
+        }
+
+        function closeAnalytics() {
+            document.getElementById('analyticsModal').classList.remove('active');
+        }
+
+        async function loadAnalytics() {
+            const response = await fetch('/api/analytics/overview');
+            const data = await response.json();
+            
+            // Update stats cards
+            document.getElementById('analyticsStats').innerHTML = `
+                <div class="stat-card">
+                    <div class="stat-value">${data.total_loads.toLocaleString()}</div>
+                    <div class="stat-label">Total Script Loads</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-value">${data.total_scripts}</div>
+                    <div class="stat-label">Scripts Tracked</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-value">${data.top_scripts.length > 0 ? data.top_scripts[0].loads : 0}</div>
+                    <div class="stat-label">Most Popular Script</div>
+                </div>
+            `;
+            
+            // Update top scripts table
+            document.getElementById('topScriptsTable').innerHTML = data.top_scripts.map(s => `
+                <tr>
+                    <td><strong>${s.script}</strong></td>
+                    <td>${s.loads.toLocaleString()}</td>
+                    <td>${s.unique_ips}</td>
+                </tr>
+            `).join('') || '<tr><td colspan="3" style="text-align: center; color: #aaa;">No data yet</td></tr>';
+            
+            // Update recent activity table
+            document.getElementById('recentActivityTable').innerHTML = data.recent_activity.map(a => {
+                const date = new Date(a.timestamp);
+                const timeStr = date.toLocaleTimeString() + ' - ' + date.toLocaleDateString();
+                return `
+                    <tr>
+                        <td>${timeStr}</td>
+                        <td>${a.script}</td>
+                        <td>${a.ip || 'N/A'}</td>
+                    </tr>
+                `;
+            }).join('') || '<tr><td colspan="3" style="text-align: center; color: #aaa;">No activity yet</td></tr>';
+        }
+
+        async function resetAnalytics() {
+            if (!confirm('Are you sure you want to reset ALL analytics data? This cannot be undone!')) return;
+            
+            const response = await fetch('/api/analytics/reset', { method: 'POST' });
+            if (response.ok) {
+                alert('Analytics reset successfully!');
+                loadAnalytics();
+            }
+        }
+
+        async function showScriptAnalytics(folder, script, event) {
+            if (event) event.stopPropagation();
+            
+            const response = await fetch(`/api/analytics/script/${folder}/${script}`);
+            const data = await response.json();
+            
+            const firstLoad = data.first_load ? new Date(data.first_load).toLocaleString() : 'Never';
+            const lastLoad = data.last_load ? new Date(data.last_load).toLocaleString() : 'Never';
+            
+            alert(`📊 Analytics for ${script}\n\n` +
+                  `Total Loads: ${data.total_loads}\n` +
+                  `Unique IPs: ${data.unique_ips}\n` +
+                  `First Load: ${firstLoad}\n` +
+                  `Last Load: ${lastLoad}`);
+        }
+"""
+
+# HTML template for the web editor
+EDITOR_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Roblox Script Server Manager</title>
+    <link rel="stylesheet" href="{{ css_url }}">
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🚀 Roblox Script Server Manager</h1>
+            <div>
+                <button class="btn btn-new" onclick="showAnalytics()" style="margin-right: 10px;">📊 Analytics</button>
+                <a href="/logout" class="logout-btn">Logout</a>
+            </div>
+        </div>
+        
+        <div class="actions">
+            <input type="text" id="newFolderName" placeholder="New folder name...">
+            <button class="btn btn-new" onclick="createFolder()">Create Folder</button>
+            
+            <input type="text" id="newScriptName" placeholder="New script name (e.g., loader.lua)">
+            <button class="btn btn-new" onclick="createScript()">Create Script</button>
+            
+            <button class="btn btn-new" onclick="toggleMassCreate()">📦 Mass Create Scripts</button>
+        </div>
+
+        <div class="mass-create-panel" id="massCreatePanel">
+            <h3>📦 Mass Create Scripts</h3>
+            <p>Create multiple scripts at once with sequential numbering</p>
+            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 15px 0;">
+                <div>
+                    <label>Prefix:</label>
+                    <input type="text" id="massPrefix" placeholder="e.g., VPS" style="width: 100%;">
+                </div>
+                <div>
+                    <label>Extension:</label>
+                    <select id="massExtension" style="width: 100%; padding: 8px; background: #2d2d2d; border: 1px solid #444; color: #fff; border-radius: 3px;">
+                        <option>.lua</option>
+                        <option>.txt</option>
+                    </select>
+                </div>
+                <div>
+                    <label>Start Number:</label>
+                    <input type="number" id="massStart" placeholder="e.g., 1" value="1" style="width: 100%;">
+                </div>
+                <div>
+                    <label>End Number:</label>
+                    <input type="number" id="massEnd" placeholder="e.g., 10" value="10" style="width: 100%;">
+                </div>
+            </div>
+            <div style="margin: 10px 0;">
+                <label style="display: flex; align-items: center; gap: 10px; cursor: pointer;">
+                    <input type="checkbox" id="massZeroPad" checked style="width: 18px; height: 18px;">
+                    <span>Add zero-padding (VPS01, VPS02... instead of VPS1, VPS2...)</span>
+                </label>
+            </div>
+            <div style="background: #1a1a1a; padding: 10px; border-radius: 5px; margin: 10px 0;">
+                <strong>Preview:</strong> <span id="massPreview">VPS1.lua, VPS2.lua, VPS3.lua...</span>
+            </div>
+            <button class="btn btn-mass-save" onclick="executeMassCreate()">Create Scripts</button>
+            <button class="btn btn-new" onclick="toggleMassCreate()">Cancel</button>
+            <div id="massCreateStatus"></div>
+        </div>
+
+        <div class="mass-edit-bar">
+            <h3>📝 Mass Edit</h3>
+            <div class="mass-edit-controls">
+                <button class="btn btn-new" onclick="selectAll()">Select All</button>
+                <button class="btn btn-new" onclick="deselectAll()">Deselect All</button>
+                <button class="btn btn-mass-save" onclick="toggleMassEditor()">Edit Selected (<span id="selectedCount">0</span>)</button>
+                <button class="btn btn-delete" onclick="deleteSelected()">Delete Selected</button>
+            </div>
+        </div>
+
+        <div class="mass-editor" id="massEditor">
+            <h3>Mass Editing <span class="selected-count" id="editingCount">0</span> Scripts</h3>
+            <p>This content will be saved to all selected scripts:</p>
+            <textarea id="massEditContent"></textarea>
+            <button class="btn btn-mass-save" onclick="saveMassEdit()">Save to All Selected</button>
+            <button class="btn btn-new" onclick="toggleMassEditor()">Cancel</button>
+            <div id="massEditStatus"></div>
+        </div>
+
+        <h2>Folders:</h2>
+        <div class="folder-list" id="folderList"></div>
 
-        function closeAnalytics() {
-            document.getElementById('analyticsModal').classList.remove('active');
-        }
+        <h2>Scripts:</h2>
+        <label style="display: flex; align-items: center; gap: 10px; cursor: pointer; color: #aaa;">
+            <input type="checkbox" id="folderMinify" onchange="updateFolderSettings({minify: this.checked})" style="width: 18px; height: 18px;">
+            <span>Serve minified scripts from this folder (comments and whitespace stripped)</span>
+        </label>
+        <label style="display: flex; align-items: center; gap: 10px; margin-top: 10px; color: #aaa;">
+            <input type="number" id="folderRateLimit" min="0" onchange="updateFolderSettings({rate_limit: parseInt(this.value) || 0})" style="width: 80px;">
+            <span>Requests per minute per client (0 uses the server default)</span>
+        </label>
+        <div style="display: flex; align-items: center; gap: 10px; margin-top: 10px; color: #aaa;">
+            <button class="btn btn-new" onclick="publishFolder('publish')">Publish</button>
+            <button class="btn btn-new" onclick="publishFolder('rollback')">Roll Back</button>
+            <button class="btn btn-new" onclick="publishFolder('live')">Serve Live</button>
+            <span id="publishStatus"></span>
+        </div>
+        <div class="scripts-grid" id="scriptsGrid"></div>
 
-        async function loadAnalytics() {
-            const response = await fetch('/api/analytics/overview');
-            const data = await response.json();
-            
-            // Update stats cards
-            document.getElementById('analyticsStats').innerHTML = `
-                <div class="stat-card">
-                    <div class="stat-value">${data.total_loads.toLocaleString()}</div>
-                    <div class="stat-label">Total Script Loads</div>
+        <!-- Analytics Modal -->
+        <div class="analytics-modal" id="analyticsModal">
+            <div class="analytics-content">
+                <div class="analytics-header">
+                    <h2>📊 Script Analytics</h2>
+                    <button class="close-analytics" onclick="closeAnalytics()">Close</button>
                 </div>
-                <div class="stat-card">
-                    <div class="stat-value">${data.total_scripts}</div>
-                    <div class="stat-label">Scripts Tracked</div>
+
+                <div class="analytics-stats" id="analyticsStats"></div>
+
+                <div class="analytics-section">
+                    <h3>🔥 Top 10 Most Loaded Scripts</h3>
+                    <table class="analytics-table">
+                        <thead>
+                            <tr>
+                                <th>Script</th>
+                                <th>Total Loads</th>
+                                <th>Unique IPs</th>
+                            </tr>
+                        </thead>
+                        <tbody id="topScriptsTable"></tbody>
+                    </table>
                 </div>
-                <div class="stat-card">
-                    <div class="stat-value">${data.top_scripts.length > 0 ? data.top_scripts[0].loads : 0}</div>
-                    <div class="stat-label">Most Popular Script</div>
+
+                <div class="analytics-section">
+                    <h3>📈 Recent Activity (Last 50)</h3>
+                    <table class="analytics-table">
+                        <thead>
+                            <tr>
+                                <th>Time</th>
+                                <th>Script</th>
+                                <th>IP Address</th>
+                            </tr>
+                        </thead>
+                        <tbody id="recentActivityTable"></tbody>
+                    </table>
                 </div>
-            `;
-            
-            // Update top scripts table
-            document.getElementById('topScriptsTable').innerHTML = data.top_scripts.map(s => `
-                <tr>
-                    <td><strong>${s.script}</strong></td>
-                    <td>${s.loads.toLocaleString()}</td>
-                    <td>${s.unique_ips}</td>
-                </tr>
-            `).join('') || '<tr><td colspan="3" style="text-align: center; color: #aaa;">No data yet</td></tr>';
-            
-            // Update recent activity table
-            document.getElementById('recentActivityTable').innerHTML = data.recent_activity.map(a => {
-                const date = new Date(a.timestamp);
-                const timeStr = date.toLocaleTimeString() + ' - ' + date.toLocaleDateString();
-                return `
-                    <tr>
-                        <td>${timeStr}</td>
-                        <td>${a.script}</td>
-                        <td>${a.ip || 'N/A'}</td>
-                    </tr>
-                `;
-            }).join('') || '<tr><td colspan="3" style="text-align: center; color: #aaa;">No activity yet</td></tr>';
-        }
 
-        async function resetAnalytics() {
-            if (!confirm('Are you sure you want to reset ALL analytics data? This cannot be undone!')) return;
-            
-            const response = await fetch('/api/analytics/reset', { method: 'POST' });
-            if (response.ok) {
-                alert('Analytics reset successfully!');
-                loadAnalytics();
-            }
-        }
+                <div style="text-align: center; margin-top: 30px;">
+                    <button class="btn btn-delete" onclick="resetAnalytics()">Reset All Analytics</button>
+                </div>
+            </div>
+        </div>
+    </div>
 
-        async function showScriptAnalytics(folder, script, event) {
-            if (event) event.stopPropagation();
-            
-            const response = await fetch(`/api/analytics/script/${folder}/${script}`);
-            const data = await response.json();
-            
-            const firstLoad = data.first_load ? new Date(data.first_load).toLocaleString() : 'Never';
-            const lastLoad = data.last_load ? new Date(data.last_load).toLocaleString() : 'Never';
-            
-            alert(`📊 Analytics for ${script}\n\n` +
-                  `Total Loads: ${data.total_loads}\n` +
-                  `Unique IPs: ${data.unique_ips}\n` +
-                  `First Load: ${firstLoad}\n` +
-                  `Last Load: ${lastLoad}`);
-        }
-    </script>
+    <script src="{{ js_url }}"></script>
 </body>
 </html>
 """
 
+# Pages and assets are built once at startup: templates compiled, bodies
+# gzip-compressed ahead of time, and CSS/JS given content-hashed names so
+# browsers can cache them forever.
+class StaticAsset:
+    __slots__ = ('body', 'gzipped', 'mimetype', 'etag')
+
+    def __init__(self, text, mimetype):
+        self.body = text.encode('utf-8')
+        self.gzipped = gzip.compress(self.body, 9, mtime=0)
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(self.body).hexdigest()[:16]
+
+STATIC_ASSETS = {}
+
+def register_asset(name, extension, text, mimetype):
+    """Store an asset under a fingerprinted name and return its URL"""
+    asset = StaticAsset(text, mimetype)
+    filename = f"{name}.{asset.etag}.{extension}"
+    STATIC_ASSETS[filename] = asset
+    return f"/assets/{filename}"
+
+def asset_response(asset, cache_control):
+    """Serve a prebuilt asset: 304 on a matching ETag, gzip when the client accepts it"""
+    if asset.etag in request.if_none_match:
+        response = Response(status=304)
+    elif request.accept_encodings['gzip']:
+        response = Response(asset.gzipped, mimetype=asset.mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(asset.body, mimetype=asset.mimetype)
+    response.set_etag(asset.etag)
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+LOGIN_PAGE = app.jinja_env.from_string(LOGIN_TEMPLATE)
+EDITOR_PAGE = StaticAsset(app.jinja_env.from_string(EDITOR_TEMPLATE).render(
+    css_url=register_asset('editor', 'css', EDITOR_CSS, 'text/css'),
+    js_url=register_asset('editor', 'js', EDITOR_JS, 'application/javascript')
+), 'text/html')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+mark_startup_phase('pages')
+
+@app.route('/assets/<filename>')
+def static_asset(filename):
+    """Fingerprinted editor CSS/JS"""
+    asset = STATIC_ASSETS.get(filename)
+    if asset is None:
+        abort(404)
+    return asset_response(asset, IMMUTABLE_CACHE)
+
+# Request metrics for every Flask route, labelled by route pattern
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+    start_metrics_snapshots()
+    start_change_relay()
+    start_fs_watcher()
+
+@app.after_request
+def finish_request_metrics(response):
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    record_request(rule, request.method, response.status_code, time.perf_counter() - g.request_started)
+    return response
+
+@app.teardown_request
+def end_request_metrics(exc):
+    if 'request_started' in g:
+        HTTP_IN_FLIGHT.dec()
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics (bearer METRICS_TOKEN required when set)"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        abort(401)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Access log: one JSON line per request. Records are appended to an
+# in-memory buffer and written in batches by a background thread, so a
+# request only pays for building a dict. The file is rotated by size
+# (access.log -> access.log.1 ...) under a lock shared by all workers.
+LOG_DIR = os.environ.get('LOG_DIR', 'logs')
+ACCESS_LOG = os.environ.get('ACCESS_LOG', os.path.join(LOG_DIR, 'access.log'))  # empty disables it
+ACCESS_LOG_MAX_BYTES = int(os.environ.get('ACCESS_LOG_MAX_BYTES', 10 * 1024 * 1024))
+ACCESS_LOG_BACKUPS = int(os.environ.get('ACCESS_LOG_BACKUPS', 5))
+ACCESS_LOG_FLUSH_INTERVAL = 1.0
+ACCESS_LOG_BUFFER = 100000  # oldest records are dropped beyond this if the disk falls behind
+
+_access_log_buffer = deque(maxlen=ACCESS_LOG_BUFFER)
+_access_log_write_lock = threading.Lock()
+_access_log_thread = None
+
+def client_ip():
+    return request.headers.get('X-Forwarded-For', request.remote_addr)
+
+def log_access(method, path, status, size, seconds, ip):
+    global _access_log_thread
+    if not ACCESS_LOG:
+        return
+    _access_log_buffer.append({
+        'time': datetime.now().isoformat(timespec='milliseconds'),
+        'method': method,
+        'path': path,
+        'status': status,
+        'bytes': size,
+        'latency_ms': round(seconds * 1000, 3),
+        'ip': ip,
+    })
+    if _access_log_thread is None:
+        _access_log_thread = threading.Thread(target=_access_log_loop, daemon=True)
+        _access_log_thread.start()
+
+def _rotate_access_log():
+    for n in range(ACCESS_LOG_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{ACCESS_LOG}.{n}"):
+            os.replace(f"{ACCESS_LOG}.{n}", f"{ACCESS_LOG}.{n + 1}")
+    if ACCESS_LOG_BACKUPS:
+        os.replace(ACCESS_LOG, f"{ACCESS_LOG}.1")
+    else:
+        os.remove(ACCESS_LOG)
+
+def flush_access_log():
+    """Write buffered access records, rotating the file when it gets too big"""
+    with _access_log_write_lock:
+        records = []
+        while _access_log_buffer:
+            records.append(_access_log_buffer.popleft())
+        if not records:
+            return
+        batch = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+        os.makedirs(os.path.dirname(ACCESS_LOG) or '.', exist_ok=True)
+        with file_lock(ACCESS_LOG + '.lock'):
+            version = file_version(ACCESS_LOG)
+            if version and version[1] + len(batch) > ACCESS_LOG_MAX_BYTES:
+                _rotate_access_log()
+            with open(ACCESS_LOG, 'a', encoding='utf-8') as f:
+                f.write(batch)
+
+def _access_log_loop():
+    while True:
+        time.sleep(ACCESS_LOG_FLUSH_INTERVAL)
+        try:
+            flush_access_log()
+        except Exception as e:
+            print(f"⚠️  Access log write failed: {e}")
+
+@app.after_request
+def record_access(response):
+    log_access(request.method, request.full_path.rstrip('?'), response.status_code,
+               response.content_length, time.perf_counter() - g.request_started, client_ip())
+    return response
+
+# Request profiling. A logged-in user can profile one request with the
+# X-Profile: 1 header or ?profile=1, PROFILE_SAMPLE_PERCENT profiles a random
+# share of all requests, and requests slower than SLOW_REQUEST_SECONDS are
+# captured with the stacks a watchdog thread sampled while they ran. Captures
+# go to PROFILE_DIR (shared by all workers), newest PROFILE_KEEP kept. With
+# all three off the hooks below cost one comparison per request.
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '.profiles')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+PROFILE_SAMPLE_PERCENT = float(os.environ.get('PROFILE_SAMPLE_PERCENT', 0))
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 0))
+SLOW_SAMPLE_INTERVAL = 0.01
+PROFILE_ID_RE = re.compile(r'^[0-9]+-[0-9]+-[0-9a-f]+$')
+
+_watched_requests = {}  # thread id -> {'started', 'stacks'}
+_watchdog_thread = None
+
+def _stack_key(frame):
+    """Collapsed stack (root first), as used by flame graph tools"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def _slow_request_watchdog():
+    while True:
+        time.sleep(SLOW_SAMPLE_INTERVAL)
+        now = time.perf_counter()
+        frames = None
+        for thread_id, watched in list(_watched_requests.items()):
+            if now - watched['started'] < SLOW_REQUEST_SECONDS:
+                continue
+            if frames is None:
+                frames = sys._current_frames()
+            frame = frames.get(thread_id)
+            if frame is not None:
+                key = _stack_key(frame)
+                watched['stacks'][key] = watched['stacks'].get(key, 0) + 1
+
+def _start_watchdog():
+    global _watchdog_thread
+    if _watchdog_thread is None:
+        _watchdog_thread = threading.Thread(target=_slow_request_watchdog, daemon=True)
+        _watchdog_thread.start()
+
+def save_profile(kind, duration, status, stats=None, stacks=None):
+    """Store one capture and drop the oldest beyond PROFILE_KEEP"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{time.time_ns()}-{os.getpid()}-{secrets.token_hex(2)}"
+    meta = {
+        'id': profile_id,
+        'kind': kind,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'route': request.url_rule.rule if request.url_rule else None,
+        'status': status,
+        'duration': round(duration, 6),
+        'timestamp': datetime.now().isoformat(),
+        'stacks': stacks,
+    }
+    if stats is not None:
+        import marshal
+        with open(os.path.join(PROFILE_DIR, profile_id + '.prof'), 'wb') as f:
+            f.write(marshal.dumps(stats))
+    write_file_atomic(os.path.join(PROFILE_DIR, profile_id + '.json'), json.dumps(meta))
+    
+    captures = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+    for old in captures[:-PROFILE_KEEP]:
+        for ext in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, old + ext))
+            except FileNotFoundError:
+                pass
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta['has_profile'] = os.path.exists(os.path.join(PROFILE_DIR, meta['id'] + '.prof'))
+        meta['samples'] = sum((meta.pop('stacks') or {}).values())
+        profiles.append(meta)
+    return profiles
+
+def profiling_requested():
+    if PROFILE_SAMPLE_PERCENT and random.random() * 100 < PROFILE_SAMPLE_PERCENT:
+        return True
+    if request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1':
+        return bool(session.get('logged_in'))
+    return False
+
+@app.before_request
+def start_request_profile():
+    if not (PROFILE_SAMPLE_PERCENT or SLOW_REQUEST_SECONDS or 'X-Profile' in request.headers or 'profile' in request.args):
+        return
+    if SLOW_REQUEST_SECONDS:
+        _start_watchdog()
+        g.watched = _watched_requests[threading.get_ident()] = {'started': time.perf_counter(), 'stacks': {}}
+    if profiling_requested():
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # another profiler is already running in this process
+        g.profiler = profiler
+
+@app.after_request
+def finish_request_profile(response):
+    watched = g.pop('watched', None)
+    profiler = g.pop('profiler', None)
+    if watched is None and profiler is None:
+        return response
+    duration = time.perf_counter() - g.request_started
+    if watched is not None:
+        _watched_requests.pop(threading.get_ident(), None)
+    stats = None
+    if profiler is not None:
+        profiler.disable()
+        profiler.create_stats()
+        stats = profiler.stats
+    slow = watched is not None and duration >= SLOW_REQUEST_SECONDS
+    if stats is not None or slow:
+        try:
+            save_profile('slow' if slow else 'profile', duration, response.status_code,
+                         stats=stats, stacks=watched['stacks'] if slow else None)
+        except OSError as e:
+            print(f"⚠️  Could not save profile: {e}")
+    return response
+
+@app.teardown_request
+def end_request_profile(exc):
+    # Only left over when the view raised before after_request ran
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+    if g.pop('watched', None) is not None:
+        _watched_requests.pop(threading.get_ident(), None)
+
+@app.route('/api/profiles')
+@login_required
+def get_profiles():
+    """List stored profiles and slow-request captures"""
+    return jsonify(list_profiles())
+
+@app.route('/api/profiles/<profile_id>')
+@login_required
+def download_profile(profile_id):
+    """Download a capture: pstats file by default, ?format=text or ?format=collapsed"""
+    if not PROFILE_ID_RE.match(profile_id):
+        abort(404)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    fmt = request.args.get('format', 'pstats')
+    try:
+        if fmt == 'collapsed':
+            with open(base + '.json') as f:
+                stacks = json.load(f).get('stacks') or {}
+            body = ''.join(f"{stack} {count}\n" for stack, count in stacks.items())
+            return Response(body, mimetype='text/plain')
+        with open(base + '.prof', 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        abort(404)
+    if fmt == 'text':
+        import marshal, pstats
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in {key.value for key in pstats.SortKey}:
+            return jsonify({'error': f'Unknown sort key: {sort}'}), 400
+        try:
+            limit = int(request.args.get('limit', 60))
+        except ValueError:
+            return jsonify({'error': 'Limit must be an integer'}), 400
+        if limit < 0:
+            return jsonify({'error': 'Limit must be >= 0'}), 400
+        stats = pstats.Stats(stream=io.StringIO())
+        stats.stats = marshal.loads(data)
+        stats.get_top_level_stats()
+        stats.sort_stats(sort).print_stats(limit)
+        return Response(stats.stream.getvalue(), mimetype='text/plain')
+    return Response(data, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.prof'})
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page"""
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        refresh_config()
         
         if username == CONFIG['username'] and password == CONFIG['password']:
             session['logged_in'] = True
             return redirect(url_for('editor'))
         else:
-            return render_template_string(LOGIN_TEMPLATE, error="Invalid credentials")
+            return LOGIN_PAGE.render(error="Invalid credentials")
     
-    return render_template_string(LOGIN_TEMPLATE)
+    return LOGIN_PAGE.render()
 
 @app.route('/logout')
 def logout():
     """Logout"""
+    revoke_session(session.get('_sid'))
     session.pop('logged_in', None)
     return redirect(url_for('login'))
 
@@ -1092,7 +4424,8 @@ def logout():
 @login_required
 def editor():
     """Web-based editor interface"""
-    return render_template_string(EDITOR_TEMPLATE)
+    # Revalidated on every load (it sits behind the login), but only a 304 when unchanged
+    return asset_response(EDITOR_PAGE, 'private, no-cache')
 
 @app.route('/scripts/<folder>/<filename>')
 def serve_script(folder, filename):
@@ -1100,43 +4433,167 @@ def serve_script(folder, filename):
     if not filename.endswith('.lua'):
         abort(403)
     
-    filepath = os.path.join(BASE_DIR, folder, filename)
-    if os.path.exists(filepath):
-        # Track analytics (get IP from request)
-        ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-        track_script_load(folder, filename, ip_address)
-        
-        return send_file(filepath, mimetype='text/plain')
-    abort(404)
+    ip_address = client_ip()
+    wait = rate_limit_wait(folder, ip_address)
+    if wait:
+        return Response('Too Many Requests', 429, {'Retry-After': str(math.ceil(wait))}, mimetype='text/plain')
+    
+    # Bundled mode (?bundle=1): same-server loaders inlined into one response
+    bundle = request.args.get('bundle') in ('1', 'true')
+    served = load_served_script(folder, filename, bundle, request.host)
+    if served is None:
+        abort(404)
+    
+    # Track analytics; bundles credit every included script.
+    # Follow-up range requests of a large download are not counted again.
+    if not request.range or request.range.ranges[0][0] == 0:
+        for included_folder, included_name in served.included:
+            track_script_load(included_folder, included_name, ip_address)
+    
+    if served.path:
+        response = send_file(served.path, mimetype='text/plain', conditional=True)
+    else:
+        response = Response(served.body, mimetype='text/plain')
+    response.headers.extend(cdn_headers(folder, served))
+    return response
+
+@app.route('/api/edge/hits', methods=['POST'])
+def edge_hits():
+    """Count script loads served from the CDN cache (bearer CDN_INGEST_TOKEN or login)"""
+    if not (CDN_INGEST_TOKEN and request.headers.get('Authorization') == f'Bearer {CDN_INGEST_TOKEN}') \
+            and not session.get('logged_in'):
+        abort(401)
+    
+    # A JSON list of records, or newline-delimited JSON as exported by CDN log streaming:
+    # {"path": "/scripts/<folder>/<name>.lua", "ip": "...", "host": "...", "cache": "HIT"}
+    try:
+        if request.is_json:
+            records = request.get_json()
+        else:
+            records = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+    except ValueError:
+        return jsonify({'error': 'Invalid JSON'}), 400
+    if not isinstance(records, list):
+        return jsonify({'error': 'Expected a list of records'}), 400
+    
+    counted = 0
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        # Misses reached this server and were counted when they were served
+        if str(record.get('cache', 'HIT')).upper() in ('MISS', 'PASS', 'EXPIRED', 'BYPASS'):
+            continue
+        url = urlsplit(record.get('path') or '')
+        parts = [unquote(part) for part in url.path.split('/')]
+        if len(parts) != 4 or parts[1] != 'scripts' or not parts[3].endswith('.lua'):
+            continue
+        bundle = parse_qs(url.query).get('bundle', [''])[0] in ('1', 'true')
+        served = load_served_script(parts[2], parts[3], bundle, record.get('host') or request.host)
+        if served is None:
+            continue
+        for included_folder, included_name in served.included:
+            track_script_load(included_folder, included_name, record.get('ip'))
+        counted += 1
+    EDGE_HITS.inc(amount=counted)
+    return jsonify({'success': True, 'counted': counted})
 
 @app.route('/api/folders')
 @login_required
 def get_folders():
     """Get list of all folders"""
-    folders = [f for f in os.listdir(BASE_DIR) 
-               if os.path.isdir(os.path.join(BASE_DIR, f))]
+    folders = STORAGE.list_folders()
     folders.sort(key=natural_sort_key)
     return jsonify(folders)
 
+@app.route('/api/folder-settings/<folder>', methods=['GET', 'POST'])
+@login_required
+def folder_settings_route(folder):
+    """Get or update the per-folder options"""
+    if request.method == 'GET':
+        return jsonify(folder_settings(folder))
+    
+    updates = request.json or {}
+    for key, value in updates.items():
+        if key not in FOLDER_SETTING_DEFAULTS:
+            return jsonify({'error': f'Unknown setting: {key}'}), 400
+        if type(value) is not type(FOLDER_SETTING_DEFAULTS[key]):
+            return jsonify({'error': f'Invalid value for {key}'}), 400
+    update_config(lambda config: config.setdefault('folders', {}).setdefault(folder, {}).update(updates))
+    
+    if 'minify' in updates:
+        minify_folder(folder)
+    emit_change('settings', folder)
+    return jsonify(folder_settings(folder))
+
+@app.route('/api/shard/<folder>', methods=['POST'])
+@login_required
+def shard_folder_route(folder):
+    """Move a folder to the sharded layout in the background"""
+    if not hasattr(STORAGE, 'shard_folder'):
+        return jsonify({'error': 'Sharding needs the filesystem storage backend'}), 400
+    if not STORAGE.folder_exists(folder):
+        abort(404)
+    threading.Thread(target=shard_folder, args=(folder,), daemon=True).start()
+    return jsonify({'success': True, 'started': True}), 202
+
+def shard_folder(folder):
+    moved = STORAGE.shard_folder(folder)
+    # Large cached scripts point at file paths that just moved
+    emit_change('settings', folder)
+    print(f"🗂️  Sharded {folder}: {moved} files moved")
+    return moved
+
+@app.route('/api/snapshots/<folder>')
+@login_required
+def snapshots_route(folder):
+    """Published snapshots of a folder and the one being served"""
+    return jsonify({'published': folder_settings(folder).get('published'),
+                    'snapshots': list_snapshots(folder)})
+
+@app.route('/api/publish/<folder>', methods=['POST', 'DELETE'])
+@login_required
+def publish_route(folder):
+    """Publish the folder's current scripts, or go back to serving them live"""
+    if not STORAGE.folder_exists(folder):
+        abort(404)
+    if request.method == 'DELETE':
+        set_published(folder, None)
+        return jsonify({'success': True, 'published': None})
+    return jsonify({'success': True, 'published': publish_folder(folder)})
+
+@app.route('/api/rollback/<folder>', methods=['POST'])
+@login_required
+def rollback_route(folder):
+    """Serve the previous snapshot, or the one named in the body"""
+    snapshot_id = rollback_folder(folder, (request.get_json(silent=True) or {}).get('snapshot'))
+    if snapshot_id is None:
+        return jsonify({'error': 'No snapshot to roll back to'}), 409
+    return jsonify({'success': True, 'published': snapshot_id})
+
 @app.route('/api/scripts/<folder>')
 @login_required
 def get_scripts(folder):
     """Get all scripts in a folder"""
-    folder_path = os.path.join(BASE_DIR, folder)
-    if not os.path.exists(folder_path):
+    if not STORAGE.folder_exists(folder):
         return jsonify([])
     
     # Get all lua files and sort them naturally
-    filenames = [f for f in os.listdir(folder_path) if f.endswith('.lua')]
+    filenames = [f for f in STORAGE.list_scripts(folder) if f.endswith('.lua')]
     filenames.sort(key=natural_sort_key)
     
+    # Optional subset (used by the editor to refresh only changed cards)
+    names = request.args.get('names')
+    if names:
+        wanted = set(names.split(','))
+        filenames = [f for f in filenames if f in wanted]
+    
     scripts = []
     for filename in filenames:
-        filepath = os.path.join(folder_path, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
+        content = STORAGE.get(folder, filename)
+        if content is not None:
             scripts.append({
                 'name': filename,
-                'content': f.read()
+                'content': content.decode('utf-8')
             })
     return jsonify(scripts)
 
@@ -1146,15 +4603,37 @@ def save_script(folder, filename):
     """Save a script"""
     if not filename.endswith('.lua'):
         abort(403)
+    error = template_name_error(filename)
+    if error:
+        return jsonify({'error': error}), 400
     
     content = request.json.get('content', '')
-    folder_path = os.path.join(BASE_DIR, folder)
-    os.makedirs(folder_path, exist_ok=True)
+    commit_writes([('put', folder, filename, content)] + minified_writes(folder, filename, content))
     
-    filepath = os.path.join(folder_path, filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
+    emit_change('saved', folder, filename)
+    return jsonify({'success': True})
+
+@app.route('/api/template-params/<folder>/<filename>', methods=['GET', 'POST'])
+@login_required
+def template_params(folder, filename):
+    """Get or replace the parameter table of a template script"""
+    if not filename.endswith('.lua') or not is_template_name(filename):
+        abort(400)
+    error = template_name_error(filename)
+    if error:
+        return jsonify({'error': error}), 400
     
+    table_name = filename + '.json'
+    if request.method == 'GET':
+        table = STORAGE.get(folder, table_name)
+        return jsonify(json.loads(table) if table is not None else {})
+    
+    table = request.json
+    if not isinstance(table, dict) or not all(isinstance(v, dict) for v in table.values()):
+        return jsonify({'error': 'Parameter table must map names to objects'}), 400
+    commit_writes([('put', folder, table_name, json.dumps(table, indent=2))])
+    
+    emit_change('saved', folder, filename)
     return jsonify({'success': True})
 
 @app.route('/api/delete/<folder>/<filename>', methods=['DELETE'])
@@ -1164,9 +4643,10 @@ def delete_script(folder, filename):
     if not filename.endswith('.lua'):
         abort(403)
     
-    filepath = os.path.join(BASE_DIR, folder, filename)
-    if os.path.exists(filepath):
-        os.remove(filepath)
+    existed, _, _ = commit_writes([('delete', folder, name)
+                                   for name in (filename, filename + '.json', filename + MINIFIED_SUFFIX)])
+    if existed:
+        emit_change('deleted', folder, filename)
         return jsonify({'success': True})
     abort(404)
 
@@ -1178,8 +4658,8 @@ def create_folder():
     if not name:
         abort(400)
     
-    folder_path = os.path.join(BASE_DIR, name)
-    os.makedirs(folder_path, exist_ok=True)
+    STORAGE.create_folder(name)
+    emit_change('folder_created', name)
     return jsonify({'success': True})
 
 @app.route('/api/create-script/<folder>', methods=['POST'])
@@ -1189,14 +4669,15 @@ def create_script(folder):
     name = request.json.get('name', '').strip()
     if not name or not name.endswith('.lua'):
         abort(400)
+    error = template_name_error(name)
+    if error:
+        return jsonify({'error': error}), 400
     
-    folder_path = os.path.join(BASE_DIR, folder)
-    os.makedirs(folder_path, exist_ok=True)
-    
-    filepath = os.path.join(folder_path, name)
-    if not os.path.exists(filepath):
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('-- New script\nprint("Hello from script server!")\n')
+    STORAGE.create_folder(folder)
+    if STORAGE.stat(folder, name) is None:
+        content = '-- New script\nprint("Hello from script server!")\n'
+        commit_writes([('put', folder, name, content)] + minified_writes(folder, name, content))
+        emit_change('created', folder, name, names=[name])
     
     return jsonify({'success': True})
 
@@ -1218,34 +4699,72 @@ def mass_create_scripts(folder):
             return jsonify({'error': 'End must be >= start'}), 400
         if end - start > 100:
             return jsonify({'error': 'Max 100 scripts at once'}), 400
+        error = template_name_error(prefix + extension)
+        if error:
+            return jsonify({'error': error}), 400
         
-        folder_path = os.path.join(BASE_DIR, folder)
-        os.makedirs(folder_path, exist_ok=True)
+        STORAGE.create_folder(folder)
         
         # Calculate padding length
         padding = len(str(end)) if zero_pad else 0
         
-        created = 0
+        created = []
+        writes = []
         for i in range(start, end + 1):
             # Format number with zero-padding if enabled
             num_str = str(i).zfill(padding) if zero_pad else str(i)
             filename = f"{prefix}{num_str}{extension}"
-            filepath = os.path.join(folder_path, filename)
             
-            if not os.path.exists(filepath):
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(f'-- {filename}\n-- Created by mass create\nprint("Script {i}")\n')
-                created += 1
+            if STORAGE.stat(folder, filename) is None:
+                content = f'-- {filename}\n-- Created by mass create\nprint("Script {i}")\n'
+                writes.append(('put', folder, filename, content))
+                writes += minified_writes(folder, filename, content)
+                created.append(filename)
         
-        return jsonify({'success': True, 'created': created})
+        # One journal group (and one fsync) for the whole batch
+        commit_writes(writes)
+        if created:
+            emit_change('created', folder, None, names=created)
+        return jsonify({'success': True, 'created': len(created), 'names': created})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/events')
+@login_required
+def event_stream():
+    """Server-sent events stream of script changes for the editor"""
+    subscriber = subscribe_events(SSE_MAX_STREAMS)
+    if subscriber is None:
+        return jsonify({'error': 'Too many open event streams'}), 503, {'Retry-After': str(SSE_RETRY_SECONDS)}
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            unsubscribe_events(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/analytics/overview')
 @login_required
 def analytics_overview():
     """Get overall analytics"""
+    if ANALYTICS_BACKEND == 'redis':
+        try:
+            return jsonify(redis_analytics_overview())
+        except Exception as e:
+            return jsonify({'error': f'Analytics store unavailable: {e}'}), 503
     analytics = load_analytics()
     
     # Calculate some stats
@@ -1274,8 +4793,13 @@ def analytics_overview():
 @login_required
 def analytics_script(folder, filename):
     """Get analytics for specific script"""
-    analytics = load_analytics()
     script_key = f"{folder}/{filename}"
+    if ANALYTICS_BACKEND == 'redis':
+        try:
+            return jsonify(redis_analytics_script(script_key))
+        except Exception as e:
+            return jsonify({'error': f'Analytics store unavailable: {e}'}), 503
+    analytics = load_analytics()
     
     if script_key in analytics["scripts"]:
         data = analytics["scripts"][script_key]
@@ -1309,15 +4833,392 @@ def analytics_script(folder, filename):
 @login_required
 def analytics_reset():
     """Reset all analytics"""
+    if ANALYTICS_BACKEND == 'redis':
+        reset_redis_analytics()
+        return jsonify({"success": True})
     save_analytics({"total_loads": 0, "scripts": {}, "history": []})
     return jsonify({"success": True})
 
+# ASGI entry point (script_server:asgi_app). Public script fetches are served
+# on the event loop straight from the served script cache; only cache misses,
+# revalidation and config re-reads go to a thread, and loads are handed to a
+# tracker thread (analytics takes locks and writes files). Every other route
+# (editor, API) runs the Flask app on a thread pool.
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+_wsgi_executor = None
+_io_executor = None
+_load_queue = queue.Queue()
+_load_thread = None
+_load_thread_lock = threading.Lock()
+
+def track_script_load_later(folder, filename, ip_address):
+    """track_script_load() on the tracker thread; safe to call on the event loop"""
+    _load_queue.put((folder, filename, ip_address))
+    start_load_tracker()
+
+def _load_tracker_loop():
+    while True:
+        load = _load_queue.get()
+        try:
+            track_script_load(*load)
+        except Exception as e:
+            print(f"⚠️  Tracking a script load failed: {e}")
+        finally:
+            _load_queue.task_done()
+
+def start_load_tracker():
+    global _load_thread
+    if _load_thread is not None:
+        return
+    with _load_thread_lock:
+        if _load_thread is None:
+            _load_thread = threading.Thread(target=_load_tracker_loop, daemon=True)
+            _load_thread.start()
+
+def flush_tracked_loads():
+    """Wait until queued loads have reached track_script_load()"""
+    if _load_thread is not None:
+        _load_queue.join()
+
+async def run_io(func, *args):
+    """Run blocking file work (loads, stats, mmap) on a thread, off the event loop"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(thread_name_prefix='script-io')
+    import asyncio
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, func, *args)
+
+def _wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+        else:
+            key = 'HTTP_' + name
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+async def _asgi_to_wsgi(scope, receive, send):
+    """Run the Flask app for one request on the WSGI thread pool, streaming its output"""
+    global _wsgi_executor
+    if _wsgi_executor is None:
+        _wsgi_executor = ThreadPoolExecutor(ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+    
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    
+    import asyncio
+    loop = asyncio.get_running_loop()
+    disconnected = threading.Event()
+    
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+    
+    def run():
+        response = {}
+        
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+        
+        result = app.wsgi_app(_wsgi_environ(scope, bytes(body)), start_response)
+        started = False
+        try:
+            for chunk in result:
+                # Long-lived streams (SSE) stop once the client has gone away
+                if disconnected.is_set():
+                    return
+                if not started:
+                    emit({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+                    started = True
+                if chunk:
+                    emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                emit({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            emit({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+    
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await loop.run_in_executor(_wsgi_executor, run)
+    finally:
+        watcher.cancel()
+
+async def _asgi_send_simple(send, status, body=b'', content_type=b'text/plain; charset=utf-8', head=False,
+                            extra_headers=()):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', content_type),
+        (b'content-length', str(len(body)).encode()),
+        *extra_headers,
+    ]})
+    await send({'type': 'http.response.body', 'body': b'' if head else body})
+
+async def serve_script_asgi(scope, receive, send, folder, filename):
+    """Async twin of serve_script(), with the same request metrics"""
+    started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+    start_metrics_snapshots()
+    start_change_relay()
+    start_fs_watcher()
+    status = {'code': 500, 'bytes': 0}
+    
+    async def send_tracked(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+        else:
+            status['bytes'] += len(message.get('body', b''))
+        await send(message)
+    
+    try:
+        await _serve_script_asgi(scope, send_tracked, folder, filename)
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        seconds = time.perf_counter() - started
+        record_request('/scripts/<folder>/<filename>', scope['method'], status['code'], seconds)
+        query = scope['query_string'].decode('latin-1')
+        headers = dict(scope['headers'])
+        client = scope.get('client')
+        forwarded = headers.get(b'x-forwarded-for')
+        log_access(scope['method'], scope['path'] + ('?' + query if query else ''), status['code'], status['bytes'],
+                   seconds, forwarded.decode('latin-1') if forwarded else (client[0] if client else None))
+
+async def _serve_script_asgi(scope, send, folder, filename):
+    head = scope['method'] == 'HEAD'
+    if not filename.endswith('.lua'):
+        await _asgi_send_simple(send, 403, b'Forbidden', head=head)
+        return
+    
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    client = scope.get('client')
+    ip_address = headers.get('x-forwarded-for', client[0] if client else None)
+    if config_refresh_due():
+        await run_io(refresh_config)
+    settings = folder_settings(folder, refresh=False)
+    wait = rate_limit_wait(folder, ip_address, settings)
+    if wait:
+        await _asgi_send_simple(send, 429, b'Too Many Requests', head=head,
+                                extra_headers=[(b'retry-after', str(math.ceil(wait)).encode())])
+        return
+    
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    bundle = query.get('bundle', [''])[0] in ('1', 'true')
+    host = headers.get('host', '')
+    
+    served = cached_served_script(folder, filename, bundle, host)
+    if served is None:
+        # Revalidates a stale cached entry (or loads a missing one) off the event loop
+        served = await run_io(load_served_script, folder, filename, bundle, host)
+    if served is None:
+        await _asgi_send_simple(send, 404, b'Not Found', head=head)
+        return
+    
+    byte_range = parse_range(headers.get('range'), served.size) if served.path else None
+    if byte_range is None or (byte_range and byte_range[0] == 0):
+        for included_folder, included_name in served.included:
+            track_script_load_later(included_folder, included_name, ip_address)
+    
+    extra_headers = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                     for k, v in cdn_headers(folder, served, settings)]
+    if served.path:
+        await _asgi_send_large(send, served, byte_range, head, extra_headers)
+    else:
+        await _asgi_send_simple(send, 200, served.body, head=head, extra_headers=extra_headers)
+
+async def _asgi_send_large(send, served, byte_range, head, extra_headers=()):
+    if byte_range is False:
+        await send({'type': 'http.response.start', 'status': 416, 'headers': [
+            (b'content-range', f'bytes */{served.size}'.encode()),
+            (b'content-length', b'0'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    
+    try:
+        mapped = await run_io(mapped_file, served.path)
+    except (OSError, ValueError):
+        SCRIPT_CACHE.discard_where(lambda key, entry: entry is served)
+        await _asgi_send_simple(send, 404, b'Not Found', head=head)
+        return
+    size = len(mapped)
+    start, end = byte_range or (0, size - 1)
+    end = min(end, size - 1)
+    headers = [
+        (b'content-type', b'text/plain; charset=utf-8'),
+        (b'content-length', str(end - start + 1).encode()),
+        (b'accept-ranges', b'bytes'),
+        *extra_headers,
+    ]
+    if byte_range:
+        headers.append((b'content-range', f'bytes {start}-{end}/{size}'.encode()))
+    await send({'type': 'http.response.start', 'status': 206 if byte_range else 200, 'headers': headers})
+    if head:
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    
+    position = start
+    while position <= end:
+        chunk_end = min(position + LARGE_SEND_CHUNK, end + 1)
+        await send({'type': 'http.response.body', 'body': mapped[position:chunk_end], 'more_body': chunk_end <= end})
+        position = chunk_end
+
+async def asgi_app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                flush_state()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and scope['path'].startswith('/scripts/'):
+        parts = scope['path'][len('/scripts/'):].split('/')
+        if len(parts) == 2 and all(parts):
+            await serve_script_asgi(scope, receive, send, parts[0], parts[1])
+            return
+    
+    if scope['type'] == 'http':
+        await _asgi_to_wsgi(scope, receive, send)
+
+# Hooks run on graceful shutdown/reload so buffered state reaches disk
+FLUSH_HOOKS = [flush_tracked_loads, flush_analytics, flush_access_log, flush_journal]
+
+def flush_state():
+    for hook in FLUSH_HOOKS:
+        try:
+            hook()
+        except Exception as e:
+            print(f"⚠️  Flush on shutdown failed: {e}")
+
+atexit.register(flush_state)
+
+# Production server settings (all optional environment variables)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'production')  # production, asgi or development
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', min(4, (os.cpu_count() or 1) * 2 + 1)))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+GRACEFUL_TIMEOUT = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+KEEPALIVE = int(os.environ.get('KEEPALIVE', 5))
+MAX_REQUESTS = int(os.environ.get('MAX_REQUESTS', 0))
+
+def run_production(port, asgi=False):
+    """
+    Serve with gunicorn: WEB_CONCURRENCY processes x WEB_THREADS threads, or
+    with asgi=True one uvicorn event loop per process (see asgi_app).
+    SIGHUP replaces workers gracefully, SIGTERM drains and stops; every worker
+    flushes its buffered state on the way out.
+    """
+    from gunicorn.app.base import BaseApplication
+    
+    class ScriptServerApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+        
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return asgi_app if asgi else app
+    
+    ScriptServerApplication({
+        'bind': f'0.0.0.0:{port}',
+        'workers': WEB_CONCURRENCY,
+        'threads': WEB_THREADS,
+        'worker_class': 'uvicorn.workers.UvicornWorker' if asgi else 'gthread',
+        'timeout': WEB_TIMEOUT,
+        'graceful_timeout': GRACEFUL_TIMEOUT,
+        'keepalive': KEEPALIVE,
+        'max_requests': MAX_REQUESTS,
+        'max_requests_jitter': MAX_REQUESTS // 10,
+        # Import once in the master so workers share config and secret key
+        'preload_app': True,
+        'worker_exit': lambda server, worker: flush_state(),
+    }).run()
+
+# Optional warm-up before the port opens: read the analytics and load the
+# WARMUP_SCRIPTS most loaded scripts into the served-script cache in
+# parallel. Under gunicorn this runs in the master, so every forked worker
+# starts with the same warm cache.
+WARMUP_SCRIPTS = int(os.environ.get('WARMUP_SCRIPTS', 0))
+WARMUP_THREADS = 8
+
+def warm_up(limit):
+    targets = hottest_scripts(limit)
+    mark_startup_phase('analytics')
+    
+    with ThreadPoolExecutor(WARMUP_THREADS, thread_name_prefix='warm-up') as pool:
+        loaded = sum(1 for served in pool.map(lambda t: load_served_script(*t), targets) if served)
+    mark_startup_phase('warm-up')
+    return loaded
+
+def startup_report():
+    total = sum(seconds for _, seconds in STARTUP_PHASES)
+    phases = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in STARTUP_PHASES)
+    return f"⏱️  Startup {total * 1000:.0f}ms: {phases}"
+
+mark_startup_phase('app')
+
 if __name__ == '__main__':
+    # python script_server.py shard FOLDER... (or --all) migrates folders and exits
+    if sys.argv[1:2] == ['shard']:
+        if not hasattr(STORAGE, 'shard_folder'):
+            raise SystemExit("Sharding needs the filesystem storage backend")
+        if not sys.argv[2:]:
+            raise SystemExit("Usage: python script_server.py shard FOLDER... | --all")
+        for folder in (STORAGE.list_folders() if sys.argv[2:] == ['--all'] else sys.argv[2:]):
+            shard_folder(folder)
+        flush_state()
+        raise SystemExit
+    
+    # python script_server.py pack [SOURCE_DIR] compiles lua_scripts/ into PACK_PATH
+    if sys.argv[1:2] == ['pack']:
+        source = sys.argv[2] if len(sys.argv) > 2 else BASE_DIR
+        print(f"📦 Packed {build_pack_from_files(source, PACK_PATH)} files from {source} into {PACK_PATH}")
+        raise SystemExit
+    
+    if WARMUP_SCRIPTS:
+        print(f"🔥 Warmed up {warm_up(WARMUP_SCRIPTS)} scripts")
     port = int(os.environ.get('PORT', 5000))  # Use PORT from environment or 5000
     print("=" * 60)
     print("🚀 ROBLOX SCRIPT SERVER STARTED!")
     print("=" * 60)
-    print(f"📁 Scripts directory: {os.path.abspath(BASE_DIR)}")
+    if STORAGE_BACKEND == 'filesystem':
+        print(f"📁 Scripts directory: {os.path.abspath(BASE_DIR)}")
+    else:
+        print(f"📁 Script storage: {STORAGE_BACKEND}")
     print(f"🌐 Web Editor: http://localhost:{port}")
     print(f"🔒 Login required!")
     print(f"   Username: {CONFIG['username']}")
@@ -1325,5 +5226,21 @@ if __name__ == '__main__':
     print(f"   ⚠️  Change password in: {CONFIG_FILE}")
     print(f"📝 Script URL format: http://localhost:{port}/scripts/FOLDER/SCRIPT.lua")
     print("   (Scripts are accessible without login)")
+    print(startup_report())
     print("=" * 60)
-    app.run(host='0.0.0.0', port=port, debug=False)
+    
+    if SERVER_MODE in ('production', 'asgi'):
+        try:
+            import gunicorn  # noqa: F401
+            if SERVER_MODE == 'asgi':
+                import uvicorn  # noqa: F401
+        except ImportError as e:
+            print(f"⚠️  {e.name} not installed, falling back to the development server")
+        else:
+            if SERVER_MODE == 'asgi':
+                print(f"⚙️  ASGI mode: {WEB_CONCURRENCY} event loop workers")
+            else:
+                print(f"⚙️  Production mode: {WEB_CONCURRENCY} workers x {WEB_THREADS} threads")
+            run_production(port, asgi=SERVER_MODE == 'asgi')
+            raise SystemExit
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
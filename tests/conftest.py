@@ -0,0 +1,36 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_folder_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def ss(tmp_path_factory):
+    """script_server, imported in an empty directory (it keeps its state in the working directory)"""
+    os.chdir(tmp_path_factory.mktemp('server'))
+    os.environ['FS_WATCH'] = 'off'
+    import script_server
+    yield script_server
+    # Flush buffered analytics and logs here; pytest restores the working directory before atexit runs
+    script_server.flush_state()
+
+
+@pytest.fixture
+def client(ss):
+    client = ss.app.test_client()
+    response = client.post('/login', data={'username': 'admin', 'password': 'changeme123'})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def folder(client):
+    """A new, empty folder for each test"""
+    name = f'test{next(_folder_numbers)}'
+    assert client.post('/api/create-folder', json={'name': name}).status_code == 200
+    return name
@@ -0,0 +1,35 @@
+import json
+import threading
+import time
+
+
+def test_loads_are_recorded_while_the_file_is_locked(ss, folder):
+    ss.track_script_load(folder, 'a.lua', '203.0.113.1')
+    with ss.file_lock(ss.ANALYTICS_FILE + '.lock'):  # another worker merging its loads
+        flushing = threading.Thread(target=ss.flush_analytics)
+        flushing.start()
+        time.sleep(0.1)
+        started = time.perf_counter()
+        ss.track_script_load(folder, 'a.lua', '203.0.113.2')
+        assert ss.hottest_scripts(1000)  # reads memory only
+        assert time.perf_counter() - started < 0.05
+    flushing.join()
+
+    scripts = ss.load_analytics()['scripts']
+    assert scripts[f'{folder}/a.lua']['total_loads'] == 2
+    with open(ss.ANALYTICS_FILE) as f:
+        assert json.load(f)['scripts'][f'{folder}/a.lua']['total_loads'] == 2
+
+
+def test_other_workers_writes_are_picked_up_on_flush(ss, folder):
+    ss.flush_analytics()
+    with ss.file_lock(ss.ANALYTICS_FILE + '.lock'):
+        analytics = ss.read_analytics_file()
+        ss.apply_script_load(analytics, folder, 'b.lua', '203.0.113.3', '2026-01-01T00:00:00')
+        ss.write_analytics_file(analytics)
+    ss.track_script_load(folder, 'b.lua', '203.0.113.4')
+
+    with ss._analytics_lock:
+        assert ss._analytics_state()['scripts'][f'{folder}/b.lua']['total_loads'] == 1
+    ss.flush_analytics()
+    assert ss.load_analytics()['scripts'][f'{folder}/b.lua']['total_loads'] == 2
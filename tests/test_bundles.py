@@ -0,0 +1,82 @@
+def loader(folder, name, host='localhost'):
+    return f'loadstring(game:HttpGet("http://{host}/scripts/{folder}/{name}"))()'
+
+
+def save(client, folder, name, content):
+    response = client.post(f'/api/save/{folder}/{name}', json={'content': content})
+    assert response.status_code == 200
+
+
+def test_loaders_are_inlined(ss, client, folder):
+    save(client, folder, 'a.lua', 'print("a")\n' + loader(folder, 'b.lua'))
+    save(client, folder, 'b.lua', 'print("b")')
+
+    body, deps = ss.bundle_script(folder, 'a.lua', 'localhost')
+    body = body.decode()
+    assert 'HttpGet' not in body
+    assert 'print("a")' in body and 'print("b")' in body
+    assert [(f, n) for f, n, _ in deps] == [(folder, 'a.lua'), (folder, 'b.lua')]
+
+
+def test_cycles_include_each_script_once(ss, client, folder):
+    save(client, folder, 'a.lua', loader(folder, 'b.lua'))
+    save(client, folder, 'b.lua', loader(folder, 'c.lua'))
+    save(client, folder, 'c.lua', loader(folder, 'a.lua'))
+
+    body, deps = ss.bundle_script(folder, 'a.lua', 'localhost')
+    body = body.decode()
+    assert len(deps) == 3
+    assert body.count(f'{ss.BUNDLE_TABLE}[1] = function') == 1
+    assert body.count(f'{ss.BUNDLE_TABLE}[3] = function') == 1
+    # c.lua calls back into the entry point instead of fetching it again
+    assert f'{ss.BUNDLE_TABLE}[3] = function(...)\n{ss.BUNDLE_TABLE}[1]()\nend' in body
+    assert 'HttpGet' not in body
+
+
+def test_self_reference_is_served_as_is(ss, client, folder):
+    content = 'if retry then ' + loader(folder, 'a.lua') + ' end'
+    save(client, folder, 'a.lua', content)
+
+    body, deps = ss.bundle_script(folder, 'a.lua', 'localhost')
+    assert body == content.encode()
+    assert len(deps) == 1
+
+
+def test_reference_back_to_the_entry_point(ss, client, folder):
+    save(client, folder, 'a.lua', 'print("a")\n' + loader(folder, 'b.lua'))
+    save(client, folder, 'b.lua', 'if retry then ' + loader(folder, 'a.lua') + ' end')
+
+    body, deps = ss.bundle_script(folder, 'a.lua', 'localhost')
+    assert len(deps) == 2
+    assert f'then {ss.BUNDLE_TABLE}[1]() end'.encode() in body
+
+
+def test_missing_and_foreign_scripts_keep_their_loader(ss, client, folder):
+    content = loader(folder, 'missing.lua') + '\n' + loader(folder, 'b.lua', host='elsewhere.example')
+    save(client, folder, 'a.lua', content)
+    save(client, folder, 'b.lua', 'print("b")')
+
+    body, deps = ss.bundle_script(folder, 'a.lua', 'localhost')
+    assert body == content.encode()
+    assert len(deps) == 1
+
+
+def test_nesting_is_limited(ss, client, folder):
+    depth = ss.BUNDLE_MAX_DEPTH + 3
+    for number in range(depth):
+        save(client, folder, f's{number}.lua', loader(folder, f's{number + 1}.lua'))
+    save(client, folder, f's{depth}.lua', 'print("bottom")')
+
+    body, deps = ss.bundle_script(folder, 's0.lua', 'localhost')
+    assert len(deps) == ss.BUNDLE_MAX_DEPTH
+    assert b'HttpGet' in body
+
+
+def test_bundle_route_follows_edits(client, folder):
+    save(client, folder, 'a.lua', loader(folder, 'b.lua'))
+    save(client, folder, 'b.lua', 'print("v1")')
+    assert b'print("v1")' in client.get(f'/scripts/{folder}/a.lua?bundle=1').data
+
+    save(client, folder, 'b.lua', 'print("v2")')
+    assert b'print("v2")' in client.get(f'/scripts/{folder}/a.lua?bundle=1').data
+    assert client.get(f'/scripts/{folder}/a.lua').data == loader(folder, 'b.lua').encode()
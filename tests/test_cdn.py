@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+def test_purge_thread_survives_unexpected_errors(ss, monkeypatch):
+    sent = []
+    purged = threading.Event()
+
+    def send_cdn_purge(keys):
+        sent.append(keys)
+        if len(sent) == 1:
+            raise ValueError('unknown url type')
+        purged.set()
+
+    monkeypatch.setattr(ss, 'send_cdn_purge', send_cdn_purge)
+    monkeypatch.setattr(ss, 'CDN_PURGE_DELAY', 0)
+    ss._purge_queue.put(['script:a/a.lua'])
+    ss.start_cdn_purger()
+    while not sent:
+        time.sleep(0.01)
+    ss._purge_queue.put(['script:a/b.lua'])
+
+    assert purged.wait(5)
+    assert sent == [['script:a/a.lua'], ['script:a/b.lua']]
+    assert ss._purge_thread.is_alive()
+
+
+def test_malformed_purge_url_is_refused_at_startup(ss, tmp_path):
+    env = {'CDN_PURGE_URL': 'cdn.example/purge', 'FS_WATCH': 'off',
+           'PYTHONPATH': os.path.dirname(os.path.abspath(ss.__file__))}
+    result = subprocess.run([sys.executable, '-c', 'import script_server'], cwd=tmp_path, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert 'CDN_PURGE_URL must be an http(s) URL' in result.stderr
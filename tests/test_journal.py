@@ -0,0 +1,85 @@
+import os
+
+
+def write_journal(ss, ops):
+    with open(ss.JOURNAL_PATH, 'ab') as f:
+        f.write(b''.join(ss.encode_journal_record(op) for op in ops))
+
+
+def test_records_round_trip(ss, tmp_path):
+    path = tmp_path / 'journal'
+    ops = [('put', 'f', 'a.lua', b'print(1)\n'), ('delete', 'f', 'b.lua'), ('put', 'f', 'c.lua', 'text')]
+    path.write_bytes(b''.join(ss.encode_journal_record(op) for op in ops))
+    assert list(ss.read_journal(str(path))) == [
+        ('put', 'f', 'a.lua', b'print(1)\n'), ('delete', 'f', 'b.lua'), ('put', 'f', 'c.lua', b'text'),
+    ]
+
+
+def test_torn_and_corrupt_records_are_ignored(ss, tmp_path):
+    path = tmp_path / 'journal'
+    first = ss.encode_journal_record(('put', 'f', 'a.lua', b'whole'))
+    second = ss.encode_journal_record(('put', 'f', 'b.lua', b'torn'))
+    path.write_bytes(first + second[:-2])
+    assert [op[2] for op in ss.read_journal(str(path))] == ['a.lua']
+
+    corrupt = bytearray(second)
+    corrupt[-1] ^= 0xFF
+    path.write_bytes(first + bytes(corrupt) + first)
+    assert [op[2] for op in ss.read_journal(str(path))] == ['a.lua']
+    assert list(ss.read_journal(str(tmp_path / 'missing'))) == []
+
+
+def test_replay_applies_writes_and_empties_the_journal(ss, folder):
+    ss.flush_journal()
+    ss.STORAGE.put(folder, 'gone.lua', b'old')
+    write_journal(ss, [('put', folder, 'a.lua', b'print("recovered")'), ('delete', folder, 'gone.lua')])
+
+    assert ss.replay_journal() == 2
+    assert ss.STORAGE.get(folder, 'a.lua') == b'print("recovered")'
+    assert ss.STORAGE.get(folder, 'gone.lua') is None
+    assert os.path.getsize(ss.JOURNAL_PATH) == 0
+
+
+def test_committed_writes_are_checkpointed(ss, client, folder):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print("v1")'})
+    ss.flush_journal()  # at shutdown, or once saves go quiet
+    assert os.path.getsize(ss.JOURNAL_PATH) == 0
+
+    # Changed behind the server's back (git pull, rsync); a restart must not undo it
+    path = os.path.join(ss.BASE_DIR, folder, 'a.lua')
+    with open(path, 'w') as f:
+        f.write('print("pulled")')
+    assert ss.replay_journal() == 0
+    assert ss.STORAGE.get(folder, 'a.lua') == b'print("pulled")'
+
+
+def test_commit_results(ss, folder):
+    assert ss.commit_writes([]) == []
+    results = ss.commit_writes([('put', folder, 'a.lua', 'x'), ('delete', folder, 'a.lua'),
+                                ('delete', folder, 'a.lua')])
+    assert results == [True, True, False]
+
+
+def test_save_without_minify_journals_only_the_script(ss, client, folder, monkeypatch):
+    committed = []
+    original = ss.commit_writes
+    monkeypatch.setattr(ss, 'commit_writes', lambda ops: committed.append(ops) or original(ops))
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    assert [[op[:3] for op in ops] for ops in committed] == [[('put', folder, 'a.lua')]]
+
+
+def test_checkpoints_wait_for_a_threshold_and_sync_only_written_files(ss, client, folder, monkeypatch):
+    ss.flush_journal()
+    synced = []
+    monkeypatch.setattr(ss.STORAGE, 'sync', lambda folder, names: synced.append((folder, sorted(names))))
+    monkeypatch.setattr(ss.os, 'sync', lambda: synced.append('everything'), raising=False)
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    client.post(f'/api/save/{folder}/b.lua', json={'content': 'print(2)'})
+    assert synced == []
+    assert [op[2] for op in ss.read_journal(ss.JOURNAL_PATH)] == ['a.lua', 'b.lua']
+
+    monkeypatch.setattr(ss, 'JOURNAL_CHECKPOINT_BYTES', 1)
+    client.delete(f'/api/delete/{folder}/a.lua')
+    assert len(synced) == 1 and synced[0][0] == folder
+    assert {'a.lua', 'b.lua'} <= set(synced[0][1])  # plus the sidecars the delete removed
+    assert os.path.getsize(ss.JOURNAL_PATH) == 0
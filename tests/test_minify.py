@@ -0,0 +1,54 @@
+import pytest
+
+
+def test_comments_and_whitespace_are_dropped(ss):
+    source = '-- header\nlocal x   =   1 -- trailing\n--[==[ long\ncomment ]==]\nprint( x )\n'
+    assert ss.minify_lua(source) == 'local x=1\nprint(x)\n'
+
+
+def test_strings_are_untouched(ss):
+    assert ss.minify_lua('print("a  -- b")') == 'print("a  -- b")\n'
+    assert ss.minify_lua("print('it''s')") == "print('it''s')\n"
+    assert ss.minify_lua('local s = [[ keep  --[[ this ]]\nx = 1') == 'local s=[[ keep  --[[ this ]]x=1\n'
+    assert ss.minify_lua('s = [==[ a ]] b ]==]') == 's=[==[ a ]] b ]==]\n'
+
+
+def test_tokens_that_would_merge_keep_a_separator(ss):
+    assert ss.minify_lua('a = b - -c') == 'a=b- -c\n'
+    assert ss.minify_lua('x = 1 .. y') == 'x=1 ..y\n'
+    assert ss.minify_lua('local function f() return nil end') == 'local function f()return nil end\n'
+    assert ss.minify_lua('t = a[ [[s]] ]') == 't=a[ [[s]]]\n'
+
+
+def test_line_break_before_a_call_is_kept(ss):
+    # Luau treats "f\n(g)" as ambiguous syntax; joining the lines would change its meaning
+    assert ss.minify_lua('f\n(g)') == 'f\n(g)\n'
+
+
+def test_shebang_is_dropped(ss):
+    assert ss.minify_lua('#!/usr/bin/lua\nprint(1)') == 'print(1)\n'
+
+
+@pytest.mark.parametrize('source', ['local a = "unterminated', 'x = @', 's = [[ never closed'])
+def test_unlexable_source_raises(ss, source):
+    with pytest.raises(ValueError):
+        ss.minify_lua(source)
+
+
+def test_minified_variant_is_served_when_enabled(client, folder):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print( 1 ) -- note'})
+    assert client.get(f'/scripts/{folder}/a.lua').data == b'print( 1 ) -- note'
+
+    client.post(f'/api/folder-settings/{folder}', json={'minify': True})
+    assert client.get(f'/scripts/{folder}/a.lua').data == b'print(1)\n'
+    # The editor keeps the readable original
+    assert client.get(f'/api/scripts/{folder}').get_json()[0]['content'] == 'print( 1 ) -- note'
+
+    client.post(f'/api/folder-settings/{folder}', json={'minify': False})
+    assert client.get(f'/scripts/{folder}/a.lua').data == b'print( 1 ) -- note'
+
+
+def test_unminifiable_scripts_are_served_as_written(client, folder):
+    client.post(f'/api/folder-settings/{folder}', json={'minify': True})
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'x = @'})
+    assert client.get(f'/scripts/{folder}/a.lua').data == b'x = @'
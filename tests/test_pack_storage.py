@@ -0,0 +1,64 @@
+import pytest
+
+
+@pytest.fixture
+def pack(ss, tmp_path):
+    ss.write_pack(str(tmp_path / 'scripts.pack'), {'f'}, [
+        ('f', 'a.lua', b'packed a', 1),
+        ('f', 'b.lua', b'packed b', 2),
+    ])
+    return ss.PackStorage(str(tmp_path / 'scripts.pack'), str(tmp_path / 'overlay'))
+
+
+def test_reads_come_from_the_pack(pack):
+    assert pack.get('f', 'a.lua') == b'packed a'
+    assert pack.get('f', 'missing.lua') is None
+    assert sorted(pack.list_scripts('f')) == ['a.lua', 'b.lua']
+    assert pack.stat('f', 'b.lua') == (2, len(b'packed b'))
+
+
+def test_put_and_get_through_the_overlay(pack):
+    pack.put('f', 'a.lua', b'edited a')
+    pack.put('g', 'new.lua', 'print(1)')
+    assert pack.get('f', 'a.lua') == b'edited a'
+    assert pack.get('g', 'new.lua') == b'print(1)'
+    assert pack.get('f', 'b.lua') == b'packed b'
+    assert sorted(pack.list_folders()) == ['f', 'g']
+
+
+def test_repack_merges_the_overlay_into_the_pack(ss, pack):
+    pack.put('f', 'a.lua', b'edited a')
+    pack.put('f', 'c.lua', b'new c')
+    assert pack.repack() == 2
+    assert pack.repack() == 0
+
+    assert pack._changes == {}
+    _, entries, _ = ss.read_pack(pack.path)
+    assert sorted(entries) == [('f', 'a.lua'), ('f', 'b.lua'), ('f', 'c.lua')]
+    assert pack.get('f', 'a.lua') == b'edited a'
+    assert pack.get('f', 'c.lua') == b'new c'
+
+    # Another process opening the new pack sees the same thing
+    reopened = ss.PackStorage(pack.path, pack.overlay)
+    assert reopened.get('f', 'a.lua') == b'edited a'
+
+
+def test_deletes_survive_a_repack(ss, pack):
+    pack.put('f', 'c.lua', b'new c')
+    assert pack.delete('f', 'a.lua')
+    assert pack.delete('f', 'c.lua')
+    assert not pack.delete('f', 'missing.lua')
+    assert pack.get('f', 'a.lua') is None
+    assert pack.get('f', 'c.lua') is None
+
+    pack.repack()
+    assert pack.get('f', 'a.lua') is None
+    assert sorted(pack.list_scripts('f')) == ['b.lua']
+    assert ss.PackStorage(pack.path, pack.overlay).get('f', 'a.lua') is None
+
+
+def test_read_pack_rejects_other_files(ss, tmp_path):
+    path = tmp_path / 'not.pack'
+    path.write_bytes(b'print("not a pack")')
+    with pytest.raises(ValueError):
+        ss.read_pack(str(path))
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture
+def profile_id(client):
+    client.get('/api/profiles', headers={'X-Profile': '1'})
+    profiles = [p for p in client.get('/api/profiles').get_json() if p['has_profile']]
+    return profiles[0]['id']
+
+
+def test_text_report(client, profile_id):
+    response = client.get(f'/api/profiles/{profile_id}?format=text&sort=time&limit=5')
+    assert response.status_code == 200
+    assert b'function calls' in response.data
+
+
+@pytest.mark.parametrize('query', ['sort=bogus', 'sort=__class__', 'limit=ten', 'limit=-1'])
+def test_bad_report_options_are_rejected(client, profile_id, query):
+    response = client.get(f'/api/profiles/{profile_id}?format=text&{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+
+def save(client, folder, name, content):
+    assert client.post(f'/api/save/{folder}/{name}', json={'content': content}).status_code == 200
+
+
+def publish(client, folder):
+    response = client.post(f'/api/publish/{folder}')
+    assert response.status_code == 200
+    return response.get_json()['published']
+
+
+def test_edits_stay_in_the_draft_until_published(ss, client, folder):
+    public = ss.app.test_client()
+    save(client, folder, 'a.lua', 'print("v1")')
+    publish(client, folder)
+
+    save(client, folder, 'a.lua', 'print("v2")')
+    save(client, folder, 'new.lua', 'print("new")')
+    assert public.get(f'/scripts/{folder}/a.lua').data == b'print("v1")'
+    assert public.get(f'/scripts/{folder}/new.lua').status_code == 404
+    editor = client.get(f'/api/scripts/{folder}?names=a.lua').get_json()
+    assert editor == [{'name': 'a.lua', 'content': 'print("v2")'}]
+
+    publish(client, folder)
+    assert public.get(f'/scripts/{folder}/a.lua').data == b'print("v2")'
+    assert public.get(f'/scripts/{folder}/new.lua').data == b'print("new")'
+
+
+def test_rollback_serves_the_previous_snapshot(ss, client, folder):
+    public = ss.app.test_client()
+    save(client, folder, 'a.lua', 'print("v1")')
+    first = publish(client, folder)
+    save(client, folder, 'a.lua', 'print("v2")')
+    second = publish(client, folder)
+    assert public.get(f'/scripts/{folder}/a.lua').data == b'print("v2")'
+
+    response = client.post(f'/api/rollback/{folder}')
+    assert response.get_json()['published'] == first
+    assert public.get(f'/scripts/{folder}/a.lua').data == b'print("v1")'
+    assert client.post(f'/api/rollback/{folder}').status_code == 409  # nothing older
+
+    client.post(f'/api/rollback/{folder}', json={'snapshot': second})
+    assert public.get(f'/scripts/{folder}/a.lua').data == b'print("v2")'
+
+    # Back to serving the live scripts
+    save(client, folder, 'a.lua', 'print("v3")')
+    client.delete(f'/api/publish/{folder}')
+    assert public.get(f'/scripts/{folder}/a.lua').data == b'print("v3")'
+
+
+def test_concurrent_config_updates_are_not_lost(ss, client, folder):
+    save(client, folder, 'a.lua', 'print(1)')
+    ss.flush_journal()  # nothing for the other process to replay on import
+
+    def set_key(number):
+        ss.update_config(lambda config: config.setdefault('test_keys', {}).__setitem__(str(number), number))
+
+    # Another worker process updating the same file while this one publishes
+    other = subprocess.Popen([sys.executable, '-c', (
+        'import script_server as ss\n'
+        'print("ready", flush=True)\n'
+        'for n in range(100, 120):\n'
+        '    ss.update_config(lambda c, n=n: c.setdefault("test_keys", {}).__setitem__(str(n), n))\n'
+    )], cwd=os.getcwd(), env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(ss.__file__))),
+        stdout=subprocess.PIPE, text=True)
+    assert other.stdout.readline() == 'ready\n'
+    threads = [threading.Thread(target=set_key, args=(n,)) for n in range(20)]
+    threads.append(threading.Thread(target=ss.publish_folder, args=(folder,)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert other.wait(60) == 0
+
+    with open(ss.CONFIG_FILE) as f:
+        config = json.load(f)
+    assert sorted(config['test_keys'].values()) == list(range(20)) + list(range(100, 120))
+    assert config['folders'][folder]['published'] in ss.list_snapshots(folder)
+    ss.refresh_config(force=True)
+    assert ss.CONFIG['test_keys'] == config['test_keys']
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-9', (0, 9)),
+    ('bytes=90-', (90, 99)),
+    ('bytes=5-1000', (5, 99)),
+    ('bytes=-5', (95, 99)),
+    ('bytes=-500', (0, 99)),
+    ('bytes=200-', False),
+    ('bytes=9-5', False),
+    (None, None),
+    ('', None),
+    ('items=0-9', None),
+    ('bytes=0-1,5-9', None),
+    ('bytes=x-9', None),
+])
+def test_parse_range(ss, header, expected):
+    assert ss.parse_range(header, 100) == expected
+
+
+@pytest.fixture
+def large_script(ss, client, folder, monkeypatch):
+    monkeypatch.setattr(ss, 'LARGE_SCRIPT_BYTES', 100)
+    content = ''.join(f'print({number})\n' for number in range(100))
+    client.post(f'/api/save/{folder}/big.lua', json={'content': content})
+    return f'/scripts/{folder}/big.lua', content.encode()
+
+
+def test_large_script_is_sent_whole(client, large_script):
+    url, content = large_script
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == content
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+
+def test_range_request(client, large_script):
+    url, content = large_script
+    response = client.get(url, headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == content[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(content)}'
+
+
+def test_suffix_range(client, large_script):
+    url, content = large_script
+    response = client.get(url, headers={'Range': 'bytes=-5'})
+    assert response.status_code == 206
+    assert response.data == content[-5:]
+
+
+def test_unsatisfiable_range(client, large_script):
+    url, content = large_script
+    response = client.get(url, headers={'Range': f'bytes={len(content) + 10}-'})
+    assert response.status_code == 416
+
+
+def test_only_the_first_range_counts_as_a_load(ss, client, folder, large_script):
+    url, _ = large_script
+    client.get(url, headers={'Range': 'bytes=0-9'})
+    client.get(url, headers={'Range': 'bytes=10-19'})
+    ss.flush_analytics()
+    assert ss.load_analytics()['scripts'][f'{folder}/big.lua']['total_loads'] == 1
+
+
+def asgi_get(ss, path, headers=()):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'client': ('127.0.0.1', 1),
+             'headers': [(b'host', b'localhost')] + [(k.encode(), v.encode()) for k, v in headers]}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(ss.asgi_app(scope, receive, send))
+    return messages[0]['status'], dict(messages[0]['headers']), b''.join(m.get('body', b'') for m in messages[1:])
+
+
+def test_asgi_range_request(ss, large_script):
+    url, content = large_script
+    status, headers, body = asgi_get(ss, url, [('range', 'bytes=10-19')])
+    assert status == 206
+    assert body == content[10:20]
+    assert headers[b'content-range'] == f'bytes 10-19/{len(content)}'.encode()
+
+    status, _, body = asgi_get(ss, url)
+    assert (status, body) == (200, content)
+    assert asgi_get(ss, url, [('range', f'bytes={len(content)}-')])[0] == 416
+
+
+def test_asgi_blocking_work_stays_off_the_event_loop(ss, client, folder, monkeypatch):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    client.post(f'/api/folder-settings/{folder}', json={'cache_max_age': 60})
+    asgi_get(ss, f'/scripts/{folder}/a.lua')  # cached
+
+    threads = {}
+    for name in ('refresh_config', 'track_script_load'):
+        original = getattr(ss, name)
+        monkeypatch.setattr(ss, name, lambda *args, original=original, name=name:
+                            threads.setdefault(name, threading.current_thread()) and original(*args))
+    monkeypatch.setattr(ss, '_config_checked', 0.0)
+    status, headers, _ = asgi_get(ss, f'/scripts/{folder}/a.lua')
+    ss.flush_tracked_loads()
+
+    assert status == 200
+    assert headers[b'cache-control'] == b'public, max-age=60'
+    assert set(threads) == {'refresh_config', 'track_script_load'}
+    assert threading.main_thread() not in threads.values()
@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.fixture
+def clock(ss, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ss.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_burst_then_wait(ss, clock):
+    buckets = ss.TokenBuckets(10)
+    assert [buckets.take('ip', 60, 3) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('ip', 60, 3) == pytest.approx(1.0)
+    # Refused requests don't spend anything
+    assert buckets.take('ip', 60, 3) == pytest.approx(1.0)
+
+
+def test_tokens_refill_over_time(ss, clock):
+    buckets = ss.TokenBuckets(10)
+    for _ in range(2):
+        buckets.take('ip', 60, 2)
+    clock[0] += 0.5
+    assert buckets.take('ip', 60, 2) == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert buckets.take('ip', 60, 2) == 0
+    # Never more than the burst, however long the client was away
+    clock[0] += 3600
+    assert [buckets.take('ip', 60, 2) for _ in range(3)][2] > 0
+
+
+def test_clients_are_limited_separately(ss, clock):
+    buckets = ss.TokenBuckets(10)
+    assert buckets.take('a', 60, 1) == 0
+    assert buckets.take('a', 60, 1) > 0
+    assert buckets.take('b', 60, 1) == 0
+
+
+def test_least_recently_seen_clients_are_forgotten(ss, clock):
+    buckets = ss.TokenBuckets(2)
+    buckets.take('a', 60, 1)
+    buckets.take('b', 60, 1)
+    buckets.take('c', 60, 1)
+    assert buckets.take('a', 60, 1) == 0  # pushed out, back with a full bucket
+    assert buckets.take('c', 60, 1) > 0
+
+
+def test_folder_limit_answers_429(ss, client, folder, clock):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    client.post(f'/api/folder-settings/{folder}', json={'rate_limit': 2})
+    public = ss.app.test_client()
+    headers = {'X-Forwarded-For': '203.0.113.9'}
+    assert [public.get(f'/scripts/{folder}/a.lua', headers=headers).status_code for _ in range(2)] == [200, 200]
+
+    response = public.get(f'/scripts/{folder}/a.lua', headers=headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    assert public.get(f'/scripts/{folder}/a.lua', headers={'X-Forwarded-For': '203.0.113.10'}).status_code == 200
+
+    clock[0] += 30
+    assert public.get(f'/scripts/{folder}/a.lua', headers=headers).status_code == 200
+
+
+def test_unlimited_folders_are_not_counted(ss, client, folder):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    assert ss.rate_limit_wait(folder, '203.0.113.9') == 0
+    assert ('203.0.113.9', folder) not in ss._rate_buckets._buckets
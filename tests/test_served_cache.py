@@ -0,0 +1,25 @@
+def test_stale_entry_is_revalidated_outside_the_cache_lock(ss, client, folder, monkeypatch):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    entry = ss.load_served_script(folder, 'a.lua')
+    entry.checked -= 3600
+
+    held = []
+    revalidate = ss.ServedScript.revalidate
+    monkeypatch.setattr(ss.ServedScript, 'revalidate', lambda self: held.append(ss.SCRIPT_CACHE._lock.locked())
+                        or revalidate(self))
+    assert ss.cached_served_script(folder, 'a.lua') is None  # no I/O on the lookup path
+    assert ss.load_served_script(folder, 'a.lua') is entry
+    assert held == [False]
+    assert entry.fresh()
+
+
+def test_changed_entry_is_replaced(ss, client, folder):
+    client.post(f'/api/save/{folder}/a.lua', json={'content': 'print(1)'})
+    entry = ss.load_served_script(folder, 'a.lua')
+    entry.checked -= 3600
+    ss.STORAGE.put(folder, 'a.lua', 'print(22)')
+
+    fresh = ss.load_served_script(folder, 'a.lua')
+    assert fresh is not entry
+    assert fresh.body == b'print(22)'
+    assert ss.SCRIPT_CACHE.peek(ss.served_script_key(folder, 'a.lua')) is fresh
@@ -0,0 +1,50 @@
+import pytest
+
+
+def session_cookie(client):
+    return client.get_cookie('session').value
+
+
+def replay(ss, token):
+    other = ss.app.test_client()
+    other.set_cookie('session', token)
+    return other.get('/api/folders')
+
+
+def test_signed_cookie_logs_in(ss, client):
+    response = replay(ss, session_cookie(client))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('tamper', [
+    lambda token: token[:-1] + ('A' if token[-1] != 'A' else 'B'),  # signature
+    lambda token: 'e' + token,  # payload
+    lambda token: token.split('.')[0],  # signature dropped
+])
+def test_tampered_cookie_is_rejected(ss, client, tamper):
+    response = replay(ss, tamper(session_cookie(client)))
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_cookie_signed_with_another_key_is_rejected(ss, client):
+    from itsdangerous import URLSafeTimedSerializer
+    forged = URLSafeTimedSerializer('not the secret', salt=ss.SignedSessionInterface.salt).dumps({'logged_in': True})
+    assert replay(ss, forged).status_code == 302
+
+
+def test_logged_out_cookie_cannot_be_replayed(ss, client):
+    token = session_cookie(client)
+    assert replay(ss, token).status_code == 200  # verified once, so it is cached too
+    client.get('/logout')
+
+    assert replay(ss, token).status_code == 302
+    assert client.get('/api/folders').status_code == 302
+
+
+def test_expired_cookie_is_rejected(ss, client, monkeypatch):
+    token = session_cookie(client)
+    assert replay(ss, token).status_code == 200
+    now = ss.time.time()
+    monkeypatch.setattr(ss.time, 'time', lambda: now + ss.SESSION_LIFETIME + 1)
+    assert replay(ss, token).status_code == 302
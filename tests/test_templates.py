@@ -0,0 +1,72 @@
+def save(client, folder, name, content):
+    response = client.post(f'/api/save/{folder}/{name}', json={'content': content})
+    assert response.status_code == 200
+
+
+def test_variant_takes_its_value_from_the_name(client, folder):
+    save(client, folder, 'VPS{n}.lua', 'print("${n}")')
+    assert client.get(f'/scripts/{folder}/VPS7.lua').data == b'print("7")'
+    assert client.get(f'/scripts/{folder}/VPS12.lua').data == b'print("12")'
+    assert client.get(f'/scripts/{folder}/Other7.lua').status_code == 404
+
+
+def test_folder_and_script_are_always_available(client, folder):
+    save(client, folder, 'VPS{n}.lua', '-- ${folder}/${script}')
+    assert client.get(f'/scripts/{folder}/VPS3.lua').data == f'-- {folder}/VPS3.lua'.encode()
+
+
+def test_unknown_placeholders_are_left_alone(client, folder):
+    save(client, folder, 'VPS{n}.lua', 'print("${n} ${missing}")')
+    assert client.get(f'/scripts/{folder}/VPS1.lua').data == b'print("1 ${missing}")'
+
+
+def test_parameter_table_defaults_and_overrides(client, folder):
+    save(client, folder, 'VPS{n}.lua', 'connect("${host}", ${n})')
+    table = {'*': {'host': 'default.example'}, 'VPS7.lua': {'host': 'special.example'}}
+    response = client.post(f'/api/template-params/{folder}/VPS{{n}}.lua', json=table)
+    assert response.status_code == 200
+
+    assert client.get(f'/api/template-params/{folder}/VPS{{n}}.lua').get_json() == table
+    assert client.get(f'/scripts/{folder}/VPS1.lua').data == b'connect("default.example", 1)'
+    assert client.get(f'/scripts/{folder}/VPS7.lua').data == b'connect("special.example", 7)'
+
+
+def test_name_parameters_win_over_the_table(client, folder):
+    save(client, folder, 'VPS{n}.lua', '${n}')
+    client.post(f'/api/template-params/{folder}/VPS{{n}}.lua', json={'*': {'n': 'table'}})
+    assert client.get(f'/scripts/{folder}/VPS5.lua').data == b'5'
+
+
+def test_editing_the_table_changes_cached_variants(client, folder):
+    save(client, folder, 'VPS{n}.lua', '${greeting}')
+    client.post(f'/api/template-params/{folder}/VPS{{n}}.lua', json={'*': {'greeting': 'hello'}})
+    assert client.get(f'/scripts/{folder}/VPS1.lua').data == b'hello'
+
+    client.post(f'/api/template-params/{folder}/VPS{{n}}.lua', json={'*': {'greeting': 'bye'}})
+    assert client.get(f'/scripts/{folder}/VPS1.lua').data == b'bye'
+
+
+def test_invalid_parameter_tables_are_rejected(client, folder):
+    save(client, folder, 'VPS{n}.lua', '${n}')
+    url = f'/api/template-params/{folder}/VPS{{n}}.lua'
+    assert client.post(url, json={'*': 'not an object'}).status_code == 400
+    assert client.post(url, json=['list']).status_code == 400
+    assert client.post(f'/api/template-params/{folder}/plain.lua', json={}).status_code == 400
+
+
+def test_unusable_parameter_names_are_rejected(client, folder):
+    for name in ('V{1}.lua', 'D{n}_{n}.lua'):
+        response = client.post(f'/api/save/{folder}/{name}', json={'content': '${n}'})
+        assert response.status_code == 400
+        assert client.post(f'/api/create-script/{folder}', json={'name': name}).status_code == 400
+        assert client.post(f'/api/template-params/{folder}/{name}', json={}).status_code == 400
+    assert client.post(f'/api/mass-create/{folder}', json={'prefix': 'V{1}_', 'end': 2}).status_code == 400
+    assert client.get(f'/scripts/{folder}/missing.lua').status_code == 404
+
+
+def test_broken_templates_on_disk_are_skipped(ss, client, folder):
+    # e.g. saved by an older version, or copied into lua_scripts/ by hand
+    ss.STORAGE.put(folder, 'V{1}.lua', b'broken')
+    save(client, folder, 'VPS{n}.lua', '${n}')
+    assert client.get(f'/scripts/{folder}/missing.lua').status_code == 404
+    assert client.get(f'/scripts/{folder}/VPS4.lua').data == b'4'